@@ -0,0 +1,127 @@
+"""Relatórios em colunas (Sales analytics) contra o laço sobre os pedidos.
+
+Dados do datagen.py com n pedidos. "loop" é o jeito sem colunas: o percurso em ordem da árvore de pedidos
+e um laço Python sobre os objetos, calculando as mesmas métricas (receita por status, ticket médio e percentis,
+uso do cupom, itens mais vendidos, vendas por mês). As colunas são montadas uma vez ("build") e cada relatório
+roda com o motor array (sempre) e com o NumPy (se instalado), para o histórico todo e para um mês.
+Com o NumPy instalado, confere também que os dois motores dão os mesmos números, inclusive com códigos
+de item grandes e esparsos (como os de uma importação); sem ele, essa conferência é pulada.
+
+Uso: python benchmarks/bench_analytics.py [n_pedidos]   (padrão: 200000)
+"""
+import heapq
+import math
+import sys
+import time
+from array import array
+
+import datagen
+from common import load_app
+
+MONTH = 202406
+RUNS = 3
+
+
+def best_of(fn, runs=RUNS):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def loop_report(app, month=None, top=10):
+    """As métricas do sales_analytics calculadas direto dos objetos Order"""
+    tree = app.orders_tree
+    by_status, units, months, sales = {}, {}, {}, []
+    discounted = 0
+    for order in tree:
+        created = order.created_at
+        key = int(created[:4] + created[5:7]) if created else 0
+        if month is not None and key != month:
+            continue
+        total = order.order_total_price
+        bucket = by_status.setdefault(order.status, [0, 0])
+        bucket[0] += 1
+        bucket[1] += total
+        if order.status in app.CLOSED_STATUSES:
+            continue
+        sales.append(total)
+        gross = 0
+        for line in order.items_order:
+            units[line.code] = units.get(line.code, 0) + line.quantity
+            gross += line.price * line.quantity
+        if total < gross - 0.005:
+            discounted += 1
+        bucket = months.setdefault(key, [0, 0])
+        bucket[0] += 1
+        bucket[1] += total
+    sales.sort()
+    return {
+        "by_status": by_status,
+        "average_ticket": sum(sales) / len(sales) if sales else 0,
+        "percentiles": [app.percentile(sales, p) for p in app.ANALYTICS_PERCENTILES],
+        "discounted": discounted,
+        "top_items": heapq.nsmallest(top, units, key=lambda code: (-units[code], code)),
+        "by_month": months,
+    }
+
+
+def same_report(a, b):
+    """Relatórios iguais, com tolerância nas somas em ponto flutuante (a ordem das somas muda entre os motores)"""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same_report(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(same_report(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def check_engines(app, columns):
+    """Confere o motor NumPy contra o array no histórico, num mês, e com os códigos de item espalhados até ~10^12"""
+    sparse = app.SalesColumns()
+    for name in vars(columns):
+        getattr(sparse, name).extend(getattr(columns, name))
+    sparse.item = array("q", (code * 999_999_937 for code in columns.item))
+    for data in (columns, sparse):
+        for month in (None, MONTH):
+            expected = app._array_analytics(data, month, 10)
+            assert same_report(app._numpy_analytics(data, month, 10), expected), f"engines differ (month {month})"
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    app = load_app()
+    datagen.fill(app, n)
+    service = app.OrderService(app.store)
+
+    columns, build = best_of(service.sales_columns, 1)
+    engines = [("array", app._array_analytics)]
+    if app.np is not None:
+        engines.append(("numpy", app._numpy_analytics))
+
+    rows = [("build columns", "", build)]
+    for scope, month in (("whole history", None), (app.month_name(MONTH), MONTH)):
+        expected, elapsed = best_of(lambda: loop_report(app, month))
+        rows.append((scope, "loop", elapsed))
+        for name, analytics in engines:
+            report, elapsed = best_of(lambda: analytics(columns, month, 10))
+            assert [code for code, _, _ in report["top_items"]] == expected["top_items"]
+            assert report["discounted"] == expected["discounted"]
+            rows.append((scope, name, elapsed))
+
+    if app.np is not None:
+        check_engines(app, columns)
+        print("numpy and array engines agree (including sparse item codes)")
+    else:
+        print("numpy not installed: engine check skipped")
+    print(f"{n} orders, {len(columns.item)} order lines (numpy {'installed' if app.np is not None else 'not installed'})")
+    print(f"{'report':>15} {'engine':>7} {'time (s)':>9}")
+    for scope, engine, elapsed in rows:
+        print(f"{scope:>15} {engine:>7} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
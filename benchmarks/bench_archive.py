@@ -0,0 +1,66 @@
+"""Arquivamento de pedidos encerrados: custo do snapshot e da carga antes e depois de arquivar.
+
+Monta n pedidos criados ao longo de um ano, 98% já encerrados (como no uso real), e mede com o histórico
+inteiro nas árvores e depois de archive_orders(): tamanho do dados.json, tempo de save_data() e de load_data().
+Também mede a leitura sob demanda de uma partição (um mês) do arquivo.
+
+Uso: python benchmarks/bench_archive.py [n_pedidos]   (padrão: 200000)
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import fill_app, load_app
+
+
+def measure(app):
+    start = time.perf_counter()
+    app.save_data()
+    save_time = time.perf_counter() - start
+    size = os.path.getsize(app.DATA_FILE) / 2**20
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.load_data()
+    return size, save_time, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        app = load_app()
+        fill_app(app, n)
+        for order in app.orders_tree:
+            order.created_at = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(10, 22):02d}:00:00"
+            if order.code % 50:
+                order.status = rng.choice(("Delivered",) * 8 + ("Canceled", "Rejected"))
+        app.sales_stats = app.SalesStats.recompute(app.orders_tree)
+        app.save_data()
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.load_data()
+
+        before = measure(app)
+        start = time.perf_counter()
+        archived = app.archive_orders(30)
+        archive_time = time.perf_counter() - start
+        after = measure(app)
+        assert not app.sales_stats.check(app.chain(app.orders_tree, app.read_archive())), "aggregates changed"
+
+        start = time.perf_counter()
+        month = sum(1 for _ in app.read_archive(["2024-06"], live=app.orders_tree.__contains__))
+        month_time = time.perf_counter() - start
+
+    print(f"{n} orders, {archived} archived in {archive_time:.2f}s, {len(app.orders_tree)} left in the trees")
+    print(f"{'':>8} {'dados.json (MB)':>16} {'save (s)':>9} {'load (s)':>9}")
+    for name, (size, save_time, load_time) in (("before", before), ("after", after)):
+        print(f"{name:>8} {size:>16.1f} {save_time:>9.2f} {load_time:>9.2f}")
+    print(f"reading partition 2024-06 on demand: {month} orders in {month_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Microbenchmark: insert/search/percurso recursivos (versão anterior) x iterativos (AVLTree atual).
+
+Uso: python benchmarks/bench_avl_traversal.py [n]   (padrão: 1000000)
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from common import load_app
+
+app = load_app()
+
+
+class RecursiveAVLTree(app.AVLTree):
+    """Versões recursivas que a AVLTree usava antes, mantidas só para comparação."""
+
+    def insert(self, root, key, value):
+        if not root:
+            return app.Node(key, value)
+        if key < root.key:
+            root.left = self.insert(root.left, key, value)
+        elif key > root.key:
+            root.right = self.insert(root.right, key, value)
+        else:
+            return root
+        self._update_height(root)
+        balance = self._get_balance(root)
+        if balance > 1:
+            if key < root.left.key:
+                return self._rotate_right(root)
+            root.left = self._rotate_left(root.left)
+            return self._rotate_right(root)
+        if balance < -1:
+            if key > root.right.key:
+                return self._rotate_left(root)
+            root.right = self._rotate_right(root.right)
+            return self._rotate_left(root)
+        return root
+
+    def search(self, root, key):
+        if root is None or root.key == key:
+            return root.value if root else None
+        if key < root.key:
+            return self.search(root.left, key)
+        return self.search(root.right, key)
+
+    def inorder_traversal_list(self, root):
+        result = []
+        if root:
+            result.extend(self.inorder_traversal_list(root.left))
+            result.append(root.value)
+            result.extend(self.inorder_traversal_list(root.right))
+        return result
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench(tree_cls, keys, lookups):
+    tree = tree_cls()
+
+    def insert_all():
+        for k in keys:
+            tree.root = tree.insert(tree.root, k, k)
+
+    def search_all():
+        for k in lookups:
+            tree.search(tree.root, k)
+
+    def traverse():
+        for _ in tree.inorder_traversal_list(tree.root) if tree_cls is RecursiveAVLTree else tree:
+            pass
+
+    return {
+        "insert": timed(insert_all)[0],
+        "search": timed(search_all)[0],
+        "traverse": timed(traverse)[0],
+        "traverse_peak_mb": peak_memory(traverse) / 2**20,
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    keys = rng.sample(range(n * 10), n)
+    lookups = rng.sample(keys, min(n, 200_000))
+
+    old = bench(RecursiveAVLTree, keys, lookups)
+    new = bench(app.AVLTree, keys, lookups)
+    print(f"{n} nodes")
+    print(f"{'':>18} {'recursive':>10} {'iterative':>10}")
+    for metric in ("insert", "search", "traverse"):
+        print(f"{metric + ' (s)':>18} {old[metric]:>10.3f} {new[metric]:>10.3f}")
+    print(f"{'traverse peak (MB)':>18} {old['traverse_peak_mb']:>10.1f} {new['traverse_peak_mb']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
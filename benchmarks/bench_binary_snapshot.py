@@ -0,0 +1,77 @@
+"""Inicialização: dados.json (json.load + árvores) x dados.bin (mmap, pedidos lidos sob demanda).
+
+Mede o tempo de load_data(), a memória retida depois da carga e o tempo até mostrar a primeira página de pedidos.
+Como no uso real, a maior parte do histórico já está entregue; só 2% dos pedidos ficam em andamento.
+
+Uso: python benchmarks/bench_binary_snapshot.py [n_pedidos]   (padrão: 1000000)
+"""
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import fill_app, load_app
+
+
+def measure_load(app):
+    gc.collect()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.load_data()
+    load_time = time.perf_counter() - start
+
+    # Segunda carga só para medir a memória (o tracemalloc deixa a carga bem mais lenta)
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.load_data()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    app.orders_tree.page(None, app.PAGE_SIZE)
+    first_page = time.perf_counter() - start
+    return load_time, retained, first_page
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        writer = load_app()
+        fill_app(writer, n)
+        for order in writer.orders_tree:
+            if order.code % 50:
+                order.status = "Delivered"
+        # Agregados coerentes com os pedidos, como o load_data deixaria
+        writer.sales_stats = writer.SalesStats.recompute(writer.orders_tree)
+        writer.save_data()
+        writer.save_binary_snapshot()
+        json_mb = os.path.getsize(writer.DATA_FILE) / 2**20
+        bin_mb = os.path.getsize(writer.BINARY_FILE) / 2**20
+        del writer
+        gc.collect()
+
+        json_app = load_app()
+        json_result = measure_load(json_app)
+        del json_app
+        gc.collect()
+
+        bin_app = load_app()
+        bin_app.SNAPSHOT_FORMAT = "binary"
+        bin_result = measure_load(bin_app)
+        bin_app.binary_snapshot.close()
+
+    print(f"{n} orders (dados.json {json_mb:.0f} MB, dados.bin {bin_mb:.0f} MB)")
+    print(f"{'':>8} {'load (s)':>9} {'retained (MB)':>14} {'first page (ms)':>16}")
+    for name, (load_time, retained, first_page) in (("json", json_result), ("binary", bin_result)):
+        print(f"{name:>8} {load_time:>9.2f} {retained / 2**20:>14.1f} {first_page * 1e3:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Importação e exportação em lote (subcomandos import/export): vazão em registros por segundo.
+
+Gera um catálogo e n pedidos em JSON Lines, importa nos dois backends e exporta de volta em CSV e JSON Lines.
+A exportação lê do store um pedido por vez; o pico de memória (tracemalloc) mostra que a lista inteira nunca é montada.
+
+Uso: python benchmarks/bench_bulk_import.py [n_pedidos]   (padrão: 200000)
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import load_app, make_catalog, make_orders
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        catalog = make_catalog(100)
+        with open("items.jsonl", "w", encoding="utf-8") as arq:
+            for item in catalog:
+                arq.write(json.dumps({**item, "code": None}) + "\n")
+        with open("orders.jsonl", "w", encoding="utf-8") as arq:
+            for order in make_orders(n, catalog):
+                arq.write(json.dumps({**order, "code": None}, ensure_ascii=False) + "\n")
+
+        rows = []
+        for name in ("memory", "sqlite"):
+            for path in ("dados.json", "dados.journal", "dados.db"):
+                if os.path.exists(path):
+                    os.remove(path)
+            app = load_app()
+            store = app.SqliteStore() if name == "sqlite" else app.MemoryStore()
+            app.store = store
+            with contextlib.redirect_stdout(io.StringIO()):
+                store.load()
+            app.import_file(store, "items", "items.jsonl")
+            (imported, errors), import_time = timed(app.import_file, store, "orders", "orders.jsonl")
+            assert imported == n and not errors, errors[:5]
+            _, close_time = timed(store.close) # Snapshot único no backend em memória
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                store.load()
+            _, csv_time = timed(app.export_file, store, "orders", "out.csv")
+            _, jsonl_time = timed(app.export_file, store, "orders", "out.jsonl")
+            # Segunda exportação só para medir a memória (o tracemalloc deixa tudo bem mais lento)
+            tracemalloc.start()
+            app.export_file(store, "orders", "out.jsonl")
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            store.close()
+            rows.append((name, import_time, close_time, csv_time, jsonl_time, peak))
+
+    print(f"{n} orders (rows/s; flush = close() after the import, in seconds)")
+    print(f"{'':>8} {'import':>10} {'flush (s)':>10} {'export csv':>11} {'export jsonl':>13} {'jsonl peak (MB)':>16}")
+    for name, import_time, close_time, csv_time, jsonl_time, peak in rows:
+        print(f"{name:>8} {n / import_time:>10,.0f} {close_time:>10.2f} {n / csv_time:>11,.0f} {n / jsonl_time:>13,.0f} {peak / 2**20:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Histórico por cliente (índice orders_by_costumer) e ranking dos clientes que mais gastaram.
+
+Dados do datagen.py com n pedidos. "history" busca os pedidos de clientes sorteados pelo índice;
+"scan" é a alternativa sem índice, percorrendo a árvore de pedidos inteira. O top 10 usa um heap
+(heapq.nlargest) sobre os agregados por cliente; "sort" ordena todos os clientes para pegar os 10 primeiros.
+
+Uso: python benchmarks/bench_costumers.py [n_pedidos]   (padrão: 200000)
+"""
+import heapq
+import random
+import sys
+import time
+
+import datagen
+from common import load_app
+
+LOOKUPS = 1000
+TOP = 10
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return result, (time.perf_counter() - start) / runs
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    app = load_app()
+    datagen.fill(app, n)
+    service = app.OrderService(app.store)
+    rng = random.Random(42)
+    codes = [rng.randint(1, len(app.costumers)) for _ in range(LOOKUPS)]
+
+    start = time.perf_counter()
+    found = sum(len(service.costumer_orders(code)) for code in codes)
+    history = (time.perf_counter() - start) / LOOKUPS
+
+    tree = app.orders_tree
+    code = codes[0]
+    _, scan = timed(lambda: [o for o in tree if o.costumer.code == code], 3)
+
+    sales = service.sales_by("costumer")
+    _, heap = timed(lambda: heapq.nlargest(TOP, sales.items(), key=lambda entry: entry[1][1]), 20)
+    _, full_sort = timed(lambda: sorted(sales.items(), key=lambda entry: entry[1][1], reverse=True)[:TOP], 20)
+    _, report = timed(service.costumer_report, 20)
+
+    print(f"{n} orders, {len(app.costumers)} costumers ({found / LOOKUPS:.1f} orders per lookup)")
+    print(f"{'operation':>22} {'time (ms)':>10}")
+    print(f"{'history (index)':>22} {history * 1e3:>10.3f}")
+    print(f"{'history (scan)':>22} {scan * 1e3:>10.3f}")
+    print(f"{'top 10 (heap)':>22} {heap * 1e3:>10.3f}")
+    print(f"{'top 10 (sort)':>22} {full_sort * 1e3:>10.3f}")
+    print(f"{'costumer_report':>22} {report * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Latência por escrita: reescrita completa (save_data) x log append-only (log_change).
+
+Uso: python benchmarks/bench_journal.py [tamanhos...]   (padrão: 10000 100000 1000000)
+"""
+import os
+import sys
+import tempfile
+import time
+
+from common import fill_app, load_app
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    app = load_app()
+    app.JOURNAL_COMPACT_EVERY = float("inf")  # mede só o append, sem compactação no meio
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        print(f"{'orders':>10} {'full rewrite (ms)':>18} {'journal (ms)':>14} {'speedup':>9}")
+        for n in sizes:
+            fill_app(app, n)
+            order = app.orders_tree.search(app.orders_tree.root, n // 2)
+
+            rewrite = time_per_call(app.save_data, repeat=3)
+            journal = time_per_call(lambda: app.log_change("all_orders", order), repeat=1000)
+            os.remove(app.JOURNAL_FILE)
+
+            print(f"{n:>10} {rewrite * 1e3:>18.2f} {journal * 1e3:>14.4f} {rewrite / journal:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
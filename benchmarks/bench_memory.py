@@ -0,0 +1,58 @@
+"""Bytes por pedido em memória: dicts + Node com __dict__ (antes) x registros/Node com __slots__ (agora).
+
+Cada pedido passa por json.dumps/json.loads, como acontece ao carregar o dados.json,
+para que as strings não fiquem compartilhadas entre as cópias.
+
+Uso: python benchmarks/bench_memory.py [n_pedidos]   (padrão: 1000000)
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from common import load_app, make_catalog, make_orders
+
+app = load_app()
+
+
+class DictNode:
+    """Node como era antes: objeto comum, com __dict__."""
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.height = 1
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def retained_bytes(n, to_record, node_cls):
+    catalog = make_catalog(100)
+    gc.collect()
+    tracemalloc.start()
+    app.Node = node_cls  # AVLTree.insert cria os nós pelo nome global do módulo
+    tree = app.AVLTree()
+    for data in make_orders(n, catalog):
+        record = to_record(json.loads(json.dumps(data)))
+        tree.root = tree.insert(tree.root, data["code"], record)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    slotted_node = app.Node
+    before = retained_bytes(n, lambda data: data, DictNode)
+    after = retained_bytes(n, app.Order.from_dict, slotted_node)
+    app.Node = slotted_node
+
+    print(f"{n} orders")
+    print(f"  before (dicts, Node with __dict__): {before / n:8.0f} bytes/order  ({before / 2**20:.0f} MB)")
+    print(f"  after  (slotted records and Node) : {after / n:8.0f} bytes/order  ({after / 2**20:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Cache de renderização das listagens: tempo e escritas no terminal com o cache ligado e desligado.
+
+Lista n itens como na escolha de itens ao montar um pedido (lista inteira) e como em View All Items
+(página a página, Enter em todas). O terminal é simulado por um stdout com buffer de linha, como o de um tty,
+que conta as escritas que chegariam ao sistema operacional. "print por linha" é a listagem antiga, um print por campo.
+
+Uso: python benchmarks/bench_render.py [n_itens]   (padrão: 100000)
+"""
+import builtins
+import io
+import sys
+import time
+
+from common import load_app, make_catalog
+
+
+class CountingTerminal(io.RawIOBase):
+    """Destino das escritas do stdout simulado; conta as chamadas write (uma por syscall num tty de verdade)"""
+    def __init__(self):
+        self.writes = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.writes += 1
+        return len(data)
+
+
+def listed(fn):
+    """Roda fn com o stdout trocado pelo terminal simulado; retorna (segundos, escritas)"""
+    terminal = CountingTerminal()
+    stdout = sys.stdout
+    sys.stdout = io.TextIOWrapper(terminal, encoding="utf-8", line_buffering=True)
+    start = time.perf_counter()
+    try:
+        fn()
+        sys.stdout.flush()
+    finally:
+        elapsed = time.perf_counter() - start
+        sys.stdout = stdout
+    return elapsed, terminal.writes
+
+
+def print_per_line(items):
+    for item in items:
+        print(f"📦 Code: {item.code}")
+        print(f"📝 Name: {item.name}")
+        print(f"🖊️ Description: {item.description}")
+        print(f"💰 Price: R${item.price:.2f}")
+        print(f"📦 Stock: {item.stock}")
+        print("-" * 40)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = load_app()
+    app.catalog_tree = app.AVLTree.from_sorted((item["code"], app.Item.from_dict(item)) for item in make_catalog(n))
+    service = app.OrderService(app.store)
+    builtins.input = lambda prompt="": "" # Enter em todas as páginas
+
+    def choice_list():
+        app.write_blocks(app.item_choices.block(item) for item in service.all_items())
+
+    def view_all():
+        app.paginate(service.list_items, service.count_items(), lambda item, position: app.item_cards.block(item))
+
+    rows = [("choice list", "print per line", *listed(lambda: print_per_line(service.all_items())))]
+    for name, fn in (("choice list", choice_list), ("view all items", view_all)):
+        app.RENDER_CACHE = False
+        rows.append((name, "cache off", *listed(fn)))
+        app.RENDER_CACHE = True
+        rows.append((name, "cache on (1st visit)", *listed(fn)))
+        rows.append((name, "cache on (next visits)", *listed(fn)))
+
+    print(f"{n} items")
+    print(f"{'listing':>15} {'mode':>23} {'time (s)':>9} {'writes':>9}")
+    for listing, mode, elapsed, writes in rows:
+        print(f"{listing:>15} {mode:>23} {elapsed:>9.3f} {writes:>9,}")
+
+
+if __name__ == "__main__":
+    main()
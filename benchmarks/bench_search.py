@@ -0,0 +1,54 @@
+"""Busca de itens por nome/descrição (ItemSearchIndex): montagem do índice, latência das buscas e das atualizações.
+
+Catálogo do datagen.py com n itens (nomes e descrições com acento). Cada busca roda várias vezes e mostra
+a mediana e o p99 em microssegundos; "scan" é a alternativa sem índice, comparando o texto de todos os itens.
+
+Uso: python benchmarks/bench_search.py [n_itens]   (padrão: 100000)
+"""
+import statistics
+import sys
+import time
+
+import datagen
+from common import load_app
+
+QUERIES = ("acai", "Açaí 77", "hamb", "pizza da casa", "batata frita 1234", "p", "inexistente")
+RUNS = 200
+
+
+def timings(fn, runs=RUNS):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return result, statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = load_app()
+    items = [app.Item.from_dict(data) for data in datagen.catalog(n)]
+
+    start = time.perf_counter()
+    index = app.ItemSearchIndex()
+    index.rebuild(items)
+    build_time = time.perf_counter() - start
+
+    print(f"{n} items, index built in {build_time:.2f}s ({len(index.vocabulary):,} distinct words)")
+    print(f"{'query':>20} {'matches':>8} {'p50 (µs)':>10} {'p99 (µs)':>10} {'scan p50 (µs)':>14}")
+    for query in QUERIES:
+        found, p50, p99 = timings(lambda: index.search(query))
+        key = app.search_key(query)
+        _, scan, _ = timings(lambda: [i for i in items if key in app.search_key(i.name + " " + i.description)][:app.SEARCH_LIMIT], runs=3)
+        print(f"{query:>20} {len(found):>8} {p50:>10.1f} {p99:>10.1f} {scan:>14,.0f}")
+
+    item = items[n // 2]
+    names = ("Hambúrguer Duplo", "Pizza Especial")
+    _, p50, p99 = timings(lambda: (setattr(item, "name", names[item.name == names[0]]), index.add(item)))
+    print(f"{'rename (update_name)':>20} {'':>8} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
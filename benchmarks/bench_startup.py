@@ -0,0 +1,54 @@
+"""Tempo de carga do dados.json: inserções uma a uma (como antes) x AVLTree.from_sorted (load_data atual).
+
+Uso: python benchmarks/bench_startup.py [n_pedidos]   (padrão: 1000000)
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from common import fill_app, load_app
+
+
+def load_with_inserts(app):
+    """Como o load_data montava as árvores antes: uma inserção (com rebalanceamento) por registro."""
+    with open(app.DATA_FILE, encoding="utf-8") as arq:
+        dados = json.load(arq)
+    for key in ("catalog", "all_orders"):
+        tree = app.AVLTree()
+        for record in dados[key]:
+            tree.root = tree.insert(tree.root, record["code"], record)
+    return tree
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app = load_app()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        fill_app(app, n)
+        app.save_data()
+        size_mb = os.path.getsize(app.DATA_FILE) / 2**20
+
+        json_only = timed(lambda: json.load(open(app.DATA_FILE, encoding="utf-8")))
+        before = timed(lambda: load_with_inserts(app))
+        with contextlib.redirect_stdout(io.StringIO()):
+            after = timed(app.load_data)
+
+    print(f"{n} orders, dados.json = {size_mb:.0f} MB (json.load alone: {json_only:.2f}s)")
+    print(f"  before (n inserts)  : {before:.2f}s  (trees: {before - json_only:.2f}s)")
+    print(f"  after  (from_sorted): {after:.2f}s  (trees + indexes: {after - json_only:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
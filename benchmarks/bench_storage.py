@@ -0,0 +1,111 @@
+"""Backends de armazenamento: MemoryStore (AVL + dados.json + log) x SqliteStore (dados.db, WAL).
+
+Os dois partem do mesmo dados.json e rodam a mesma carga pela interface Store, como os menus:
+criação de pedidos com baixa de estoque, aceite/andamento dos pedidos, filtros por status,
+relatórios de vendas e ajustes de estoque. O tempo de cada fase é medido separadamente.
+
+Uso: python benchmarks/bench_storage.py [n_pedidos] [n_operações]   (padrão: 50000 2000)
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import fill_app, load_app
+
+
+def timed(results, phase, fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    results[phase] = time.perf_counter() - start
+
+
+def workload(app, store, n_ops, seed=7):
+    """Roda a carga no store e retorna {fase: segundos}"""
+    rng = random.Random(seed)
+    results = {}
+    timed(results, "load", store.load)
+    n_items = store.count_items()
+
+    def create_orders():
+        for _ in range(n_ops):
+            lines = []
+            for code in rng.sample(range(1, n_items + 1), 2):
+                item = store.get_item(code)
+                try:
+                    store.change_stock(item, -1)
+                except ValueError:
+                    continue # Sem estoque: o item fica fora do pedido
+                lines.append(app.OrderLine(item.code, item.price, 1, item.name))
+            if not lines:
+                continue
+            phone = f"8{rng.randrange(n_ops):08d}"
+            costumer, _ = store.get_or_create_costumer(f"Cliente {phone}", phone)
+            store.add_order(app.create_order(store.next_order_code(), costumer, lines))
+
+    def move_orders():
+        store.accept_next_orders(n_ops // 2)
+        for order in store.orders_with_status("Accepted")[:n_ops // 4]:
+            store.set_order_status(order, "Ready")
+        store.dispatch_ready_orders()
+
+    def status_filters():
+        for status in ("Pending", "Accepted", "Making", "Ready", "Waiting Delivery", "Delivering"):
+            store.orders_with_status(status)
+            store.count_status(status)
+
+    def reports():
+        store.sales_count()
+        store.sales_revenue()
+        store.sales_count("Delivered")
+        store.sales_revenue("Delivered")
+        for name in ("status", "costumer", "item", "day", "hour"):
+            store.sales_by(name)
+
+    def stock_updates():
+        for _ in range(n_ops):
+            store.change_stock(store.get_item(rng.randint(1, n_items)), 1)
+
+    timed(results, "create orders", create_orders)
+    timed(results, "move orders", move_orders)
+    timed(results, "status filters", status_filters)
+    timed(results, "reports", reports)
+    timed(results, "stock updates", stock_updates)
+    timed(results, "close", store.close)
+    return results
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        writer = load_app()
+        fill_app(writer, n)
+        writer.save_data()
+        del writer
+
+        for name in ("memory", "sqlite"):
+            app = load_app()
+            store = app.SqliteStore() if name == "sqlite" else app.MemoryStore()
+            app.store = store
+            if name == "sqlite":
+                # Importação inicial fora da medida: o que interessa é abrir um banco já existente
+                with contextlib.redirect_stdout(io.StringIO()):
+                    store.load()
+                store.close()
+            runs[name] = workload(app, store, n_ops)
+
+    print(f"{n} orders, {n_ops} operations per phase (seconds)")
+    print(f"{'phase':>16} {'memory':>9} {'sqlite':>9}")
+    for phase in runs["memory"]:
+        print(f"{phase:>16} {runs['memory'][phase]:>9.3f} {runs['sqlite'][phase]:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Utilitários compartilhados pelos benchmarks.
+
+O app é um script (tia-lu-food-app-dados.py), então é carregado pelo caminho do arquivo.
+"""
+import importlib.util
+import os
+import random
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tia-lu-food-app-dados.py")
+
+STATUSES = ["Pending", "Accepted", "Making", "Ready", "Waiting Delivery", "Delivering", "Delivered", "Canceled", "Rejected"]
+
+
+def load_app():
+    """Importa o script do app como módulo (sem abrir o menu)."""
+    spec = importlib.util.spec_from_file_location("tia_lu_app", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    return app
+
+
+def make_catalog(n_items, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            "code": code,
+            "name": f"Item {code}",
+            "description": f"Descrição do item {code}",
+            "price": round(rng.uniform(3, 60), 2),
+            "stock": rng.randint(10, 500),
+        }
+        for code in range(1, n_items + 1)
+    ]
+
+
+def make_orders(n_orders, catalog, seed=42):
+    """Gera pedidos no mesmo formato que o menu grava no dados.json."""
+    rng = random.Random(seed)
+    for code in range(1, n_orders + 1):
+        lines = []
+        for item in rng.sample(catalog, rng.randint(1, 4)):
+            line = item.copy()
+            line["quantity"] = 1
+            lines.append(line)
+        yield {
+            "code": code,
+            "costumer": {"code": code, "name": f"Cliente {code}", "cellphone": f"9{code:08d}"},
+            "items_order": lines,
+            "status": rng.choice(STATUSES),
+            "payment": "Paid",
+            "order_total_price": round(sum(line["price"] for line in lines), 2),
+        }
+
+
+def fill_app(app, n_orders, n_items=100):
+    """Monta as árvores e a lista de clientes do app com dados sintéticos."""
+    catalog = make_catalog(n_items)
+    app.catalog_tree = app.AVLTree()
+    for item in catalog:
+        app.catalog_tree.root = app.catalog_tree.insert(app.catalog_tree.root, item["code"], app.Item.from_dict(item))
+    app.orders_tree = app.AVLTree()
+    app.costumers = app.CostumerRegistry()
+    for data in make_orders(n_orders, catalog):
+        order = app.Order.from_dict(data)
+        order.costumer = app.costumers.add(order.costumer)
+        app.orders_tree.root = app.orders_tree.insert(app.orders_tree.root, order.code, order)
+    return catalog
@@ -0,0 +1,143 @@
+"""Gerador de dados sintéticos (com semente): catálogo, clientes e pedidos com uma mistura realista de status.
+
+Diferente do make_orders do common.py (status sorteados por igual, um cliente por pedido), aqui:
+  - a maior parte do histórico já está entregue e só alguns por cento dos pedidos estão em andamento (STATUS_MIX);
+  - clientes voltam a pedir (30% dos pedidos vêm de 5% dos clientes);
+  - cada pedido tem 1 a 5 itens, os mais populares saem mais, com quantidades de 1 a 3;
+  - created_at cobre os DAYS dias até END, com picos no almoço e no jantar, em ordem crescente de código.
+Os pedidos são gerados um por vez, então dá para escrever 10M pedidos sem guardá-los.
+
+Uso: python benchmarks/datagen.py n_pedidos [--seed 42] [--jsonl pedidos.jsonl]
+     Sem --jsonl, grava o dados.json (no diretório atual) já no formato do app.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from common import load_app
+
+# Participação de cada status no histórico (soma 1)
+STATUS_MIX = {
+    "Delivered": 0.86,
+    "Canceled": 0.05,
+    "Rejected": 0.02,
+    "Pending": 0.015,
+    "Accepted": 0.01,
+    "Making": 0.015,
+    "Ready": 0.01,
+    "Waiting Delivery": 0.005,
+    "Delivering": 0.015,
+}
+# Pesos das horas do dia (10h às 23h): picos no almoço e no jantar
+HOUR_WEIGHTS = {10: 1, 11: 4, 12: 9, 13: 7, 14: 2, 15: 1, 16: 1, 17: 2, 18: 5, 19: 9, 20: 10, 21: 6, 22: 3, 23: 1}
+DAYS = 365
+END = datetime(2025, 1, 1)
+FOODS = ["Hamburguer", "Pizza", "Batata Frita", "Milkshake", "Refrigerante", "Salada", "Wrap", "Açaí", "Pastel", "Suco"]
+NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabi", "Hugo", "Iara", "João", "Karen", "Lucas", "Marina", "Nina"]
+
+
+def sizes(n_orders, n_items=None, n_costumers=None):
+    """Tamanhos padrão do catálogo e da base de clientes para n_orders pedidos"""
+    return n_items or max(50, min(2000, n_orders // 1000)), n_costumers or max(10, n_orders // 8)
+
+
+def catalog(n_items, seed=42):
+    rng = random.Random(seed)
+    for code in range(1, n_items + 1):
+        food = FOODS[code % len(FOODS)]
+        yield {"code": code, "name": f"{food} {code}", "description": f"{food} da casa nº {code}",
+               "price": round(rng.uniform(4, 70), 2), "stock": rng.randint(50, 5000)}
+
+
+def costumer(code):
+    return {"code": code, "name": f"{NAMES[code % len(NAMES)]} {code}", "cellphone": f"9{code:08d}"}
+
+
+def costumers(n_costumers):
+    for code in range(1, n_costumers + 1):
+        yield costumer(code)
+
+
+def orders(n_orders, items, n_costumers, seed=42):
+    """Gera os pedidos (dicionários no formato do dados.json). items é a lista do catalog()."""
+    rng = random.Random(seed + 2)
+    statuses, status_weights = list(STATUS_MIX), list(STATUS_MIX.values())
+    hours, hour_weights = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+    item_weights = [1 / rank for rank in range(1, len(items) + 1)] # Poucos itens concentram as vendas
+    start = END - timedelta(days=DAYS)
+    for code in range(1, n_orders + 1):
+        # Dias avançam com o código; a hora segue o movimento do dia
+        day = start + timedelta(days=DAYS * (code - 1) // n_orders)
+        created = day.replace(hour=rng.choices(hours, hour_weights)[0], minute=rng.randrange(60), second=rng.randrange(60))
+        # 30% dos pedidos vêm dos clientes fiéis (os 5% primeiros códigos)
+        costumer_code = rng.randint(1, max(1, n_costumers // 20)) if rng.random() < 0.3 else rng.randint(1, n_costumers)
+        lines = []
+        for item in rng.choices(items, item_weights, k=rng.choice((1, 1, 2, 2, 2, 3, 3, 4, 5))):
+            lines.append({"code": item["code"], "name": item["name"], "price": item["price"], "quantity": rng.choice((1, 1, 1, 2, 2, 3))})
+        yield {
+            "code": code,
+            "costumer": costumer(costumer_code),
+            "items_order": lines,
+            "status": rng.choices(statuses, status_weights)[0],
+            "payment": "Paid",
+            "order_total_price": round(sum(line["price"] * line["quantity"] for line in lines), 2),
+            "created_at": created.isoformat(timespec="seconds"),
+        }
+
+
+def fill(app, n_orders, n_items=None, n_costumers=None, seed=42):
+    """Monta árvores, índices, clientes e agregados do app com os dados gerados (como o load_data deixaria)."""
+    n_items, n_costumers = sizes(n_orders, n_items, n_costumers)
+    items = list(catalog(n_items, seed))
+    app.catalog_tree = app.AVLTree.from_sorted((item["code"], app.Item.from_dict(item)) for item in items)
+    app.costumers = app.CostumerRegistry()
+    for data in costumers(n_costumers):
+        app.costumers.add(app.Costumer.from_dict(data))
+    records = []
+    for data in orders(n_orders, items, n_costumers, seed):
+        order = app.Order.from_dict(data)
+        order.costumer = app.costumers.add(order.costumer)
+        records.append((order.code, order))
+    app.orders_tree = app.AVLTree.from_sorted(records)
+    app.orders_by_status = {}
+    app.orders_by_costumer = {}
+    app.order_pipeline = app.OrderPipeline()
+    app.sales_stats = app.SalesStats()
+    for _, order in records:
+        app.index_order(order)
+        app.sales_stats.add(order)
+    app.code_allocator = app.CodeAllocator()
+    app.code_allocator.recover("catalog", app.catalog_tree)
+    app.code_allocator.recover("all_orders", app.orders_tree)
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic catalog, costumers and orders")
+    parser.add_argument("orders", type=int)
+    parser.add_argument("--items", type=int)
+    parser.add_argument("--costumers", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jsonl", metavar="FILE", help="stream the orders to a JSON Lines file (for the import subcommand) instead of writing dados.json")
+    args = parser.parse_args()
+
+    if args.jsonl:
+        n_items, n_costumers = sizes(args.orders, args.items, args.costumers)
+        items = list(catalog(n_items, args.seed))
+        with open(args.jsonl, "w", encoding="utf-8") as arq:
+            for order in orders(args.orders, items, n_costumers, args.seed):
+                arq.write(json.dumps(order, ensure_ascii=False) + "\n")
+        with open(args.jsonl.rsplit(".", 1)[0] + "-items.jsonl", "w", encoding="utf-8") as arq:
+            for item in items:
+                arq.write(json.dumps(item, ensure_ascii=False) + "\n")
+        print(f"{args.orders} orders written to {args.jsonl} (catalog: {n_items} items)")
+    else:
+        app = load_app()
+        fill(app, args.orders, args.items, args.costumers, args.seed)
+        app.save_data()
+        print(f"{app.DATA_FILE}: {len(app.orders_tree)} orders, {len(app.catalog_tree)} items, {len(app.costumers)} costumers")
+
+
+if __name__ == "__main__":
+    main()
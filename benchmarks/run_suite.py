@@ -0,0 +1,216 @@
+"""Suíte de benchmarks: cargas roteirizadas sobre dados do datagen.py, resultados em JSON.
+
+Para cada tamanho (pedidos), gera os dados com semente fixa e mede cada carga --repeat vezes:
+  avl_insert        n inserções (chaves embaralhadas) numa AVLTree nova
+  avl_search        100 mil buscas de códigos de pedido sorteados
+  avl_inorder       percurso em ordem (list) da árvore de pedidos inteira
+  orders_by_status  get_orders_by_status de cada status
+  save_data         snapshot completo (dados.json)
+  load_data         carga do dados.json (árvores, índices e agregados)
+  create_order      1000 pedidos pelo OrderService (reserva, baixa de estoque, log; gravador de snapshot rodando)
+  sales_report      relatório de vendas completo (agregados)
+  check_sales       recálculo completo dos agregados a partir dos pedidos
+
+O JSON guarda, por carga e tamanho, os tempos de cada repetição, o melhor tempo e operações/s.
+Com --instrument, roda com a instrumentação ligada (para medir o custo dela) e guarda as métricas no JSON.
+Com --compare, confronta com um resultado anterior e sai com código 1 se alguma carga ficou mais lenta que --threshold.
+
+Uso: python benchmarks/run_suite.py [--sizes 10000 100000] [--repeat 3] [--out resultados.json] [--only avl_search ...]
+     python benchmarks/run_suite.py --compare antes.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import datagen
+from common import APP_PATH, load_app
+
+SEARCHES = 100_000
+NEW_ORDERS = 1000
+
+
+def avl_insert(ctx):
+    keys = list(range(1, ctx["n"] + 1))
+    random.Random(ctx["seed"]).shuffle(keys)
+    tree = ctx["app"].AVLTree()
+    for key in keys:
+        tree.root = tree.insert(tree.root, key, key)
+    return len(keys)
+
+
+def avl_search(ctx):
+    tree = ctx["app"].orders_tree
+    rng = random.Random(ctx["seed"])
+    for _ in range(SEARCHES):
+        tree.search(tree.root, rng.randint(1, ctx["n"]))
+    return SEARCHES
+
+
+def avl_inorder(ctx):
+    tree = ctx["app"].orders_tree
+    return len(list(tree))
+
+
+def orders_by_status(ctx):
+    statuses = ctx["app"].ORDER_STATUSES
+    for status in statuses:
+        ctx["app"].get_orders_by_status(status)
+    return len(statuses)
+
+
+def save_data(ctx):
+    ctx["app"].save_data()
+    return ctx["n"]
+
+
+def load_data(ctx):
+    ctx["app"].load_data()
+    return ctx["n"]
+
+
+def create_order(ctx):
+    service, items = ctx["service"], ctx["items"]
+    rng = random.Random(ctx["seed"])
+    for _ in range(NEW_ORDERS):
+        lines = [(item["code"], 1) for item in rng.sample(items, rng.randint(1, 3))]
+        phone = f"8{rng.randrange(ctx['n']):08d}"
+        try:
+            service.create_order(phone, f"Cliente {phone}", lines)
+        except ValueError: # Sem estoque: o pedido é recusado, como no menu
+            pass
+    return NEW_ORDERS
+
+
+def sales_report(ctx):
+    for _ in range(100):
+        ctx["service"].sales_report()
+    return 100
+
+
+def check_sales(ctx):
+    problems = ctx["service"].check_sales()
+    assert not problems, problems[:5]
+    return ctx["n"]
+
+
+# Na ordem em que rodam: load_data precisa do save_data; create_order muda os dados, por isso vem depois das leituras
+WORKLOADS = {fn.__name__: fn for fn in (avl_insert, avl_search, avl_inorder, orders_by_status, save_data, load_data,
+                                        sales_report, check_sales, create_order)}
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(APP_PATH),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(n, names, repeat, seed, instrument=False):
+    """Gera os dados de n pedidos num diretório temporário e roda as cargas.
+    Retorna a lista de resultados e o relatório da instrumentação (None se desligada)."""
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            app = load_app()
+            items = datagen.fill(app, n, seed=seed)
+            app.save_data()
+            service = app.OrderService(app.store)
+            if instrument:
+                app.instrumentation.enable()
+            ctx = {"app": app, "service": service, "items": items, "n": n, "seed": seed}
+            for name in names:
+                if name == "create_order":
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        app.store.load() # Como no app: gravador de snapshot em segundo plano
+                times = []
+                for _ in range(repeat):
+                    gc.collect()
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        ops = WORKLOADS[name](ctx)
+                    times.append(time.perf_counter() - start)
+                best = min(times)
+                results.append({"workload": name, "size": n, "ops": ops, "times": times, "best": best, "ops_per_sec": ops / best})
+                print(f"{n:>10} {name:>17} {best:>9.4f}s {ops / best:>14,.0f} ops/s", file=sys.stderr)
+            if "create_order" in names:
+                app.store.close()
+            diagnostics = app.instrumentation.report() if instrument else None
+        finally:
+            os.chdir(cwd)
+    return results, diagnostics
+
+
+def compare(old, new, threshold):
+    """Imprime a variação do melhor tempo de cada carga; retorna quantas ficaram mais lentas que threshold"""
+    before = {(r["workload"], r["size"]): r for r in old["results"]}
+    slower = 0
+    print(f"{'size':>10} {'workload':>17} {'before (s)':>11} {'after (s)':>10} {'change':>8}")
+    for result in new["results"]:
+        previous = before.get((result["workload"], result["size"]))
+        if previous is None:
+            continue
+        change = result["best"] / previous["best"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠️ slower"
+            slower += 1
+        print(f"{result['size']:>10} {result['workload']:>17} {previous['best']:>11.4f} {result['best']:>10.4f} {change:>+8.1%}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write the results as JSON")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="number of orders (10k to 10M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=list(WORKLOADS), help="run only these workloads")
+    parser.add_argument("--out", default="resultados.json", help="results file (default resultados.json)")
+    parser.add_argument("--instrument", action="store_true", help="run with the hot-path instrumentation on")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+    out = os.path.abspath(args.out)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as arq:
+            baseline = json.load(arq)
+
+    names = [name for name in WORKLOADS if not args.only or name in args.only]
+    report = {
+        "version": git_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "instrument": args.instrument,
+        "results": [],
+    }
+    for n in args.sizes:
+        results, diagnostics = run_size(n, names, args.repeat, args.seed, args.instrument)
+        report["results"].extend(results)
+        if diagnostics:
+            report.setdefault("diagnostics", {})[str(n)] = diagnostics["metrics"]
+    with open(out, "w", encoding="utf-8") as arq:
+        json.dump(report, arq, indent=2)
+    print(f"results written to {out}", file=sys.stderr)
+
+    if baseline is not None and compare(baseline, report, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Teste de carga das reservas de estoque: N threads montando pedidos aleatórios contra um estoque pequeno.
+
+Cada thread abre carrinhos, reserva de 1 a 3 itens (1 a 2 unidades cada) e então finaliza o pedido,
+desiste do carrinho ou simplesmente o abandona (para o vencimento devolver a reserva).
+No fim confere que não houve venda acima do estoque: para cada item,
+estoque inicial - estoque final == unidades nos pedidos registrados, estoque final >= 0 e nada ficou reservado.
+
+Uso: python benchmarks/stress_reservations.py [threads] [carrinhos_por_thread] [memory|sqlite]   (padrão: 16 500 memory)
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from common import load_app
+
+N_ITEMS = 8
+STOCK = 60 # Unidades por item: bem menos do que as threads tentam levar
+
+
+def worker(service, seed, n_carts, counters, lock):
+    rng = random.Random(seed)
+    reserved = committed = rejected = 0
+    for i in range(n_carts):
+        cart = service.open_cart()
+        lines = [(code, rng.randint(1, 2)) for code in rng.sample(range(1, N_ITEMS + 1), rng.randint(1, 3))]
+        try:
+            service.reserve(cart, lines)
+            reserved += 1
+        except ValueError:
+            rejected += 1
+            service.release_cart(cart)
+            continue
+        action = rng.random()
+        if action < 0.7:
+            service.checkout(cart, f"9{seed:04d}{i % 10}", f"Cliente {seed}")
+            committed += 1
+        elif action < 0.9:
+            service.release_cart(cart)
+        # else: carrinho abandonado, devolvido pelo vencimento
+    with lock:
+        counters["reserved"] += reserved
+        counters["committed"] += committed
+        counters["rejected"] += rejected
+
+
+def main():
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    n_carts = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    backend = sys.argv[3] if len(sys.argv) > 3 else "memory"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        app = load_app()
+        store = app.SqliteStore() if backend == "sqlite" else app.MemoryStore()
+        app.store = store
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.load()
+        service = app.OrderService(store)
+        service.reservations.ttl = 0.5 # Carrinhos abandonados vencem logo
+        for code in range(1, N_ITEMS + 1):
+            service.create_item(f"Item {code}", "", 10.0, STOCK)
+
+        counters = {"reserved": 0, "committed": 0, "rejected": 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=worker, args=(service, seed, n_carts, counters, lock)) for seed in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        time.sleep(service.reservations.ttl)
+        service.reservations.expire(force=True)
+
+        sold = {}
+        for order in store.orders_with_status("Pending"):
+            for line in order.items_order:
+                sold[line.code] = sold.get(line.code, 0) + line.quantity
+        for code in range(1, N_ITEMS + 1):
+            stock = store.get_item(code).stock
+            assert stock >= 0, f"item {code}: negative stock {stock}"
+            assert STOCK - stock == sold.get(code, 0), f"item {code}: {STOCK - stock} units taken, {sold.get(code, 0)} sold"
+            assert service.reservations.held.get(code, 0) == 0, f"item {code}: {service.reservations.held[code]} units still held"
+        assert not service.reservations.carts
+        store.close()
+
+    attempts = counters["reserved"] + counters["rejected"]
+    print(f"{backend}: {n_threads} threads x {n_carts} carts, {N_ITEMS} items x {STOCK} units")
+    print(f"{attempts} reservation attempts in {elapsed:.2f}s ({attempts / elapsed:,.0f}/s): "
+          f"{counters['reserved']} reserved, {counters['rejected']} refused for lack of stock, {counters['committed']} orders")
+    print(f"✅ no oversell: {sum(sold.values())} units sold of {N_ITEMS * STOCK}")
+
+
+if __name__ == "__main__":
+    main()
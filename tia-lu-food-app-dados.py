@@ -1,273 +1,3821 @@
+import argparse
+import asyncio
+import cProfile
+import csv
+import heapq
+import inspect
+import io
 import json
+import mmap
+import os
+import pstats
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import numpy as np # Opcional: com ele, os relatórios em colunas (Sales analytics) são vetorizados
+except ImportError:
+    np = None
+
+DATA_FILE = "dados.json"        # Snapshot completo (formato original)
+JOURNAL_FILE = "dados.journal"  # Log append-only: uma linha JSON por mutação
+JOURNAL_OLD_FILE = JOURNAL_FILE + ".old" # Log já fechado, esperando o snapshot em andamento ser gravado
+BINARY_FILE = "dados.bin"       # Snapshot binário alternativo (--binary)
+SNAPSHOT_FORMAT = "json"        # "json" (dados.json) ou "binary" (dados.bin)
+SQLITE_FILE = "dados.db"        # Banco do backend SQLite (--store sqlite)
+JOURNAL_COMPACT_EVERY = 500     # Registros no log antes de compactar no snapshot
+SNAPSHOT_DELAY = 0.2            # Segundos que o gravador espera para juntar uma rajada de mudanças num snapshot só
+ARCHIVE_DIR = "arquivo"         # Pedidos encerrados arquivados, um arquivo por mês de criação
+ARCHIVE_AFTER_DAYS = 30         # Idade mínima (dias) de um pedido encerrado para ser arquivado
+PAGE_SIZE = 10                  # Registros por página nas listagens
 #-----------------------------------------------AVL classes-------------------------------------------------#
+UNLOADED = object() # Valor de nó ainda não lido do snapshot binário (ver AVLTree.loader)
+
 class Node:
+    __slots__ = ("key", "value", "height", "size", "left", "right") # Sem __dict__ por nó
+
     def __init__(self, key, value):
-        self.key = key       # Ex: item['code']. Usado para comparação.
-        self.value = value   # O dicionário completo do Item/Pedido.
+        self.key = key       # Ex: item.code. Usado para comparação.
+        self.value = value   # O registro completo (Item/Order).
         self.height = 1      # Altura do nó.
+        self.size = 1        # Quantidade de nós na subárvore (inclui o próprio nó).
         self.left = None     # Filho esquerdo.
         self.right = None    # Filho direito.
 
-class AVLTree:
-    def __init__(self):
-        self.root = None # A raiz da árvore
+class AVLTree:
+    def __init__(self):
+        self.root = None   # A raiz da árvore
+        self.loader = None # Função chave -> valor, usada para os nós com valor UNLOADED (carga preguiçosa)
+
+    def __len__(self):
+        return self._get_size(self.root) # O(1): a raiz guarda o tamanho da árvore
+    
+    def _get_height(self, node):
+        if not node:
+            return 0
+        return node.height
+
+    def _value(self, node):
+        """Valor do nó. Se ainda não foi lido (UNLOADED), lê agora pelo loader e guarda no nó"""
+        if node.value is UNLOADED:
+            node.value = self.loader(node.key)
+        return node.value
+
+    def _get_size(self, node):
+        if not node:
+            return 0
+        return node.size
+
+    def _get_balance(self, node):
+        if not node:
+            return 0
+        return self._get_height(node.left) - self._get_height(node.right)
+
+    def _update_height(self, node):
+        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        node.size = 1 + self._get_size(node.left) + self._get_size(node.right)
+
+    # --- Rotations ---
+    def _rotate_right(self, z):
+        y = z.left
+        T3 = y.right
+        y.right = z
+        z.left = T3
+        self._update_height(z)
+        self._update_height(y)
+        return y
+
+    def _rotate_left(self, z):
+        y = z.right
+        T2 = y.left
+        y.left = z
+        z.right = T2
+        self._update_height(z)
+        self._update_height(y)
+        return y
+
+    # --- Rebalance ---
+    def _rebalance(self, node):
+        """Aplica a rotação necessária em node (já com altura atualizada) e retorna a nova raiz da subárvore"""
+        balance = self._get_balance(node)
+
+        # 4 Casos de Rotação
+        if balance > 1: # Desbalanceamento à esquerda
+            if self._get_balance(node.left) < 0: # Esquerda-Direita
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node) # Esquerda-Esquerda
+        
+        if balance < -1: # Desbalanceamento à direita
+            if self._get_balance(node.right) > 0: # Direita-Esquerda
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node) # Direita-Direita
+
+        return node
+
+    # --- Insert (iterativo) ---
+    def insert(self, root, key, value):
+        # Desce até a posição de inserção guardando o caminho
+        path = []
+        node = root
+        while node:
+            if key < node.key:
+                path.append(node)
+                node = node.left
+            elif key > node.key:
+                path.append(node)
+                node = node.right
+            else:
+                # Chaves duplicadas (Códigos de item) não permitidas
+                return root
+
+        new_node = Node(key, value)
+        if not path:
+            return new_node
+        if key < path[-1].key:
+            path[-1].left = new_node
+        else:
+            path[-1].right = new_node
+        return self._retrace(root, path)
+
+    # --- Delete (O(log n), iterativo) ---
+    def delete(self, root, key):
+        """Remove a chave e retorna a nova raiz (mesmo uso do insert). Se a chave não existir, nada muda"""
+        path = []
+        node = root
+        while node and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        if not node:
+            return root
+
+        if node.left and node.right:
+            # Dois filhos: copia o sucessor (menor da subárvore direita) para o nó e remove o sucessor
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            node.key, node.value = successor.key, successor.value
+            node = successor
+
+        child = node.left or node.right # No máximo um filho
+        if not path:
+            return child
+        if path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+        return self._retrace(root, path)
+
+    def _retrace(self, root, path):
+        """Sobe pelo caminho (da raiz até o pai do nó alterado) atualizando alturas/tamanhos e rebalanceando.
+        Retorna a raiz da árvore, que muda se houver rotação nela"""
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            self._update_height(node)
+            subtree = self._rebalance(node)
+            if subtree is not node:
+                if i == 0:
+                    root = subtree
+                elif path[i - 1].left is node:
+                    path[i - 1].left = subtree
+                else:
+                    path[i - 1].right = subtree
+        return root
+    
+    # --- Bulk build ---
+    @classmethod
+    def from_sorted(cls, items):
+        """Monta uma árvore perfeitamente balanceada em O(n) a partir de pares (chave, valor)
+        já em ordem estritamente crescente de chave"""
+        items = list(items)
+        tree = cls()
+
+        def build(lo, hi):
+            if lo > hi:
+                return None
+            mid = (lo + hi) // 2
+            node = Node(*items[mid])
+            node.left = build(lo, mid - 1)
+            node.right = build(mid + 1, hi)
+            tree._update_height(node)
+            return node
+
+        tree.root = build(0, len(items) - 1)
+        return tree
+
+    def _join(self, left, node, right):
+        """Une left < node < right numa AVL só, descendo pela lateral da mais alta: O(diferença de alturas)"""
+        if self._get_height(left) > self._get_height(right) + 1:
+            left.right = self._join(left.right, node, right)
+            self._update_height(left)
+            return self._rebalance(left)
+        if self._get_height(right) > self._get_height(left) + 1:
+            right.left = self._join(left, node, right.left)
+            self._update_height(right)
+            return self._rebalance(right)
+        node.left, node.right = left, right
+        self._update_height(node)
+        return node
+
+    def extend(self, items):
+        """Acrescenta pares (chave, valor) em ordem crescente. Se todas as chaves forem maiores que as da árvore
+        (códigos novos de uma importação), o lote vira uma árvore (from_sorted) e é unido à direita em O(k + log n);
+        senão, cai para inserções uma a uma (chaves repetidas são ignoradas, como no insert)."""
+        items = list(items)
+        if not items:
+            return
+        keys = [key for key, _ in items]
+        top = self.max_key()
+        if (top is None or keys[0] > top) and all(a < b for a, b in zip(keys, keys[1:])):
+            pivot = Node(*items[0])
+            self.root = self._join(self.root, pivot, self.from_sorted(items[1:]).root)
+            return
+        for key, value in items:
+            self.root = self.insert(self.root, key, value)
+
+    # --- Search (O(log n), iterativo) ---
+    def search(self, root, key):
+        node = root
+        while node:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                value = node.value # Retorna o registro (o valor)
+                return value if value is not UNLOADED else self._value(node)
+        return None
+
+    def __contains__(self, key):
+        """Se a chave está na árvore, sem carregar o valor (O(log n))"""
+        node = self.root
+        while node:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return True
+        return False
+
+    # --- Rank and select (O(log n)) ---
+    def select(self, index):
+        """Retorna o valor na posição index (0 = menor chave) ou None se estiver fora da árvore"""
+        if index < 0:
+            return None
+        node = self.root
+        while node:
+            left_size = self._get_size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return self._value(node)
+            else:
+                index -= left_size + 1
+                node = node.right
+        return None
+
+    def rank(self, key):
+        """Retorna a posição (0 = menor chave) que a chave ocupa, ou None se ela não existir"""
+        position = 0
+        node = self.root
+        while node:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                position += self._get_size(node.left) + 1
+                node = node.right
+            else:
+                return position + self._get_size(node.left)
+        return None
+
+    # --- Save and show ---
+    def _iter_nodes(self, root):
+        """Percurso em ordem iterativo (pilha explícita): gera os nós um a um, com memória extra O(log n)"""
+        stack = []
+        node = root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def __iter__(self):
+        """Gera os valores em ordem de chave, sem montar lista"""
+        return (self._value(node) for node in self._iter_nodes(self.root))
+
+    def items(self):
+        """Gera os pares (chave, valor) em ordem de chave"""
+        return ((node.key, self._value(node)) for node in self._iter_nodes(self.root))
+
+    def raw_items(self):
+        """Como items(), mas sem carregar valores preguiçosos (eles vêm como UNLOADED)"""
+        return ((node.key, node.value) for node in self._iter_nodes(self.root))
+
+    # --- Range queries and cursors ---
+    def _iter_nodes_from(self, key, inclusive=True):
+        """Percurso em ordem a partir da primeira chave >= key (> key se inclusive=False).
+        Chegar ao primeiro nó custa O(log n); cada nó seguinte, O(1) amortizado."""
+        stack = []
+        node = self.root
+        while node:
+            if key < node.key or (inclusive and key == node.key):
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
+    def range(self, lo, hi):
+        """Gera os valores com lo <= chave <= hi, em ordem"""
+        for node in self._iter_nodes_from(lo):
+            if node.key > hi:
+                return
+            yield self._value(node)
+
+    def floor(self, key):
+        """Retorna o valor da maior chave <= key ou None"""
+        best = None
+        node = self.root
+        while node:
+            if key < node.key:
+                node = node.left
+            else:
+                best = node
+                node = node.right
+        return self._value(best) if best else None
+
+    def ceiling(self, key):
+        """Retorna o valor da menor chave >= key ou None"""
+        best = None
+        node = self.root
+        while node:
+            if key > node.key:
+                node = node.right
+            else:
+                best = node
+                node = node.left
+        return self._value(best) if best else None
+
+    def max_key(self):
+        """Maior chave da árvore (nó mais à direita, O(log n)) ou None se estiver vazia"""
+        node = self.root
+        if not node:
+            return None
+        while node.right:
+            node = node.right
+        return node.key
+
+    def page(self, after=None, size=PAGE_SIZE):
+        """Cursor: retorna até size valores com chave > after (do início, se after for None)"""
+        if after is None:
+            nodes = self._iter_nodes(self.root)
+        else:
+            nodes = self._iter_nodes_from(after, inclusive=False)
+        return [self._value(node) for node in islice(nodes, size)]
+
+#-----------------------------------------------Records-------------------------------------------------#
+# Registros com __slots__ (sem __dict__ por objeto). to_dict/from_dict mantêm o formato do dados.json.
+@dataclass(slots=True)
+class Item:
+    code: int
+    name: str
+    description: str
+    price: float
+    stock: int
+
+    def to_dict(self):
+        return {"code": self.code, "name": self.name, "description": self.description, "price": self.price, "stock": self.stock}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['code'], data['name'], data['description'], data['price'], data['stock'])
+
+@dataclass(slots=True)
+class Costumer:
+    code: int
+    name: str
+    cellphone: str
+
+    def __str__(self):
+        return f"{self.name} (code {self.code}, cellphone {self.cellphone})"
+
+    def to_dict(self):
+        return {"code": self.code, "name": self.name, "cellphone": self.cellphone}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['code'], data['name'], data['cellphone'])
+
+@dataclass(slots=True)
+class OrderLine:
+    code: int       # Código do item no catálogo
+    price: float    # Preço do item no momento do pedido
+    quantity: int
+    name: str = None # Nome do item no momento do pedido (None nas linhas gravadas antes de ele ser guardado)
+
+    def to_dict(self):
+        # O nome vai junto no JSON para versões anteriores, que mostram as linhas pelo nome
+        return {"code": self.code, "name": self.name, "price": self.price, "quantity": self.quantity}
+
+    @classmethod
+    def from_dict(cls, data):
+        # Linhas antigas trazem uma cópia inteira do item; só código, nome, preço e quantidade interessam
+        return cls(data['code'], data['price'], data['quantity'], data.get('name'))
+
+@dataclass(slots=True)
+class Order:
+    code: int
+    costumer: Costumer
+    items_order: list   # Lista de OrderLine
+    status: str = 'Pending'
+    payment: str = 'Paid'
+    order_total_price: float = 0
+    created_at: str = None  # 'AAAA-MM-DDTHH:MM:SS'; pedidos antigos não têm
+
+    def to_dict(self):
+        return {
+            "code": self.code,
+            "costumer": self.costumer.to_dict(),
+            "items_order": [line.to_dict() for line in self.items_order],
+            "status": self.status,
+            "payment": self.payment,
+            "order_total_price": self.order_total_price,
+            "created_at": self.created_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['code'],
+            Costumer.from_dict(data['costumer']),
+            [OrderLine.from_dict(line) for line in data['items_order']],
+            data['status'],
+            data['payment'],
+            data['order_total_price'],
+            data.get('created_at')
+        )
+
+#-----------------------------------------------Code allocator-------------------------------------------------#
+CODE_ENTITIES = ("catalog", "all_orders", "costumers") # Mesmos nomes das listas do dados.json
+
+class CodeAllocator:
+    """Próximo código de cada entidade em O(1), sem nunca repetir um código.
+
+    Guarda a marca d'água de cada entidade: o maior código já entregue ou visto num registro.
+    Ela só sobe, então códigos com buracos (itens 320, 533, 834...) não causam colisão.
+    Vai junto no snapshot e, na carga, nunca fica abaixo da maior chave de cada árvore (recover)."""
+    def __init__(self, last=None):
+        self.last = dict.fromkeys(CODE_ENTITIES, 0)
+        if last:
+            for entity in CODE_ENTITIES:
+                self.last[entity] = max(self.last[entity], last.get(entity, 0))
+
+    def observe(self, entity, code):
+        """Registra um código que já existe (registro carregado ou importado)"""
+        if code > self.last[entity]:
+            self.last[entity] = code
+
+    def recover(self, entity, tree):
+        """Sobe a marca d'água até a maior chave da árvore (o nó mais à direita)"""
+        self.observe(entity, tree.max_key() or 0)
+
+    def next(self, entity):
+        self.last[entity] += 1
+        return self.last[entity]
+
+    def reserve(self, entity, n):
+        """Reserva um bloco de n códigos seguidos (importação em lote) e o retorna como range"""
+        first = self.last[entity] + 1
+        self.last[entity] += n
+        return range(first, first + n)
+
+    def to_dict(self):
+        return dict(self.last)
+
+#-----------------------------------------------Costumer registry-------------------------------------------------#
+def cellphone_key(cellphone):
+    """Só os dígitos do celular, para que '99988-1234' e '999881234' sejam o mesmo cliente"""
+    return "".join(ch for ch in cellphone if ch.isdigit())
+
+class CostumerRegistry:
+    """Clientes indexados (hash) por código e por celular: busca e deduplicação em O(1)"""
+    def __init__(self):
+        self.by_code = {}
+        self.by_cellphone = {}
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def __iter__(self):
+        return iter(self.by_code.values())
+
+    def get(self, code):
+        return self.by_code.get(code)
+
+    def find_by_cellphone(self, cellphone):
+        return self.by_cellphone.get(cellphone_key(cellphone))
+
+    def add(self, costumer):
+        """Registra o cliente e retorna o registro que vale para ele.
+        Se o celular já estiver cadastrado, retorna o cliente existente (a duplicata é descartada).
+        Se o código já pertencer a outro cliente, o novo recebe o próximo código do code_allocator,
+        e a troca vai para o log (senão cada carga daria a ele um código diferente)."""
+        existing = self.find_by_cellphone(costumer.cellphone)
+        if existing:
+            return existing
+        if costumer.code in self.by_code:
+            costumer.code = code_allocator.next("costumers")
+            log_change("costumers", costumer)
+        else:
+            code_allocator.observe("costumers", costumer.code)
+        self.by_code[costumer.code] = costumer
+        self.by_cellphone[cellphone_key(costumer.cellphone)] = costumer
+        on_undo(lambda: self.remove(costumer))
+        return costumer
+
+    def remove(self, costumer):
+        self.by_code.pop(costumer.code, None)
+        self.by_cellphone.pop(cellphone_key(costumer.cellphone), None)
+
+    def get_or_create(self, name, cellphone):
+        """Retorna (cliente, criado): o cliente com esse celular ou um novo, com o próximo código"""
+        existing = self.find_by_cellphone(cellphone)
+        if existing:
+            return existing, False
+        return self.add(Costumer(code_allocator.next("costumers"), name, cellphone)), True
+
+    def sorted(self):
+        """Clientes em ordem de código (O(n log n))"""
+        return sorted(self.by_code.values(), key=lambda c: c.code)
+
+#-----------------------------------------------Sales aggregates-------------------------------------------------#
+CLOSED_STATUSES = ("Canceled", "Rejected") # Não contam como venda
+
+class SalesStats:
+    """Agregados de vendas atualizados a cada mudança de pedido, para os relatórios saírem em O(1).
+
+    Para mudar um pedido já contabilizado: discard(pedido), altera, add(pedido).
+    Pedidos cancelados ou rejeitados só entram na contagem por status."""
+    def __init__(self):
+        self.by_status = {}    # status -> [pedidos, receita]
+        self.by_costumer = {}  # código do cliente -> [pedidos, receita]
+        self.by_item = {}      # código do item -> [unidades, receita bruta (preço x quantidade)]
+        self.by_day = {}       # 'AAAA-MM-DD' -> [pedidos, receita]
+        self.by_hour = {}      # 'AAAA-MM-DD HH' -> [pedidos, receita]
+
+    def _apply(self, order, sign):
+        total = order.order_total_price
+        bucket = self.by_status.setdefault(order.status, [0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * total
+        if order.status in CLOSED_STATUSES:
+            return
+
+        bucket = self.by_costumer.setdefault(order.costumer.code, [0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * total
+        for line in order.items_order:
+            bucket = self.by_item.setdefault(line.code, [0, 0])
+            bucket[0] += sign * line.quantity
+            bucket[1] += sign * line.price * line.quantity
+        if order.created_at:
+            for buckets, key in ((self.by_day, order.created_at[:10]), (self.by_hour, order.created_at[:13].replace("T", " "))):
+                bucket = buckets.setdefault(key, [0, 0])
+                bucket[0] += sign
+                bucket[1] += sign * total
+
+    def add(self, order):
+        self._apply(order, 1)
+
+    def discard(self, order):
+        self._apply(order, -1)
+
+    def count(self, status=None):
+        """Pedidos com esse status (todos, se None)"""
+        if status is None:
+            return sum(bucket[0] for bucket in self.by_status.values())
+        return self.by_status.get(status, [0, 0])[0]
+
+    def revenue(self, status=None):
+        """Receita dos pedidos com esse status (todos, se None)"""
+        if status is None:
+            return sum(bucket[1] for bucket in self.by_status.values())
+        return self.by_status.get(status, [0, 0])[1]
+
+    def to_dict(self):
+        # Listas [chave, quantidade, receita] para manter as chaves inteiras ao passar pelo JSON
+        return {name: [[key, *bucket] for key, bucket in getattr(self, name).items()]
+                for name in ("by_status", "by_costumer", "by_item", "by_day", "by_hour")}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name, rows in data.items():
+            setattr(stats, name, {key: [count, revenue] for key, count, revenue in rows})
+        return stats
+
+    @classmethod
+    def recompute(cls, orders):
+        """Recalcula tudo do zero percorrendo os pedidos"""
+        stats = cls()
+        for order in orders:
+            stats.add(order)
+        return stats
+
+    def check(self, orders):
+        """Confere os agregados contra um recálculo completo. Retorna a lista de divergências (vazia se ok)"""
+        fresh = SalesStats.recompute(orders)
+        problems = []
+        for name in ("by_status", "by_costumer", "by_item", "by_day", "by_hour"):
+            mine, expected = getattr(self, name), getattr(fresh, name)
+            for key in mine.keys() | expected.keys():
+                a, b = mine.get(key, [0, 0]), expected.get(key, [0, 0])
+                if a[0] != b[0] or abs(a[1] - b[1]) > 0.005:
+                    problems.append(f"{name}[{key!r}]: {a} != {b}")
+        return problems
+
+#----------------------------------------------- Sales analytics (columnar) -------------------------------------------------#
+# Relatórios sobre o histórico inteiro (pedidos nas árvores e arquivados) a partir de colunas: uma array por campo
+# em vez de um objeto por pedido. Com NumPy, os agrupamentos são operações vetorizadas (bincount, percentile);
+# sem ele, as colunas continuam em array.array e os agrupamentos são laços sobre elas.
+ANALYTICS_ENGINE = "numpy" if np is not None else "array"
+ANALYTICS_TOP_ITEMS = 10
+ANALYTICS_PERCENTILES = (50, 90, 99)
+MONTH_KEY = re.compile(r"(\d{4})-(\d{2})")
+
+class SalesColumns:
+    """Pedidos em colunas, montadas numa passada só.
+    Por pedido: code, status (posição em ORDER_STATUSES), costumer, total, gross (soma das linhas, antes do desconto)
+    e month (AAAAMM da criação; 0 sem data). Por linha de pedido: line_order (posição do pedido nas colunas acima),
+    item, quantity e price."""
+    def __init__(self):
+        self.code = array("q")
+        self.status = array("b")
+        self.costumer = array("q")
+        self.total = array("d")
+        self.gross = array("d")
+        self.month = array("q")
+        self.line_order = array("q")
+        self.item = array("q")
+        self.quantity = array("q")
+        self.price = array("d")
+
+    def __len__(self):
+        return len(self.code)
+
+    @classmethod
+    def from_orders(cls, orders):
+        columns = cls()
+        statuses = {status: position for position, status in enumerate(ORDER_STATUSES)}
+        line_order, item, quantity, price = (columns.line_order.append, columns.item.append,
+                                             columns.quantity.append, columns.price.append)
+        row = -1
+        for row, order in enumerate(orders):
+            gross = 0
+            for line in order.items_order:
+                line_order(row)
+                item(line.code)
+                quantity(line.quantity)
+                price(line.price)
+                gross += line.price * line.quantity
+            columns.code.append(order.code)
+            columns.status.append(statuses[order.status])
+            columns.costumer.append(order.costumer.code)
+            columns.total.append(order.order_total_price)
+            columns.gross.append(gross)
+            created = order.created_at
+            columns.month.append(int(created[:4] + created[5:7]) if created else 0)
+        return columns
+
+def month_key(month):
+    """'AAAA-MM' (ou 'sem-data') -> AAAAMM (ou 0), o formato da coluna month"""
+    if month == UNDATED_PARTITION:
+        return 0
+    match = MONTH_KEY.fullmatch(month or "")
+    if not match or not 1 <= int(match[2]) <= 12:
+        raise ValueError(f"Month must be YYYY-MM or {UNDATED_PARTITION}.")
+    return int(match[1] + match[2])
+
+def month_name(key):
+    return f"{key // 100:04d}-{key % 100:02d}" if key else UNDATED_PARTITION
+
+def percentile(ordered, p):
+    """Percentil p de uma sequência ordenada, interpolando entre as posições vizinhas (como o numpy.percentile)"""
+    if not ordered:
+        return 0
+    position = (len(ordered) - 1) * p / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def sales_analytics(columns, month=None, top=ANALYTICS_TOP_ITEMS):
+    """Relatório do histórico todo, ou só do mês month (AAAAMM; 0 para os sem data):
+    pedidos e receita por status e, sem os cancelados e rejeitados, ticket médio e percentis, uso do cupom,
+    itens mais vendidos (unidades e receita bruta) e vendas por mês"""
+    if np is not None:
+        report = _numpy_analytics(columns, month, top)
+    else:
+        report = _array_analytics(columns, month, top)
+    count, revenue = report["sales"], report["revenue"]
+    report["average_ticket"] = revenue / count if count else 0
+    report["discount_rate"] = report["discounted"] / count if count else 0
+    report["engine"] = ANALYTICS_ENGINE
+    return report
+
+def _numpy_analytics(columns, month, top):
+    status = np.frombuffer(columns.status, dtype=np.int8)
+    total = np.frombuffer(columns.total, dtype=np.float64)
+    gross = np.frombuffer(columns.gross, dtype=np.float64)
+    months = np.frombuffer(columns.month, dtype=np.int64)
+    line_order = np.frombuffer(columns.line_order, dtype=np.int64)
+    item = np.frombuffer(columns.item, dtype=np.int64)
+    quantity = np.frombuffer(columns.quantity, dtype=np.int64)
+    price = np.frombuffer(columns.price, dtype=np.float64)
+
+    selected = months == month if month is not None else np.ones(len(status), dtype=bool)
+    counts = np.bincount(status[selected], minlength=len(ORDER_STATUSES))
+    revenues = np.bincount(status[selected], weights=total[selected], minlength=len(ORDER_STATUSES))
+    valid = selected & ~np.isin(status, [ORDER_STATUSES.index(closed) for closed in CLOSED_STATUSES])
+    sales = np.sort(total[valid])
+    discounted = valid & (total < gross - 0.005)
+
+    # Códigos de item podem ser grandes e esparsos (importação, CodeAllocator): o bincount usa posições
+    # 0..k-1 dos k itens vendidos (np.unique), não os códigos, para não alocar max(código) + 1 posições
+    lines = valid[line_order]
+    codes, position = np.unique(item[lines], return_inverse=True)
+    units = np.bincount(position, weights=quantity[lines], minlength=len(codes))
+    item_revenue = np.bincount(position, weights=(price * quantity)[lines], minlength=len(codes))
+    best = np.argsort(-units, kind="stable")[:top] # codes vem ordenado: empates ficam com o menor código
+    keys, group = np.unique(months[valid], return_inverse=True)
+    month_counts = np.bincount(group, minlength=len(keys))
+    month_revenues = np.bincount(group, weights=total[valid], minlength=len(keys))
+
+    return {
+        "orders": int(selected.sum()),
+        "by_status": {name: [int(counts[i]), float(revenues[i])] for i, name in enumerate(ORDER_STATUSES) if counts[i]},
+        "sales": len(sales),
+        "revenue": float(sales.sum()),
+        "percentiles": {f"p{p}": float(np.percentile(sales, p)) if len(sales) else 0 for p in ANALYTICS_PERCENTILES},
+        "discounted": int(discounted.sum()),
+        "discount_total": float((gross - total)[discounted].sum()),
+        "top_items": [[int(codes[i]), int(units[i]), float(item_revenue[i])] for i in best if units[i]],
+        "by_month": {month_name(int(key)): [int(count), float(revenue)] for key, count, revenue in zip(keys, month_counts, month_revenues)},
+    }
+
+def _array_analytics(columns, month, top):
+    closed = {ORDER_STATUSES.index(status) for status in CLOSED_STATUSES}
+    counts = [0] * len(ORDER_STATUSES)
+    revenues = [0.0] * len(ORDER_STATUSES)
+    valid = bytearray(len(columns)) # 1 nos pedidos que contam como venda no recorte
+    sales = array("d")
+    discounted, discount_total, orders, months = 0, 0.0, 0, {}
+    for row, (status, total, gross, key) in enumerate(zip(columns.status, columns.total, columns.gross, columns.month)):
+        if month is not None and key != month:
+            continue
+        orders += 1
+        counts[status] += 1
+        revenues[status] += total
+        if status in closed:
+            continue
+        valid[row] = 1
+        sales.append(total)
+        if total < gross - 0.005:
+            discounted += 1
+            discount_total += gross - total
+        bucket = months.setdefault(key, [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += total
+
+    units, item_revenue = {}, {}
+    for row, item, quantity, price in zip(columns.line_order, columns.item, columns.quantity, columns.price):
+        if valid[row]:
+            units[item] = units.get(item, 0) + quantity
+            item_revenue[item] = item_revenue.get(item, 0.0) + price * quantity
+    best = heapq.nsmallest(top, units, key=lambda code: (-units[code], code))
+    ordered = sorted(sales)
+
+    return {
+        "orders": orders,
+        "by_status": {name: [counts[i], revenues[i]] for i, name in enumerate(ORDER_STATUSES) if counts[i]},
+        "sales": len(sales),
+        "revenue": sum(sales),
+        "percentiles": {f"p{p}": percentile(ordered, p) for p in ANALYTICS_PERCENTILES},
+        "discounted": discounted,
+        "discount_total": discount_total,
+        "top_items": [[code, units[code], item_revenue[code]] for code in best if units[code]],
+        "by_month": {month_name(key): months[key] for key in sorted(months)},
+    }
+
+#-----------------------------------------------Order pipeline (FIFO queues)-------------------------------------------------#
+PIPELINE_STAGES = ("Pending", "Accepted", "Making", "Ready", "Waiting Delivery", "Delivering")
+
+class OrderPipeline:
+    """Uma fila FIFO (deque) por etapa do pedido, da aprovação até a saída para entrega.
+
+    Cada pedido tem um único ticket válido. Quando ele muda de etapa, ganha um ticket novo na fila da
+    nova etapa e a entrada antiga fica velha; entradas velhas são descartadas ao chegar na frente da fila,
+    ou todas de uma vez quando passam a ser maioria na fila (compactação, O(1) amortizado por mudança).
+    Assim enfileirar e desenfileirar custam O(1) (amortizado), mesmo quando um pedido sai do meio da fila,
+    e as filas não guardam pedidos que já saíram delas.
+    """
+    def __init__(self):
+        self.queues = {stage: deque() for stage in PIPELINE_STAGES}
+        self._tickets = {}     # code -> (etapa, ticket) da entrada válida do pedido
+        self._live = dict.fromkeys(PIPELINE_STAGES, 0) # Entradas válidas em cada fila
+        self._next_ticket = 0
+
+    def _leave(self, code):
+        """Invalida a entrada atual do pedido; compacta a fila dela se as entradas velhas passarem das válidas"""
+        current = self._tickets.pop(code, None)
+        if current is None:
+            return
+        stage = current[0]
+        self._live[stage] -= 1
+        queue = self.queues[stage]
+        if len(queue) > 2 * self._live[stage]:
+            self.queues[stage] = deque(entry for entry in queue if self._tickets.get(entry[1].code) == (stage, entry[0]))
+
+    def enqueue(self, order):
+        """Coloca o pedido no fim da fila do seu status atual (ou o tira das filas, se o status não for uma etapa)"""
+        self._leave(order.code)
+        if order.status not in self.queues:
+            return
+        self._next_ticket += 1
+        self._tickets[order.code] = (order.status, self._next_ticket)
+        self._live[order.status] += 1
+        self.queues[order.status].append((self._next_ticket, order))
+
+    def remove(self, order):
+        """Tira o pedido das filas (pedido arquivado ou removido)"""
+        self._leave(order.code)
+
+    def peek(self, stage):
+        """Retorna o pedido mais antigo da etapa (cabeça da fila) ou None"""
+        queue = self.queues[stage]
+        while queue:
+            ticket, order = queue[0]
+            if self._tickets.get(order.code) == (stage, ticket):
+                return order
+            queue.popleft() # Entrada velha: o pedido já mudou de etapa
+        return None
+
+#-----------------------------------------------Item search index-------------------------------------------------#
+SEARCH_LIMIT = 10 # Resultados mostrados por busca
+ACCENTS = re.compile("[\u0300-\u036f]") # Acentos soltos pelo NFKD ('Á' vira 'A' + acento)
+WORDS = re.compile(r"\w+")
+
+def search_key(text):
+    """Texto sem acentos e em minúsculas, para comparar 'Água' com 'agua'"""
+    text = text or ""
+    if text.isascii():
+        return text.casefold()
+    return ACCENTS.sub("", unicodedata.normalize("NFKD", text)).casefold()
+
+def search_tokens(text):
+    return WORDS.findall(search_key(text))
+
+class ItemSearchIndex:
+    """Busca de itens por nome e descrição, sem acentos e sem diferenciar maiúsculas.
+
+    - Índice invertido palavra -> códigos dos itens (um para nome ou descrição, outro só para o nome),
+      com o vocabulário em ordem alfabética: cada palavra da busca vale como prefixo ("hamb" acha "Hamburguer"),
+      e as palavras que começam com ela são uma faixa contígua do vocabulário (bisect).
+    - Lista ordenada (nome inteiro, código): os nomes que começam com a busca inteira também são uma faixa contígua.
+    Um item precisa casar com todas as palavras da busca. Atualizado item a item (add/remove), sem reconstruir."""
+    def __init__(self):
+        self.postings = {}      # palavra -> set de códigos (palavra no nome ou na descrição)
+        self.name_postings = {} # palavra -> set de códigos (palavra no nome)
+        self.vocabulary = []    # Palavras de postings, em ordem alfabética
+        self.names = []         # (nome normalizado, code), em ordem
+        self.fields = {}        # code -> (nome normalizado, palavras do nome, palavras da descrição)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def _index(self, item):
+        """Registra as palavras do item nos índices invertidos; retorna as palavras que ainda não existiam"""
+        name = search_key(item.name)
+        name_tokens = frozenset(WORDS.findall(name))
+        description_tokens = frozenset(search_tokens(item.description))
+        self.fields[item.code] = (name, name_tokens, description_tokens)
+        for token in name_tokens:
+            self.name_postings.setdefault(token, set()).add(item.code)
+        new = []
+        for token in name_tokens | description_tokens:
+            codes = self.postings.get(token)
+            if codes is None:
+                codes = self.postings[token] = set()
+                new.append(token)
+            codes.add(item.code)
+        return new
+
+    def add(self, item):
+        """Indexa o item; se ele já estava no índice, as palavras antigas (nome/descrição anteriores) saem antes"""
+        self.remove(item.code)
+        for token in self._index(item):
+            insort(self.vocabulary, token)
+        insort(self.names, (self.fields[item.code][0], item.code))
+
+    def remove(self, code):
+        fields = self.fields.pop(code, None)
+        if fields is None:
+            return
+        name, name_tokens, description_tokens = fields
+        del self.names[bisect_left(self.names, (name, code))]
+        for token in name_tokens:
+            codes = self.name_postings[token]
+            codes.discard(code)
+            if not codes:
+                del self.name_postings[token]
+        for token in name_tokens | description_tokens:
+            codes = self.postings[token]
+            codes.discard(code)
+            if not codes:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def rebuild(self, items):
+        """Monta o índice do zero (na carga): as listas ordenadas são ordenadas uma vez só, no fim"""
+        self.__init__()
+        for item in items:
+            self._index(item)
+        self.vocabulary = sorted(self.postings)
+        self.names = sorted((fields[0], code) for code, fields in self.fields.items())
+
+    def _prefix_codes(self, prefix, postings):
+        """Códigos dos itens com alguma palavra (em postings) que começa com prefix"""
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\U0010ffff", start)
+        sets = [postings[token] for token in self.vocabulary[start:end] if token in postings]
+        if len(sets) == 1:
+            return sets[0]
+        return set().union(*sets)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Códigos dos até limit itens que casam com todas as palavras de query, os mais relevantes primeiro:
+        1) nome começando pela busca (em ordem alfabética); 2) todas as palavras no nome; 3) as demais (por código).
+        Se os primeiros já bastam, os índices invertidos nem são consultados."""
+        words = search_tokens(query)
+        if not words:
+            return []
+        key = search_key(query).strip()
+        found = []
+        i = bisect_left(self.names, (key,))
+        while len(found) < limit and i < len(self.names) and self.names[i][0].startswith(key):
+            found.append(self.names[i][1])
+            i += 1
+        if len(found) == limit:
+            return found
+
+        matches = sorted((self._prefix_codes(word, self.postings) for word in words), key=len) # Menor primeiro
+        codes = matches[0].intersection(*matches[1:])
+        codes.difference_update(found)
+        if not codes:
+            return found
+        in_name = codes.intersection(*(self._prefix_codes(word, self.name_postings) for word in words))
+        if in_name:
+            found += heapq.nsmallest(limit - len(found), in_name)
+            codes -= in_name
+        if len(found) < limit:
+            found += heapq.nsmallest(limit - len(found), codes)
+        return found
+
+item_index = ItemSearchIndex() # Busca por nome/descrição sobre o catálogo do store atual
+
+#-----------------------------------------------item's functions-------------------------------------------------#
+
+def create_item(code, name, description, price, stock):
+    return Item(code, name, description, price, stock)
+
+def line_name(line):
+    """Nome do item de uma linha do pedido: o do momento do pedido ou, nas linhas antigas que não o guardaram,
+    o atual no catálogo (do store atual)"""
+    if line.name is not None:
+        return line.name
+    item = store.get_item(line.code)
+    return item.name if item else f"Item {line.code}"
+
+def update_stock(item, quantity):
+    try:
+        quantity = int(quantity)
+    except ValueError:
+        raise ValueError("Quantity must be a number.")
+    if quantity < 0 and abs(quantity) > item.stock:
+        raise ValueError("Insufficient stock to remove the requested quantity.")
+    else: 
+        old = item.stock
+        item.stock += quantity
+        on_undo(lambda: setattr(item, "stock", old))
+
+# Só perguntam: retornam o valor novo confirmado (ou None) e a troca fica com o OrderService.update_item
+def update_name(item):
+    confirm = input(f"You are about to change the name of the product {item.name}\n(Confirm? 1. Yes / 2. No ) ")
+    if confirm == "1":
+        return input("Type the new name: ").strip()
+    print("Operation canceled")
+    return None
+
+def update_description(item):
+    print(f"Current description:\n{item.description}")
+    new_description = input("Type a new description: ")
+    confirm = input(f"You are about to change the description of the product {item.name}\n(Confirm? 1. Yes / 2. No ) ")
+    if confirm == "1":
+        return new_description
+    print("Operation canceled")
+    return None
+
+def update_price(item):
+    print(f"Current price:\n{item.price}")  
+    new_price_input = input("Type a new price: ")
+    try:
+        new_price = float(new_price_input)
+    except ValueError:
+        print("Price must be a positive number")
+        return None
+    confirm = input(f"You are about to change the price of the product {item.name} to R${new_price}\n(Confirm? 1. Yes / 2. No ) ")
+    if confirm == "1":
+        return new_price
+    print("Operation canceled")
+    return None
+
+#-----------------------------------------------order's functions-------------------------------------------------#
+def create_order(code,costumer_data, items_order, status='Pending', payment='Paid'):
+    total = sum(item.price * item.quantity for item in items_order)
+    created_at = datetime.now().isoformat(timespec="seconds")
+    
+    return Order(code, costumer_data, items_order, status, payment, total, created_at)
+
+def apply_order_discount(order):
+    current_total = order.order_total_price
+    if current_total is None or len(order.items_order) == 0:
+        raise ValueError("It's not possible to apply discount in a empty order.")
+    # O cupom vale uma vez por pedido: total abaixo da soma das linhas é desconto já aplicado (mesmo critério dos relatórios)
+    if current_total < sum(line.price * line.quantity for line in order.items_order) - 0.005:
+        raise ValueError(f"Discount already applied to order {order.code}.")
+    # Se o pedido já está registrado, os agregados de vendas acompanham o novo total.
+    # Pelo código: no índice, pedidos ainda não lidos do snapshot binário aparecem como None
+    registered = order.code in orders_by_status.get(order.status, {})
+    if registered:
+        sales_stats.discard(order)
+    discount_value = current_total * (10 / 100)
+    order.order_total_price = current_total - discount_value
+    if registered:
+        sales_stats.add(order)
+    on_undo(lambda: restore_order_total(order, current_total, registered))
+    return order.order_total_price
+
+def restore_order_total(order, total, registered):
+    """Desfaz o apply_order_discount"""
+    if registered:
+        sales_stats.discard(order)
+    order.order_total_price = total
+    if registered:
+        sales_stats.add(order)
+
+#-----------------------------------------------Aux functions-------------------------------------------------#
+def index_order(order):
+    """Registra o pedido no índice de status (status -> {code: pedido}, na ordem de chegada), no índice do cliente
+    e na fila da sua etapa. No índice do cliente o pedido já registrado mantém a posição (a de chegada)."""
+    orders_by_status.setdefault(order.status, {})[order.code] = order
+    orders_by_costumer.setdefault(order.costumer.code, {})[order.code] = order
+    order_pipeline.enqueue(order)
+
+def register_order(order):
+    """Coloca um pedido novo na árvore, no índice de status/filas e nos agregados de vendas"""
+    global orders_tree
+    orders_tree.root = orders_tree.insert(orders_tree.root, order.code, order)
+    index_order(order)
+    sales_stats.add(order)
+    on_undo(lambda: unregister_order(order))
+
+def unregister_order(order):
+    """Desfaz o register_order: tira o pedido da árvore, dos índices, das filas e dos agregados"""
+    orders_by_status.get(order.status, {}).pop(order.code, None)
+    orders_by_costumer.get(order.costumer.code, {}).pop(order.code, None)
+    order_pipeline.remove(order)
+    orders_tree.root = orders_tree.delete(orders_tree.root, order.code)
+    sales_stats.discard(order)
+
+def set_order_status(order, status):
+    """Muda o status do pedido mantendo o índice de status e os agregados de vendas sincronizados"""
+    old = order.status
+    orders_by_status[order.status].pop(order.code, None)
+    sales_stats.discard(order)
+    order.status = status
+    sales_stats.add(order)
+    index_order(order)
+    on_undo(lambda: set_order_status(order, old)) # Desfeito, o pedido volta para o fim da fila da etapa antiga
+
+def get_orders_by_status(status):
+    # O(k) nos pedidos com esse status, sem percorrer a árvore inteira.
+    # Pedidos ainda não lidos do snapshot binário ficam como None no índice e são lidos aqui.
+    bucket = orders_by_status.get(status, {})
+    for code, order in bucket.items():
+        if order is None:
+            bucket[code] = orders_tree.search(orders_tree.root, code)
+    return list(bucket.values())
+
+def get_costumer_orders(code):
+    """Pedidos do cliente, do mais antigo ao mais novo: O(k) nos pedidos dele, sem percorrer a árvore"""
+    bucket = orders_by_costumer.get(code, {})
+    for order_code, order in bucket.items():
+        if order is None: # Ainda no snapshot binário
+            bucket[order_code] = orders_tree.search(orders_tree.root, order_code)
+    return list(bucket.values())
+
+def advance_orders(stage, new_status, limit=None):
+    """Move até limit pedidos (todos, se None) da frente da fila da etapa para new_status, em ordem FIFO.
+    Retorna a lista de pedidos movidos."""
+    moved = []
+    while limit is None or len(moved) < limit:
+        order = order_pipeline.peek(stage)
+        if order is None:
+            break
+        set_order_status(order, new_status)
+        moved.append(order)
+    if moved:
+        log_change("all_orders", *moved)
+    return moved
+
+def restore_stock(order):
+    """Devolve ao estoque as quantidades do pedido, buscando cada item pelo código na AVL.
+    As quantidades são somadas por código antes, então cada item é atualizado e gravado uma única vez."""
+    quantities = {}
+    for line in order.items_order:
+        quantities[line.code] = quantities.get(line.code, 0) + line.quantity
+
+    restored = []
+    for code, quantity in quantities.items():
+        item = catalog_tree.search(catalog_tree.root, code) # Busca O(log n)
+        if item:
+            update_stock(item, quantity)
+            restored.append(item)
+    if restored:
+        log_change("catalog", *restored)
+    return restored
+
+def paginate(fetch, total, show):
+    """Mostra os registros em páginas de PAGE_SIZE, em ordem de código.
+    fetch(after, size) devolve os size registros seguintes ao código after (ex: AVLTree.page, Store.orders_page);
+    total é quantos registros existem. show(valor, posição) devolve o texto de um registro (com as quebras de linha);
+    posição começa em 1 e segue entre as páginas. Cada página sai numa única escrita no terminal."""
+    after = None
+    position = 0
+    while True:
+        page = fetch(after, PAGE_SIZE)
+        blocks = []
+        for value in page:
+            position += 1
+            blocks.append(show(value, position))
+        write_blocks(blocks)
+        if len(page) < PAGE_SIZE or position == total:
+            return
+        after = page[-1].code
+        if input(f"Showing {position} of {total}. [Enter] Next page / [q] Stop: ").strip().lower() == "q":
+            return
+
+def _dump_list(arq, key, records):
+    """Grava records como a lista 'key' do dados.json, um registro por vez (mesmo formato do json.dump com indent=4)"""
+    arq.write(f'    "{key}": [')
+    empty = True
+    for record in records:
+        arq.write(("\n" if empty else ",\n") + "        ")
+        arq.write(json.dumps(record.to_dict(), indent=4, ensure_ascii=False).replace("\n", "\n        "))
+        empty = False
+    arq.write("]" if empty else "\n    ]")
+
+def _fsync_dir(path):
+    """Garante que a troca de nome (os.replace) do arquivo já está no disco (só em sistemas POSIX)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError: # Windows não abre diretórios
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _atomic_write(path, write, binary=False):
+    """Grava path sem nunca deixá-lo pela metade: write(arq) escreve num arquivo temporário,
+    que vai para o disco (fsync) e só então substitui path de uma vez (os.replace)."""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "wb") if binary else open(tmp_file, "w", encoding="utf-8") as arq:
+        write(arq)
+        arq.flush()
+        os.fsync(arq.fileno())
+    os.replace(tmp_file, path)
+    _fsync_dir(path)
+
+def dump_data(arq):
+    # Percorre as AVLs em ordem (dados já ordenados) gravando registro a registro, sem montar as listas
+    arq.write("{\n")
+    _dump_list(arq, "all_orders", orders_tree)
+    arq.write(",\n")
+    _dump_list(arq, "catalog", catalog_tree)
+    arq.write(",\n")
+    _dump_list(arq, "costumers", costumers) # Continua sendo lista no JSON
+    arq.write(',\n    "last_codes": ' + json.dumps(code_allocator.to_dict()))
+    arq.write(',\n    "archive_stats": ' + json.dumps(archive_stats.to_dict(), ensure_ascii=False))
+    arq.write("\n}")
+
+def save_data():
+    _atomic_write(DATA_FILE, dump_data)
+
+#----------------------------------------------- Journal (write-ahead log) -------------------------------------------------#
+journal_entries = 0    # Quantos registros o log tem desde a última compactação
+journal_buffer = None  # Linhas acumuladas dentro de um journal_batch() (None fora dele)
+undo_log = threading.local() # undo_log.actions: como desfazer o que o savepoint() aberto nesta thread já mudou na memória
+
+def log_change(entity, *records):
+    """Acrescenta os registros alterados ao log, um por linha, em vez de reescrever todo o dados.json.
+    entity é a chave do dados.json a que o registro pertence: 'catalog', 'all_orders' ou 'costumers'."""
+    lines = [json.dumps({"entity": entity, "data": r.to_dict()}, ensure_ascii=False) + "\n" for r in records]
+    if journal_buffer is not None:
+        journal_buffer.extend(lines)
+    else:
+        write_journal(lines)
+
+def write_journal(lines):
+    global journal_entries
+    with open(JOURNAL_FILE, "a", encoding="utf-8") as log:
+        log.write("".join(lines))
+    journal_entries += len(lines)
+    if snapshot_writer is not None:
+        snapshot_writer.changed(len(lines)) # A thread de fundo decide quando compactar
+    elif journal_entries >= JOURNAL_COMPACT_EVERY:
+        compact_data()
+
+@contextmanager
+def journal_batch():
+    """Junta os log_change feitos dentro do bloco numa única escrita no log, na saída do bloco"""
+    global journal_buffer
+    if journal_buffer is not None: # Já dentro de um lote: o de fora grava
+        yield
+        return
+    journal_buffer = []
+    try:
+        yield
+    finally:
+        lines, journal_buffer = journal_buffer, None
+        if lines:
+            write_journal(lines)
+
+def on_undo(action):
+    """Registra action() como o desfazer de uma mudança na memória, se houver um savepoint() aberto"""
+    actions = getattr(undo_log, "actions", None)
+    if actions is not None:
+        actions.append(action)
+
+@contextmanager
+def savepoint():
+    """Bloco tudo-ou-nada dentro de um lote: se ele levantar exceção, as mudanças na memória são desfeitas
+    (em ordem inversa) e as linhas que ele pôs no log saem do lote. O que veio antes no lote é gravado normalmente."""
+    with journal_batch():
+        outer = getattr(undo_log, "actions", None)
+        undo_log.actions = actions = []
+        mark = len(journal_buffer)
+        try:
+            yield
+        except BaseException:
+            undo_log.actions = None # Os desfazeres não registram desfazeres
+            for action in reversed(actions):
+                action()
+            del journal_buffer[mark:]
+            raise
+        finally:
+            undo_log.actions = outer
+        if outer is not None: # Savepoint aninhado: se o de fora falhar, desfaz este também
+            outer.extend(actions)
+
+def compact_data():
+    """Incorpora o log no snapshot (dados.json ou dados.bin, conforme SNAPSHOT_FORMAT) e esvazia o log."""
+    global journal_entries
+    if SNAPSHOT_FORMAT == "binary":
+        save_binary_snapshot()
+    else:
+        save_data()
+    # Só apaga o log depois que o snapshot novo já está no lugar
+    open(JOURNAL_FILE, "w", encoding="utf-8").close()
+    if os.path.exists(JOURNAL_OLD_FILE):
+        os.remove(JOURNAL_OLD_FILE)
+    journal_entries = 0
+
+class SnapshotWriter:
+    """Compacta o log no snapshot numa thread de fundo, sem o operador esperar pelo disco.
+
+    Cada escrita no log avisa changed(); rajadas de mudanças viram um snapshot só, gravado SNAPSHOT_DELAY
+    segundos depois da primeira mudança pendente (ou logo, com every mudanças pendentes). Entre dois snapshots
+    passa pelo menos 4x o tempo do último, para a thread não ficar gravando sem parar com muitos dados.
+
+    O snapshot é montado em memória segurando lock (o mesmo das escritas no store), então é consistente;
+    a escrita no disco (arquivo temporário + fsync + os.replace) acontece já sem o lock. Antes de montar,
+    o log é fechado como JOURNAL_OLD_FILE e as mudanças seguintes vão para um log novo; o .old só é apagado
+    depois que o snapshot está no disco, então uma queda em qualquer ponto não perde nada."""
+    def __init__(self, lock, delay=SNAPSHOT_DELAY, every=JOURNAL_COMPACT_EVERY):
+        self.lock = lock
+        self.delay = delay
+        self.every = every
+        self.cond = threading.Condition()
+        self.pending = 0          # Mudanças ainda fora do snapshot
+        self.first_change = None  # time.monotonic() da mais antiga delas
+        self.next_allowed = 0     # Antes disso não começa outro snapshot
+        self.snapshots = 0
+        self.error = None         # Último erro de gravação (a próxima tentativa é um segundo depois)
+        self.stopping = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self.thread.start()
+
+    def changed(self, n=1):
+        with self.cond:
+            if not self.pending:
+                self.first_change = time.monotonic()
+            self.pending += n
+            self.cond.notify()
+
+    def _wait_time(self):
+        """Segundos até o próximo snapshot (None se não há nada pendente)"""
+        if not self.pending:
+            return None
+        due = self.first_change + self.delay if self.pending < self.every else 0
+        return max(due, self.next_allowed) - time.monotonic()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.stopping:
+                    wait = self._wait_time()
+                    if wait is not None and wait <= 0:
+                        break
+                    self.cond.wait(wait)
+                if self.stopping:
+                    return
+            try:
+                self.snapshot()
+            except Exception as e: # Disco cheio, permissão...: as mudanças continuam nos logs
+                self.error = e
+                self.next_allowed = time.monotonic() + 1
+
+    def snapshot(self):
+        global journal_entries
+        started = time.monotonic()
+        taken, first = 0, None
+        try:
+            with self.lock:
+                with self.cond:
+                    taken, first = self.pending, self.first_change
+                    self.pending = 0
+                    self.first_change = None
+                if os.path.exists(JOURNAL_OLD_FILE):
+                    # O snapshot anterior não chegou ao disco: o log atual (se já houver um) vai para o fim do .old
+                    if os.path.exists(JOURNAL_FILE):
+                        with open(JOURNAL_OLD_FILE, "a", encoding="utf-8") as old, open(JOURNAL_FILE, "r", encoding="utf-8") as log:
+                            old.write(log.read())
+                        os.remove(JOURNAL_FILE)
+                elif os.path.exists(JOURNAL_FILE):
+                    os.replace(JOURNAL_FILE, JOURNAL_OLD_FILE)
+                rotated = os.path.exists(JOURNAL_OLD_FILE) # Sem log nenhum (ex.: só o flush da saída) não há .old
+                journal_entries = 0
+                if SNAPSHOT_FORMAT == "binary":
+                    save_binary_snapshot() # Troca o mmap aberto: precisa ficar inteiro dentro do lock
+                    text = None
+                else:
+                    text = io.StringIO()
+                    dump_data(text)
+            if text is not None:
+                _atomic_write(DATA_FILE, lambda arq: arq.write(text.getvalue()))
+            if rotated:
+                os.remove(JOURNAL_OLD_FILE)
+        except BaseException:
+            # As mudanças tiradas da conta podem não estar no snapshot: voltam a ficar pendentes, e o _run tenta de novo
+            with self.cond:
+                if taken:
+                    self.first_change = first if self.first_change is None else min(first, self.first_change)
+                    self.pending += taken
+            raise
+        self.snapshots += 1
+        self.error = None
+        self.next_allowed = time.monotonic() + 4 * (time.monotonic() - started)
+
+    def flush(self):
+        """Para a thread e deixa tudo no snapshot (chamado ao sair)"""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+        with self.lock:
+            compact_data()
+
+snapshot_writer = None # SnapshotWriter em execução (MemoryStore.load inicia), ou None: compacta na hora
+
+def read_journal():
+    """Gera as entradas do log (o .old de um snapshot interrompido primeiro), na ordem em que foram gravadas"""
+    for path in (JOURNAL_OLD_FILE, JOURNAL_FILE):
+        try:
+            with open(path, "r", encoding="utf-8") as log:
+                lines = log.readlines()
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Última linha incompleta (queda durante a escrita): ignora
+                continue
+
+def replay_journal(dados):
+    """Reaplica o log sobre os dados do snapshot. Cada registro substitui o de mesmo código;
+    pedidos arquivados saem de all_orders e vão para dados['archived']. Retorna quantos registros foram aplicados."""
+    by_code = {entity: {r['code']: r for r in dados[entity]} for entity in ("catalog", "all_orders", "costumers")}
+    dados['archived'] = []
+    applied = 0
+    for entry in read_journal():
+        if entry['entity'] == "archived":
+            # Se o snapshot já não tem o pedido, o arquivamento já está nele (e em archive_stats)
+            if by_code["all_orders"].pop(entry['data']['code'], None) is not None:
+                dados['archived'].append(entry['data'])
+        else:
+            by_code[entry['entity']][entry['data']['code']] = entry['data']
+        applied += 1
+
+    for entity, records in by_code.items():
+        dados[entity] = list(records.values())
+    return applied
+
+def replay_journal_into_store():
+    """Reaplica o log direto nas árvores, índices e agregados já montados (carga do snapshot binário).
+    Retorna quantos registros foram aplicados."""
+    applied = 0
+    for entry in read_journal():
+        data = entry['data']
+        match entry['entity']:
+            case "catalog":
+                catalog_tree.root = catalog_tree.delete(catalog_tree.root, data['code'])
+                catalog_tree.root = catalog_tree.insert(catalog_tree.root, data['code'], Item.from_dict(data))
+            case "costumers":
+                costumers.add(Costumer.from_dict(data))
+            case "all_orders":
+                order = Order.from_dict(data)
+                order.costumer = costumers.add(order.costumer)
+                old = orders_tree.search(orders_tree.root, order.code)
+                if old:
+                    orders_by_status[old.status].pop(old.code, None)
+                    sales_stats.discard(old)
+                    orders_tree.root = orders_tree.delete(orders_tree.root, old.code)
+                register_order(order)
+            case "archived":
+                old = orders_tree.search(orders_tree.root, data['code'])
+                if old:
+                    drop_archived(old)
+        applied += 1
+    return applied
+
+#----------------------------------------------- Binary snapshot (mmap) -------------------------------------------------#
+# Formato alternativo ao dados.json, usado com --binary. Seções, nesta ordem:
+#   cabeçalho | tabela de strings (offsets + bytes UTF-8) | itens | clientes | pedidos | linhas | índice code -> offset | agregados (JSON)
+# Itens, clientes, pedidos e linhas têm tamanho fixo; textos (nomes, descrições, status...) são ids na tabela de strings.
+# O arquivo é aberto com mmap e cada pedido só é decodificado quando alguma tela o acessa.
+BINARY_MAGIC = b"TLUB"
+BINARY_VERSION = 2 # A versão 1 (linhas sem o nome do item) ainda é lida
+NO_STRING = 0xFFFFFFFF
+BIN_HEADER = struct.Struct("<4sI5I9Q")   # magic, versão, nº de strings/itens/clientes/pedidos/linhas, offsets das seções e tamanho dos agregados
+BIN_ITEM = struct.Struct("<qIIdq")       # code, nome, descrição, preço, estoque
+BIN_COSTUMER = struct.Struct("<qII")     # code, nome, celular
+BIN_ORDER = struct.Struct("<qqIIIdQI")   # code, cliente, status, pagamento, created_at, total, primeira linha, nº de linhas
+BIN_LINE = struct.Struct("<qdqI")        # código do item, preço, quantidade, nome do item
+BIN_LINE_V1 = struct.Struct("<qdq")      # Versão 1: código do item, preço, quantidade
+BIN_ORDER_STATUS_AT = 16                 # Posição do id do status dentro do registro do pedido
+BIN_ORDER_COSTUMER_AT = 8                # Posição do código do cliente dentro do registro do pedido
+
+class StringTable:
+    """Tabela de strings do snapshot binário: cada texto diferente é gravado uma vez e referenciado pelo id"""
+    def __init__(self):
+        self.ids = {}
+        self.offsets = array("I", [0])
+        self.blob = bytearray()
+
+    def add(self, text):
+        if text is None:
+            return NO_STRING
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.offsets) - 1
+            self.blob += text.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return sid
+
+class BinarySnapshot:
+    """Leitura preguiçosa do snapshot binário via mmap: nada é decodificado até ser pedido.
+
+    Quem lê fora do store.lock (menus, HTTP) usa reading_binary_snapshot(): o gravador troca o snapshot
+    e aposenta o antigo (retire), que só é fechado quando o último leitor em andamento termina."""
+    def __init__(self, path):
+        self._guard = threading.Lock()
+        self._readers = 0
+        self._retired = False
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, n_strings, self.n_items, self.n_costumers, self.n_orders, self.n_lines,
+         strings_off, self._blob_off, self._items_off, self._costumers_off, self._orders_off,
+         self._lines_off, index_off, self._stats_off, self._stats_len) = BIN_HEADER.unpack_from(self._mm, 0)
+        if magic != BINARY_MAGIC or version not in (1, BINARY_VERSION):
+            self.close()
+            raise ValueError(f"{path} is not a binary snapshot (version {BINARY_VERSION}).")
+        self._line = BIN_LINE if version == BINARY_VERSION else BIN_LINE_V1
+        view = memoryview(self._mm)
+        self._string_offsets = view[strings_off:strings_off + 4 * (n_strings + 1)].cast("I")
+        self.codes = view[index_off:index_off + 8 * self.n_orders].cast("q")  # Códigos dos pedidos, em ordem
+        self._offsets = view[index_off + 8 * self.n_orders:index_off + 16 * self.n_orders].cast("Q")
+        self._status_names = {} # id -> status (são poucos; evita decodificar o mesmo texto toda vez)
+
+    def __len__(self):
+        return self.n_orders
+
+    def acquire(self):
+        """Registra um leitor; False se o snapshot já foi aposentado (leia o atual)"""
+        with self._guard:
+            if self._retired:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        with self._guard:
+            self._readers -= 1
+            last = self._retired and not self._readers
+        if last:
+            self.close()
+
+    def retire(self):
+        """Fecha o mapeamento agora, ou quando o último leitor terminar"""
+        with self._guard:
+            self._retired = True
+            idle = not self._readers
+        if idle:
+            self.close()
+
+    def close(self):
+        for name in ("_string_offsets", "codes", "_offsets"):
+            if hasattr(self, name):
+                getattr(self, name).release()
+        self._mm.close()
+        self._file.close()
+
+    def string(self, sid):
+        if sid == NO_STRING:
+            return None
+        start = self._blob_off + self._string_offsets[sid]
+        end = self._blob_off + self._string_offsets[sid + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def find(self, code):
+        """Posição do pedido no índice (busca binária nos códigos) ou None"""
+        i = bisect_left(self.codes, code)
+        return i if i < self.n_orders and self.codes[i] == code else None
+
+    def status_at(self, i):
+        """Status do i-ésimo pedido, lendo só o campo de status"""
+        sid = struct.unpack_from("<I", self._mm, self._offsets[i] + BIN_ORDER_STATUS_AT)[0]
+        if sid not in self._status_names:
+            self._status_names[sid] = self.string(sid)
+        return self._status_names[sid]
+
+    def costumer_at(self, i):
+        """Código do cliente do i-ésimo pedido, lendo só esse campo"""
+        return struct.unpack_from("<q", self._mm, self._offsets[i] + BIN_ORDER_COSTUMER_AT)[0]
+
+    def raw_order(self, code):
+        """(campos, linhas) do pedido sem montar objetos.
+        campos = (code, código do cliente, status, pagamento, created_at, total); linhas = [(item, preço, quantidade, nome)]"""
+        code, costumer, status, payment, created_at, total, first, count = BIN_ORDER.unpack_from(self._mm, self._offsets[self.find(code)])
+        start = self._lines_off + first * self._line.size
+        rows = self._line.iter_unpack(self._mm[start:start + count * self._line.size])
+        if self._line is BIN_LINE:
+            lines = [(item, price, quantity, self.string(name)) for item, price, quantity, name in rows]
+        else:
+            lines = [(*row, None) for row in rows]
+        return (code, costumer, self.string(status), self.string(payment), self.string(created_at), total), lines
+
+    def order(self, code, costumers):
+        """Decodifica um pedido; o cliente vem do registro de clientes já carregado"""
+        (code, costumer, status, payment, created_at, total), lines = self.raw_order(code)
+        return Order(code, costumers.get(costumer), [OrderLine(*line) for line in lines], status, payment, total, created_at)
+
+    def items(self):
+        end = self._items_off + self.n_items * BIN_ITEM.size
+        return [Item(code, self.string(name), self.string(description), price, stock)
+                for code, name, description, price, stock in BIN_ITEM.iter_unpack(self._mm[self._items_off:end])]
+
+    def costumers(self):
+        end = self._costumers_off + self.n_costumers * BIN_COSTUMER.size
+        return [Costumer(code, self.string(name), self.string(cellphone))
+                for code, name, cellphone in BIN_COSTUMER.iter_unpack(self._mm[self._costumers_off:end])]
+
+    def stats(self):
+        return json.loads(self._mm[self._stats_off:self._stats_off + self._stats_len])
+
+binary_snapshot = None # BinarySnapshot aberto quando os dados vêm do dados.bin
+
+@contextmanager
+def reading_binary_snapshot():
+    """O snapshot binário atual, que não é fechado até o fim do bloco (mesmo se o gravador o trocar no meio)"""
+    while True:
+        snapshot = binary_snapshot
+        if snapshot.acquire():
+            break # Se falhou, o gravador acabou de trocar o global: a próxima volta pega o novo
+    try:
+        yield snapshot
+    finally:
+        snapshot.release()
+
+def load_binary_order(code):
+    """Loader da árvore de pedidos: decodifica o pedido do snapshot binário atual"""
+    with reading_binary_snapshot() as snapshot:
+        return snapshot.order(code, costumers)
+
+def _pad8(data):
+    """Completa a seção até múltiplo de 8 bytes, para os arrays ficarem alinhados no mmap"""
+    return bytes(data) + b"\0" * (-len(data) % 8)
+
+def save_binary_snapshot():
+    """Grava o estado atual em BINARY_FILE. Pedidos que ainda não foram lidos do snapshot anterior
+    são copiados campo a campo, sem virar objetos."""
+    global binary_snapshot
+    strings = StringTable()
+    items = bytearray()
+    for item in catalog_tree:
+        items += BIN_ITEM.pack(item.code, strings.add(item.name), strings.add(item.description), item.price, item.stock)
+    costumer_table = bytearray()
+    for c in costumers:
+        costumer_table += BIN_COSTUMER.pack(c.code, strings.add(c.name), strings.add(c.cellphone))
+
+    orders, lines = bytearray(), bytearray()
+    codes, offsets = array("q"), array("Q")
+    n_lines = 0
+    for code, order in orders_tree.raw_items():
+        if order is UNLOADED:
+            fields, order_lines = binary_snapshot.raw_order(code)
+        else:
+            fields = (order.code, order.costumer.code, order.status, order.payment, order.created_at, order.order_total_price)
+            order_lines = [(line.code, line.price, line.quantity, line.name) for line in order.items_order]
+        codes.append(code)
+        offsets.append(len(orders)) # Relativo à seção de pedidos; ajustado abaixo
+        orders += BIN_ORDER.pack(fields[0], fields[1], strings.add(fields[2]), strings.add(fields[3]), strings.add(fields[4]),
+                                 fields[5], n_lines, len(order_lines))
+        for item, price, quantity, name in order_lines:
+            lines += BIN_LINE.pack(item, price, quantity, strings.add(name))
+        n_lines += len(order_lines)
+    stats = json.dumps({**sales_stats.to_dict(), "last_codes": code_allocator.to_dict(), "archive_stats": archive_stats.to_dict()},
+                       ensure_ascii=False).encode("utf-8")
+
+    sections = [_pad8(strings.offsets.tobytes()), _pad8(strings.blob), _pad8(items), _pad8(costumer_table), _pad8(orders), _pad8(lines)]
+    section_offsets = []
+    position = BIN_HEADER.size + (-BIN_HEADER.size % 8)
+    for section in sections:
+        section_offsets.append(position)
+        position += len(section)
+    orders_off = section_offsets[4]
+    for i in range(len(offsets)):
+        offsets[i] += orders_off
+    index = codes.tobytes() + offsets.tobytes()
+    index_off = position
+    stats_off = index_off + len(index)
+
+    header = BIN_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(strings.offsets) - 1, len(catalog_tree), len(costumers),
+                             len(codes), n_lines, *section_offsets, index_off, stats_off, len(stats))
+    def write(arq):
+        arq.write(_pad8(header))
+        for section in sections:
+            arq.write(section)
+        arq.write(index)
+        arq.write(stats)
+    _atomic_write(BINARY_FILE, write, binary=True)
+
+    # Os pedidos ainda não lidos passam a vir do arquivo novo (mesmo conteúdo); o mapeamento antigo
+    # continua aberto para quem ainda está lendo dele e fecha quando o último leitor sai
+    if binary_snapshot is not None:
+        old, binary_snapshot = binary_snapshot, BinarySnapshot(BINARY_FILE)
+        old.retire()
+
+def load_binary_data():
+    """Carrega BINARY_FILE: catálogo, clientes, agregados e pedidos em andamento são lidos na hora;
+    os demais pedidos ficam no mmap até alguma tela acessá-los."""
+    global catalog_tree, orders_tree, orders_by_status, orders_by_costumer, order_pipeline, sales_stats, costumers, journal_entries, binary_snapshot, code_allocator, archive_stats
+    old, binary_snapshot = binary_snapshot, BinarySnapshot(BINARY_FILE)
+    if old is not None:
+        old.retire()
+    stats = binary_snapshot.stats()
+    code_allocator = CodeAllocator(stats.pop("last_codes", None))
+    archive_stats = SalesStats.from_dict(stats.pop("archive_stats", {}))
+
+    costumers = CostumerRegistry()
+    for costumer in binary_snapshot.costumers():
+        costumers.add(costumer)
+    catalog_tree = build_tree(binary_snapshot.items())
+
+    orders_tree = AVLTree.from_sorted((code, UNLOADED) for code in binary_snapshot.codes)
+    orders_tree.loader = load_binary_order
+    orders_by_status = {}
+    orders_by_costumer = {}
+    order_pipeline = OrderPipeline()
+    for i, code in enumerate(binary_snapshot.codes):
+        status = binary_snapshot.status_at(i)
+        if status in PIPELINE_STAGES:
+            index_order(orders_tree.search(orders_tree.root, code)) # Em andamento: decodifica já, entra nas filas
+        else:
+            orders_by_status.setdefault(status, {})[code] = None   # Lido só quando for listado
+            orders_by_costumer.setdefault(binary_snapshot.costumer_at(i), {})[code] = None
+    sales_stats = SalesStats.from_dict(stats)
+
+    journal_entries = replay_journal_into_store()
+    code_allocator.recover("catalog", catalog_tree)
+    code_allocator.recover("all_orders", orders_tree)
+    item_index.rebuild(catalog_tree)
+    print("✅ Snapshot binário aberto (pedidos lidos sob demanda).")
+
+#----------------------------------------------- Order archive (cold storage) -------------------------------------------------#
+# Pedidos encerrados há mais de ARCHIVE_AFTER_DAYS saem das árvores, dos índices e do snapshot e vão para arquivos JSON Lines
+# só de acréscimo, um por mês de criação: arquivo/pedidos-AAAA-MM.jsonl (pedidos antigos, sem data: arquivo/pedidos-sem-data.jsonl).
+# Assim o snapshot e os filtros só carregam os pedidos em andamento e os recentes. Os agregados de vendas continuam contando
+# os arquivados; consultas e relatórios leem as partições do disco quando pedem por elas.
+ARCHIVE_STATUSES = ("Delivered",) + CLOSED_STATUSES
+UNDATED_PARTITION = "sem-data"
+
+def archive_partition(order):
+    """Partição do pedido: 'AAAA-MM' da criação, ou 'sem-data'"""
+    return order.created_at[:7] if order.created_at else UNDATED_PARTITION
+
+def archive_path(partition):
+    return os.path.join(ARCHIVE_DIR, f"pedidos-{partition}.jsonl")
+
+def archive_partitions():
+    """Partições existentes, da mais antiga para a mais nova ('sem-data' primeiro)"""
+    try:
+        names = os.listdir(ARCHIVE_DIR)
+    except FileNotFoundError:
+        return []
+    partitions = [name[len("pedidos-"):-len(".jsonl")] for name in names if name.startswith("pedidos-") and name.endswith(".jsonl")]
+    return sorted(partitions, key=lambda partition: (partition != UNDATED_PARTITION, partition))
+
+def append_archive(orders):
+    """Acrescenta os pedidos às suas partições; só retorna depois que tudo está no disco (fsync)"""
+    by_partition = {}
+    for order in orders:
+        by_partition.setdefault(archive_partition(order), []).append(order)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for partition, group in by_partition.items():
+        with open(archive_path(partition), "a", encoding="utf-8") as arq:
+            arq.writelines(json.dumps(order.to_dict(), ensure_ascii=False) + "\n" for order in group)
+            arq.flush()
+            os.fsync(arq.fileno())
+    _fsync_dir(archive_path(UNDATED_PARTITION)) # Arquivos novos no diretório
+
+def read_archive(partitions=None, status=None, live=None):
+    """Gera os pedidos arquivados das partições (todas, se None), lendo uma partição por vez.
+    Um arquivamento interrompido antes de tirar o pedido das árvores deixa cópias repetidas no arquivo:
+    vale a última cópia, e os pedidos para os quais live(code) é verdadeiro (ainda nas árvores) ficam de fora."""
+    for partition in partitions or archive_partitions():
+        orders = {}
+        try:
+            with open(archive_path(partition), "r", encoding="utf-8") as arq:
+                for line in arq:
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError: # Última linha incompleta (queda durante a escrita)
+                        continue
+                    orders[data['code']] = data
+        except FileNotFoundError:
+            continue
+        for code, data in orders.items():
+            if (status is None or data['status'] == status) and not (live and live(code)):
+                yield Order.from_dict(data)
+
+def drop_archived(order):
+    """Tira das árvores, das filas e dos índices de status e de cliente um pedido que já está no arquivo (os agregados de vendas não mudam)"""
+    orders_by_status.get(order.status, {}).pop(order.code, None)
+    orders_by_costumer.get(order.costumer.code, {}).pop(order.code, None)
+    order_pipeline.remove(order)
+    orders_tree.root = orders_tree.delete(orders_tree.root, order.code)
+    archive_stats.add(order)
+
+def archive_orders(days=ARCHIVE_AFTER_DAYS):
+    """Arquiva os pedidos encerrados criados há mais de days dias (os sem data sempre). Primeiro grava o arquivo,
+    depois registra a saída no log e tira os pedidos das árvores: uma queda no meio deixa, no máximo,
+    uma cópia a mais no arquivo. Retorna quantos pedidos foram arquivados."""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+    old = []
+    for status in ARCHIVE_STATUSES:
+        for code in orders_by_status.get(status, {}):
+            order = orders_tree.search(orders_tree.root, code)
+            if not order.created_at or order.created_at < cutoff:
+                old.append(order)
+    if not old:
+        return 0
+    append_archive(old)
+    if len(old) * 8 > len(orders_tree):
+        # Boa parte da árvore saindo: remontar com os que ficam (O(n)) sai mais barato que uma remoção por pedido
+        gone = {order.code for order in old}
+        orders_tree.root = AVLTree.from_sorted((code, value) for code, value in orders_tree.raw_items() if code not in gone).root
+    for order in old:
+        drop_archived(order) # Na árvore remontada, a remoção só não encontra a chave
+    log_change("archived", *old)
+    return len(old)
+
+#----------------------------------------------- Data implementation -------------------------------------------------#
+def build_tree(records):
+    """Monta a AVL dos registros usando 'code' como chave.
+    O save_data grava em ordem de código, então normalmente dá para usar o from_sorted (O(n));
+    se a entrada não estiver ordenada, cai para inserções uma a uma."""
+    keys = [r.code for r in records]
+    if all(a < b for a, b in zip(keys, keys[1:])):
+        return AVLTree.from_sorted(zip(keys, records))
+    tree = AVLTree()
+    for key, record in zip(keys, records):
+        tree.root = tree.insert(tree.root, key, record)
+    return tree
+
+def load_data():
+    """Carrega o snapshot (dados.json, ou dados.bin com SNAPSHOT_FORMAT binary) e reaplica o log.
+    O que a carga grava no log (clientes com código trocado) só é escrito no fim, com tudo montado."""
+    with journal_batch():
+        _load_data()
+
+def _load_data():
+    global catalog_tree, orders_tree, orders_by_status, orders_by_costumer, order_pipeline, sales_stats, costumers, journal_entries, code_allocator, archive_stats # Indica que essas variáveis globais serão modificadas
+
+    if SNAPSHOT_FORMAT == "binary" and os.path.exists(BINARY_FILE):
+        return load_binary_data()
+    
+    try:
+        with open(DATA_FILE, 'r', encoding='utf-8') as arq:
+            dados = json.load(arq)
+    except FileNotFoundError:
+        print("⚠️ Arquivo 'dados.json' não encontrado. Iniciando com dados vazios.")
+        dados = {"all_orders": [], "catalog": [], "costumers": []}
+    except json.JSONDecodeError:
+        print("❌ Erro ao decodificar JSON. Iniciando com dados vazios.")
+        dados = {"all_orders": [], "catalog": [], "costumers": []}
+
+    # Aplica as mutações registradas no log desde a última compactação
+    journal_entries = replay_journal(dados)
+    code_allocator = CodeAllocator(dados.get("last_codes")) # Snapshots antigos não têm: recuperado das árvores abaixo
+    archive_stats = SalesStats.from_dict(dados.get("archive_stats", {}))
+    for data in dados['archived']: # Arquivados depois do snapshot (pelo log)
+        archive_stats.add(Order.from_dict(data))
+
+    # Carrega Clientes (registro indexado por código e celular; duplicatas pelo celular são unidas)
+    costumers = CostumerRegistry()
+    for data in dados['costumers']:
+        costumers.add(Costumer.from_dict(data))
+
+    # Carrega Catálogo (Reconstrói a AVL)
+    catalog_tree = build_tree([Item.from_dict(item) for item in dados['catalog']])
+    
+    # Carrega Pedidos (Reconstrói a AVL - Usando a mesma chave 'code')
+    orders_tree = build_tree([Order.from_dict(order) for order in dados['all_orders']])
+    orders_by_status = {}
+    orders_by_costumer = {}
+    order_pipeline = OrderPipeline() # Filas e agregados remontados numa única passada
+    sales_stats = SalesStats.from_dict(archive_stats.to_dict()) # Pedidos arquivados continuam nos relatórios
+    for order in orders_tree:
+        order.costumer = costumers.add(order.costumer) # Pedido aponta para o cliente do registro
+        index_order(order)
+        sales_stats.add(order)
+    code_allocator.recover("catalog", catalog_tree)
+    code_allocator.recover("all_orders", orders_tree)
+    item_index.rebuild(catalog_tree)
+
+    print("✅ Dados carregados e árvores AVL montadas.")
+
+
+catalog_tree = AVLTree()  # Agora é uma árvore AVL
+orders_tree = AVLTree()   # Agora é uma árvore AVL
+orders_by_status = {}     # Índice secundário: status -> {code: pedido}
+orders_by_costumer = {}   # Índice secundário: código do cliente -> {code: pedido}, em ordem de chegada
+order_pipeline = OrderPipeline() # Filas FIFO das etapas do pedido
+costumers = CostumerRegistry()   # Clientes indexados por código e celular
+code_allocator = CodeAllocator() # Próximos códigos de itens, pedidos e clientes
+sales_stats = SalesStats()       # Agregados de vendas para os relatórios (inclui os pedidos arquivados)
+archive_stats = SalesStats()     # Parte de sales_stats que vem de pedidos arquivados
+#----------------------------------------------- Instrumentation -------------------------------------------------#
+# Contagem de chamadas e histograma de latência das funções quentes, ligado só quando pedido (--instrument ou menu Diagnostics).
+# Desligado não custa nada: enable() troca as funções por versões que medem e disable() devolve as originais.
+DIAGNOSTICS_FILE = "diagnostics.json" # Métricas gravadas ao sair, com a instrumentação ligada
+PROFILE_FILE = "diagnostics.prof"     # Saída do cProfile (abrir com python -m pstats)
+PROFILE_TOP = 20                      # Linhas mostradas do cProfile/tracemalloc
+
+# (nome da métrica, classe ou None para função do módulo, atributo, arquivo gravado cujo tamanho conta como bytes escritos)
+def snapshot_file():
+    """Arquivo do snapshot no formato em uso (SNAPSHOT_FORMAT)"""
+    return BINARY_FILE if SNAPSHOT_FORMAT == "binary" else DATA_FILE
+
+# (nome, classe dona ou None para função do módulo, atributo, arquivo gravado: nome, função que o retorna ou None)
+# Os snapshots passam pelo SnapshotWriter (em segundo plano) e pelo compact_data (ao sair ou sem o gravador);
+# os percursos em ordem (__iter__, items, raw_items) passam todos pelo AVLTree._iter_nodes.
+INSTRUMENTED = (
+    ("AVLTree.insert", AVLTree, "insert", None),
+    ("AVLTree.search", AVLTree, "search", None),
+    ("AVLTree._iter_nodes", AVLTree, "_iter_nodes", None),
+    ("SnapshotWriter.snapshot", SnapshotWriter, "snapshot", snapshot_file),
+    ("compact_data", None, "compact_data", snapshot_file),
+    ("save_binary_snapshot", None, "save_binary_snapshot", BINARY_FILE),
+    ("load_data", None, "load_data", None),
+    ("get_orders_by_status", None, "get_orders_by_status", None),
+)
+
+class LatencyHistogram:
+    """Chamadas e latência de uma função. Baldes em potências de 2 de microssegundos:
+    o balde i conta as chamadas com duração em [2^(i-1), 2^i) µs (o 0, as abaixo de 1 µs)."""
+    __slots__ = ("calls", "total", "max", "buckets", "bytes_written", "last_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0      # Segundos
+        self.max = 0.0
+        self.buckets = [0] * 40
+        self.bytes_written = 0 # Só nas funções que gravam arquivo (snapshots)
+        self.last_bytes = 0
+
+    def record(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), len(self.buckets) - 1)] += 1
+
+    def percentile(self, p):
+        """Limite superior (µs) do balde onde cai o percentil p (0 a 100)"""
+        wanted = self.calls * p / 100
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return 2 ** i
+        return 0
+
+    def to_dict(self):
+        data = {
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_us": round(self.total * 1e6 / self.calls, 2) if self.calls else 0,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "max_us": round(self.max * 1e6, 2),
+            "histogram_us": {f"<{2 ** i}": count for i, count in enumerate(self.buckets) if count},
+        }
+        if self.bytes_written:
+            data["bytes_written"] = self.bytes_written
+            data["last_bytes"] = self.last_bytes
+        return data
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.metrics = {}     # nome -> LatencyHistogram
+        self.originals = []   # (dono, atributo, função original) trocados por enable()
+        self.lock = threading.Lock() # Os snapshots rodam na thread do SnapshotWriter
+        self.started = None
+
+    def _wrap(self, name, fn, output):
+        histogram = self.metrics.setdefault(name, LatencyHistogram())
+        lock = self.lock
+        def record(start):
+            elapsed = time.perf_counter() - start
+            path = output() if callable(output) else output
+            with lock:
+                histogram.record(elapsed)
+                if path is not None and os.path.exists(path):
+                    histogram.last_bytes = os.path.getsize(path)
+                    histogram.bytes_written += histogram.last_bytes
+        if inspect.isgeneratorfunction(fn):
+            # Geradores (percursos): mede do primeiro next() até o fim do consumo, não só a criação
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    yield from fn(*args, **kwargs)
+                finally:
+                    record(start)
+        else:
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    record(start)
+        timed.__wrapped__ = fn
+        return timed
+
+    def enable(self):
+        if self.enabled:
+            return
+        module = globals()
+        for name, owner, attribute, output in INSTRUMENTED:
+            original = getattr(owner, attribute) if owner else module[attribute]
+            self.originals.append((owner, attribute, original))
+            if owner:
+                setattr(owner, attribute, self._wrap(name, original, output))
+            else:
+                module[attribute] = self._wrap(name, original, output)
+        self.enabled = True
+        self.started = self.started or datetime.now().isoformat(timespec="seconds")
+
+    def disable(self):
+        """Devolve as funções originais; as métricas medidas até aqui continuam em self.metrics"""
+        module = globals()
+        for owner, attribute, original in reversed(self.originals):
+            if owner:
+                setattr(owner, attribute, original)
+            else:
+                module[attribute] = original
+        self.originals = []
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.metrics = {}
+            self.started = datetime.now().isoformat(timespec="seconds") if self.enabled else None
+        if self.enabled: # Os wrappers apontam para os histogramas antigos
+            self.disable()
+            self.enable()
+
+    def report(self):
+        with self.lock:
+            return {"enabled": self.enabled, "since": self.started,
+                    "metrics": {name: h.to_dict() for name, h in self.metrics.items() if h.calls}}
+
+    def dump(self, path=DIAGNOSTICS_FILE):
+        report = self.report()
+        _atomic_write(path, lambda arq: json.dump(report, arq, indent=4, ensure_ascii=False))
+
+def profile_flow(flow, service, memory=False):
+    """Roda um fluxo do menu (ex: consults) com o cProfile (tempo de CPU, sem contar a espera no input)
+    ou, com memory=True, com o tracemalloc. Imprime as PROFILE_TOP linhas mais pesadas."""
+    if memory:
+        tracemalloc.start()
+        try:
+            flow(service)
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        print(f"📈 Memory: {current / 2**20:.1f} MB still allocated, peak {peak / 2**20:.1f} MB")
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+            print(f"  {stat}")
+        return
+    profiler = cProfile.Profile(time.process_time)
+    profiler.runcall(flow, service)
+    profiler.dump_stats(PROFILE_FILE)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    print(f"📈 Full profile saved to {PROFILE_FILE} (python -m pstats {PROFILE_FILE})")
+
+instrumentation = Instrumentation()
+#----------------------------------------------- Storage backends -------------------------------------------------#
+class Store:
+    """Interface de armazenamento usada pelos menus. Duas implementações:
+    MemoryStore (árvores AVL + dados.json/dados.bin e o log) e SqliteStore (banco dados.db).
+
+    Registros entram e saem como Item/Costumer/Order. Depois de alterar um registro devolvido pelo store,
+    a mudança tem que passar por ele (save_item, change_stock, set_order_status...) para ser gravada.
+
+    Carga e gravação: load(), close(), batch() (bloco cujas gravações vão juntas para o disco),
+                      savepoint() (bloco dentro de um batch() que, se levantar exceção, é desfeito sozinho)
+    Códigos: reserve_codes(entity, n) (bloco de n códigos novos de 'catalog', 'all_orders' ou 'costumers')
+    Importação em lote: import_items(items), import_orders(orders), iter_orders() (todos os pedidos, sem guardá-los)
+    Arquivo: archive_orders(days), archive_partitions(), archived_orders(partition, status) (lidos do disco sob demanda)
+    Itens: items(), items_page(after, size), count_items(), get_item(code), next_item_code(),
+           add_item(item), save_item(item), change_stock(item, quantity), restore_stock(order)
+    Clientes: find_costumer(cellphone), get_costumer(code), get_or_create_costumer(name, cellphone), costumers_sorted(),
+              costumer_orders(code) (pedidos do cliente, em ordem de chegada), costumer_sales(code) ([pedidos, receita])
+    Pedidos: orders_page(after, size), count_orders(), next_order_code(), get_order(code), order_at(index),
+             add_order(order), save_order(order), set_order_status(order, status), orders_with_status(status), count_status(status),
+             peek_order(stage), advance_orders(stage, new_status, limit)
+    Relatórios: sales_count(status), sales_revenue(status), sales_by(name), check_sales()
+
+    Os stores não são thread-safe: quem usa de várias threads serializa as escritas com self.lock (ver OrderService).
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+
+    def next_item_code(self):
+        return self.reserve_codes("catalog", 1)[0]
+
+    def next_order_code(self):
+        return self.reserve_codes("all_orders", 1)[0]
+
+    def archive_partitions(self):
+        return archive_partitions()
+
+    def archived_orders(self, partition=None, status=None):
+        """Gera os pedidos arquivados da partição (todas, se None), com esse status (todos, se None)"""
+        return read_archive([partition] if partition else None, status, lambda code: self.get_order(code) is not None)
+
+    def accept_next_orders(self, n):
+        """Aceita os próximos n pedidos pendentes"""
+        return self.advance_orders("Pending", "Accepted", n)
+
+    def dispatch_ready_orders(self):
+        """Envia para entrega todos os pedidos prontos (os que já esperam entregador primeiro)"""
+        return self.advance_orders("Waiting Delivery", "Delivering") + self.advance_orders("Ready", "Delivering")
+
+class MemoryStore(Store):
+    """Implementação original: árvores AVL e índices em memória, snapshot + log em disco"""
+    def load(self):
+        global snapshot_writer
+        load_data()
+        snapshot_writer = SnapshotWriter(self.lock) # Compactações passam a ser em segundo plano
+        snapshot_writer.start()
+
+    def close(self):
+        global snapshot_writer
+        if snapshot_writer is not None:
+            snapshot_writer.flush() # Espera a thread e deixa o snapshot completo ao sair
+            snapshot_writer = None
+        else:
+            compact_data()
+
+    def batch(self):
+        return journal_batch()
+
+    def savepoint(self):
+        return savepoint()
+
+    def reserve_codes(self, entity, n):
+        return code_allocator.reserve(entity, n)
+
+    def import_items(self, items):
+        """Insere um lote de itens direto na árvore, sem passar pelo log: a importação inteira vai para o disco
+        de uma vez, no snapshot do close(). Retorna os códigos que já existiam (esses itens ficam de fora)."""
+        skipped, fresh = [], {}
+        for item in items:
+            if item.code in catalog_tree or item.code in fresh:
+                skipped.append(item.code)
+            else:
+                fresh[item.code] = item
+        catalog_tree.extend(sorted(fresh.items()))
+        for item in fresh.values():
+            item_index.add(item)
+        if fresh:
+            code_allocator.observe("catalog", max(fresh))
+        return skipped
+
+    def import_orders(self, orders):
+        """Como import_items, para pedidos (entram nos índices, filas e agregados). O cliente de cada pedido
+        é procurado pelo celular e criado se não existir, também sem passar pelo log."""
+        skipped, fresh = [], {}
+        for order in orders:
+            if order.code in orders_tree or order.code in fresh:
+                skipped.append(order.code)
+            else:
+                order.costumer, _ = costumers.get_or_create(order.costumer.name, order.costumer.cellphone)
+                fresh[order.code] = order
+        orders_tree.extend(sorted(fresh.items()))
+        for order in fresh.values():
+            index_order(order)
+            sales_stats.add(order)
+        if fresh:
+            code_allocator.observe("all_orders", max(fresh))
+        return skipped
+
+    def archive_orders(self, days):
+        return archive_orders(days)
+
+    def archived_orders(self, partition=None, status=None):
+        return read_archive([partition] if partition else None, status, orders_tree.__contains__)
+
+    def iter_orders(self):
+        """Todos os pedidos em ordem de código. Os que ainda estão no snapshot binário são
+        decodificados um a um e não ficam guardados na árvore."""
+        for code, order in orders_tree.raw_items():
+            yield load_binary_order(code) if order is UNLOADED else order
+
+    # Itens
+    def items(self):
+        return iter(catalog_tree)
+
+    def items_page(self, after, size):
+        return catalog_tree.page(after, size)
+
+    def count_items(self):
+        return len(catalog_tree)
+
+    def get_item(self, code):
+        return catalog_tree.search(catalog_tree.root, code) # Busca O(log n)
+
+    def add_item(self, item):
+        catalog_tree.root = catalog_tree.insert(catalog_tree.root, item.code, item)
+        item_index.add(item)
+        on_undo(lambda: self._drop_item(item))
+        log_change("catalog", item)
+
+    def _drop_item(self, item):
+        catalog_tree.root = catalog_tree.delete(catalog_tree.root, item.code)
+        item_index.remove(item.code)
+
+    def save_item(self, item):
+        log_change("catalog", item)
+
+    def change_stock(self, item, quantity):
+        update_stock(item, quantity)
+        log_change("catalog", item)
+
+    def restore_stock(self, order):
+        return restore_stock(order)
+
+    # Clientes
+    def find_costumer(self, cellphone):
+        return costumers.find_by_cellphone(cellphone) # Busca O(1)
+
+    def get_costumer(self, code):
+        return costumers.get(code)
+
+    def get_or_create_costumer(self, name, cellphone):
+        costumer, created = costumers.get_or_create(name, cellphone)
+        if created:
+            log_change("costumers", costumer)
+        return costumer, created
+
+    def costumers_sorted(self):
+        return costumers.sorted()
+
+    def costumer_orders(self, code):
+        return get_costumer_orders(code)
+
+    def costumer_sales(self, code):
+        return list(sales_stats.by_costumer.get(code, [0, 0])) # Inclui os pedidos arquivados
+
+    # Pedidos
+    def orders_page(self, after, size):
+        return orders_tree.page(after, size)
+
+    def count_orders(self):
+        return len(orders_tree)
+
+    def get_order(self, code):
+        return orders_tree.search(orders_tree.root, code)
+
+    def order_at(self, index):
+        return orders_tree.select(index) # Busca O(log n) pela posição
+
+    def add_order(self, order):
+        register_order(order)
+        log_change("all_orders", order)
+
+    def save_order(self, order):
+        log_change("all_orders", order)
+
+    def set_order_status(self, order, status):
+        set_order_status(order, status)
+        log_change("all_orders", order)
+
+    def orders_with_status(self, status):
+        return get_orders_by_status(status)
+
+    def count_status(self, status):
+        return len(orders_by_status.get(status, {}))
+
+    def peek_order(self, stage):
+        return order_pipeline.peek(stage)
+
+    def advance_orders(self, stage, new_status, limit=None):
+        return advance_orders(stage, new_status, limit)
+
+    # Relatórios (agregados mantidos em sales_stats)
+    def sales_count(self, status=None):
+        return sales_stats.count(status)
+
+    def sales_revenue(self, status=None):
+        return sales_stats.revenue(status)
+
+    def sales_by(self, name):
+        """Agregado 'status', 'costumer', 'item', 'day' ou 'hour': chave -> [quantidade, receita]"""
+        return getattr(sales_stats, "by_" + name)
+
+    def check_sales(self):
+        return sales_stats.check(chain(orders_tree, self.archived_orders())) # Recalcula tudo, arquivo incluído: O(n)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    code INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS costumers (
+    code INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    cellphone TEXT NOT NULL,
+    cellphone_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS costumers_cellphone ON costumers (cellphone_key);
+CREATE TABLE IF NOT EXISTS orders (
+    code INTEGER PRIMARY KEY,
+    costumer INTEGER NOT NULL REFERENCES costumers (code),
+    status TEXT NOT NULL,
+    payment TEXT NOT NULL,
+    total REAL NOT NULL,
+    created_at TEXT,
+    status_seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, status_seq);
+CREATE INDEX IF NOT EXISTS orders_costumer ON orders (costumer);
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_code INTEGER NOT NULL REFERENCES orders (code),
+    position INTEGER NOT NULL,
+    item INTEGER NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    name TEXT, -- Nome do item no momento do pedido (NULL nas linhas gravadas antes desta coluna)
+    PRIMARY KEY (order_code, position)
+);
+CREATE INDEX IF NOT EXISTS order_lines_item ON order_lines (item);
+CREATE TABLE IF NOT EXISTS last_codes (
+    entity TEXT PRIMARY KEY,
+    code INTEGER NOT NULL
+);
+"""
+
+# Marca d'água de cada entidade: nunca abaixo do maior código da tabela (banco antigo ou registros importados)
+SQLITE_RECOVER_CODES = ("INSERT INTO last_codes VALUES (?, (SELECT COALESCE(MAX(code), 0) FROM {table})) "
+                        "ON CONFLICT (entity) DO UPDATE SET code = MAX(code, excluded.code)")
+SQLITE_CODE_TABLES = {"catalog": "items", "all_orders": "orders", "costumers": "costumers"}
+
+ORDER_SELECT = ("SELECT o.code, c.code, c.name, c.cellphone, o.status, o.payment, o.total, o.created_at "
+                "FROM orders o JOIN costumers c ON c.code = o.costumer")
+
+# Mesmas regras do SalesStats: cancelados/rejeitados só contam por status
+SALES_QUERIES = {
+    "status": "SELECT status, COUNT(*), SUM(total) FROM orders GROUP BY status",
+    "costumer": "SELECT costumer, COUNT(*), SUM(total) FROM orders WHERE status NOT IN (?, ?) GROUP BY costumer",
+    "item": ("SELECT l.item, SUM(l.quantity), SUM(l.price * l.quantity) FROM order_lines l "
+             "JOIN orders o ON o.code = l.order_code WHERE o.status NOT IN (?, ?) GROUP BY l.item"),
+    "day": ("SELECT substr(created_at, 1, 10), COUNT(*), SUM(total) FROM orders "
+            "WHERE status NOT IN (?, ?) AND created_at <> '' GROUP BY 1"),
+    "hour": ("SELECT replace(substr(created_at, 1, 13), 'T', ' '), COUNT(*), SUM(total) FROM orders "
+             "WHERE status NOT IN (?, ?) AND created_at <> '' GROUP BY 1"),
+}
+
+class SqliteStore(Store):
+    """Backend SQLite (sqlite3 da biblioteca padrão) em modo WAL.
+
+    Filtros por status, relatórios e estoque viram consultas nos índices em vez de varreduras em Python.
+    Cada pedido (com suas linhas) é gravado numa transação. A ordem de chegada em cada etapa vem de
+    status_seq, renovado a cada mudança de status (o equivalente do ticket do OrderPipeline)."""
+    def __init__(self, path=SQLITE_FILE):
+        super().__init__()
+        self.path = path
+        self.db = None
+        self._seq = 0   # Último status_seq usado
+        self._batch = 0 # Profundidade de batch() aberto: dentro dele não há commit por operação
+
+    def load(self):
+        self.db = sqlite3.connect(self.path, check_same_thread=False) # Threads usam com o store_lock do OrderService
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL") # Em WAL, fsync só nos checkpoints; o banco nunca fica corrompido
+        self.db.executescript(SQLITE_SCHEMA)
+        if "name" not in {row[1] for row in self.db.execute("PRAGMA table_info(order_lines)")}:
+            self.db.execute("ALTER TABLE order_lines ADD COLUMN name TEXT") # Banco de antes do nome nas linhas
+        if self.db.execute("SELECT 1 FROM items UNION ALL SELECT 1 FROM orders LIMIT 1").fetchone() is None:
+            # Banco novo: importa o que existir no dados.json (e no log)
+            load_data()
+            self.import_records(catalog_tree, costumers, orders_tree)
+            with self.db:
+                self.db.executemany("INSERT INTO last_codes VALUES (?, ?)", code_allocator.last.items())
+            print(f"✅ Dados importados para {self.path}.")
+        self._seq = self.db.execute("SELECT COALESCE(MAX(status_seq), 0) FROM orders").fetchone()[0]
+        with self.db:
+            for entity, table in SQLITE_CODE_TABLES.items():
+                self.db.execute(SQLITE_RECOVER_CODES.format(table=table), (entity,))
+        item_index.rebuild(self.items()) # A busca por nome fica em memória também neste backend
+
+    def close(self):
+        self.db.execute("PRAGMA optimize")
+        self.db.close()
+
+    @contextmanager
+    def batch(self):
+        """Todas as operações do bloco numa transação só (um commit na saída)"""
+        self._batch += 1
+        try:
+            yield
+        except BaseException:
+            self._batch -= 1
+            if not self._batch:
+                self.db.rollback()
+            raise
+        self._batch -= 1
+        if not self._batch:
+            self.db.commit()
+
+    @contextmanager
+    def savepoint(self):
+        """Bloco tudo-ou-nada dentro do batch(): se falhar, volta o banco (ROLLBACK TO) e a memória
+        (índice de busca) ao início do bloco, sem desfazer o resto da transação"""
+        with self.batch(), savepoint():
+            if not self.db.in_transaction:
+                self.db.execute("BEGIN")
+            self.db.execute("SAVEPOINT operation")
+            try:
+                yield
+            except BaseException:
+                self.db.execute("ROLLBACK TO operation")
+                self.db.execute("RELEASE operation")
+                raise
+            self.db.execute("RELEASE operation")
+
+    def _transaction(self):
+        """Transação de uma operação: a do batch() aberto, ou uma só dela. Aninhadas viram uma só
+        (um 'with self.db' por dentro de outro faria commit no meio)."""
+        return self.batch()
+
+    def reserve_codes(self, entity, n):
+        """Sobe a marca d'água na tabela last_codes: o bloco fica reservado mesmo se o app cair antes de usá-lo"""
+        with self._transaction():
+            self.db.execute("UPDATE last_codes SET code = code + ? WHERE entity = ?", (n, entity))
+            last = self._one("SELECT code FROM last_codes WHERE entity = ?", (entity,))
+        return range(last - n + 1, last + 1)
+
+    def _existing(self, table, codes):
+        """Quais dos códigos já estão na tabela (consultados em blocos de 500)"""
+        found = set()
+        for start in range(0, len(codes), 500):
+            chunk = codes[start:start + 500]
+            found.update(row[0] for row in self.db.execute(
+                f"SELECT code FROM {table} WHERE code IN ({', '.join('?' * len(chunk))})", chunk))
+        return found
+
+    def import_items(self, items):
+        """Insere um lote de itens numa transação. Retorna os códigos que já existiam (esses itens ficam de fora)."""
+        existing = self._existing("items", [item.code for item in items])
+        skipped, fresh = [], {}
+        for item in items:
+            if item.code in existing or item.code in fresh:
+                skipped.append(item.code)
+            else:
+                fresh[item.code] = item
+        with self._transaction():
+            self.db.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)",
+                                ((i.code, i.name, i.description, i.price, i.stock) for i in fresh.values()))
+            self.db.execute(SQLITE_RECOVER_CODES.format(table="items"), ("catalog",))
+        for item in fresh.values():
+            item_index.add(item)
+        return skipped
+
+    def import_orders(self, orders):
+        """Como import_items, para pedidos (cada um com suas linhas). O cliente de cada pedido
+        é procurado pelo celular e criado se não existir."""
+        existing = self._existing("orders", [order.code for order in orders])
+        skipped, written = [], set()
+        with self._transaction():
+            for order in orders:
+                if order.code in existing or order.code in written:
+                    skipped.append(order.code)
+                    continue
+                order.costumer, _ = self.get_or_create_costumer(order.costumer.name, order.costumer.cellphone)
+                self._write_order(order)
+                written.add(order.code)
+            self.db.execute(SQLITE_RECOVER_CODES.format(table="orders"), ("all_orders",))
+        return skipped
+
+    def archive_orders(self, days):
+        raise ValueError("Archiving is only available with the memory store (SQLite already reads orders on demand).")
+
+    def iter_orders(self):
+        """Todos os pedidos em ordem de código, lidos em páginas de 1000"""
+        after = None
+        while page := self.orders_page(after, 1000):
+            yield from page
+            after = page[-1].code
+
+    def import_records(self, items, costumers, orders):
+        """Grava todos os registros numa única transação (importação inicial)"""
+        with self._transaction():
+            self.db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)",
+                                ((i.code, i.name, i.description, i.price, i.stock) for i in items))
+            self.db.executemany("INSERT OR REPLACE INTO costumers VALUES (?, ?, ?, ?)",
+                                ((c.code, c.name, c.cellphone, cellphone_key(c.cellphone)) for c in costumers))
+            for order in orders:
+                self._write_order(order)
+
+    def _write_order(self, order):
+        self._seq += 1
+        self.db.execute("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (order.code, order.costumer.code, order.status, order.payment,
+                         order.order_total_price, order.created_at, self._seq))
+        self.db.execute("DELETE FROM order_lines WHERE order_code = ?", (order.code,))
+        self.db.executemany("INSERT INTO order_lines VALUES (?, ?, ?, ?, ?, ?)",
+                            ((order.code, position, line.code, line.price, line.quantity, line.name)
+                             for position, line in enumerate(order.items_order)))
+
+    def _orders(self, where="", params=(), tail=""):
+        """Monta os pedidos da consulta, buscando as linhas de todos eles de uma vez (em blocos de 500 códigos)"""
+        orders = {}
+        for code, c_code, c_name, c_cellphone, status, payment, total, created_at in self.db.execute(f"{ORDER_SELECT} {where} {tail}", params):
+            orders[code] = Order(code, Costumer(c_code, c_name, c_cellphone), [], status, payment, total, created_at)
+        codes = list(orders)
+        for start in range(0, len(codes), 500):
+            chunk = codes[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for order_code, item, price, quantity, name in self.db.execute(
+                    f"SELECT order_code, item, price, quantity, name FROM order_lines WHERE order_code IN ({placeholders}) ORDER BY order_code, position", chunk):
+                orders[order_code].items_order.append(OrderLine(item, price, quantity, name))
+        return list(orders.values())
+
+    def _one(self, sql, params=()):
+        return self.db.execute(sql, params).fetchone()[0]
+
+    # Itens
+    def items(self):
+        for row in self.db.execute("SELECT code, name, description, price, stock FROM items ORDER BY code"):
+            yield Item(*row)
+
+    def items_page(self, after, size):
+        if after is None:
+            rows = self.db.execute("SELECT code, name, description, price, stock FROM items ORDER BY code LIMIT ?", (size,))
+        else:
+            rows = self.db.execute("SELECT code, name, description, price, stock FROM items WHERE code > ? ORDER BY code LIMIT ?", (after, size))
+        return [Item(*row) for row in rows]
+
+    def count_items(self):
+        return self._one("SELECT COUNT(*) FROM items")
+
+    def get_item(self, code):
+        row = self.db.execute("SELECT code, name, description, price, stock FROM items WHERE code = ?", (code,)).fetchone()
+        return Item(*row) if row else None
+
+    def add_item(self, item):
+        with self._transaction():
+            self.db.execute("INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?)", # Como a AVL: código repetido é ignorado
+                            (item.code, item.name, item.description, item.price, item.stock))
+        item_index.add(item)
+        on_undo(lambda: item_index.remove(item.code))
+
+    def save_item(self, item):
+        """Grava nome, descrição e preço (o estoque só muda por change_stock)"""
+        with self._transaction():
+            self.db.execute("UPDATE items SET name = ?, description = ?, price = ? WHERE code = ?",
+                            (item.name, item.description, item.price, item.code))
+
+    def change_stock(self, item, quantity):
+        """Soma quantity ao estoque num UPDATE condicional: o banco recusa deixar o estoque negativo"""
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            raise ValueError("Quantity must be a number.")
+        with self._transaction():
+            cursor = self.db.execute("UPDATE items SET stock = stock + ? WHERE code = ? AND stock + ? >= 0",
+                                     (quantity, item.code, quantity))
+        if cursor.rowcount == 0:
+            raise ValueError("Insufficient stock to remove the requested quantity.")
+        item.stock = self._one("SELECT stock FROM items WHERE code = ?", (item.code,))
+
+    def restore_stock(self, order):
+        quantities = {}
+        for line in order.items_order:
+            quantities[line.code] = quantities.get(line.code, 0) + line.quantity
+        with self._transaction():
+            self.db.executemany("UPDATE items SET stock = stock + ? WHERE code = ?",
+                                ((quantity, code) for code, quantity in quantities.items()))
+        return [item for item in map(self.get_item, quantities) if item]
+
+    # Clientes
+    def find_costumer(self, cellphone):
+        row = self.db.execute("SELECT code, name, cellphone FROM costumers WHERE cellphone_key = ? ORDER BY code LIMIT 1",
+                              (cellphone_key(cellphone),)).fetchone()
+        return Costumer(*row) if row else None
+
+    def get_costumer(self, code):
+        row = self.db.execute("SELECT code, name, cellphone FROM costumers WHERE code = ?", (code,)).fetchone()
+        return Costumer(*row) if row else None
+
+    def get_or_create_costumer(self, name, cellphone):
+        """Busca e criação (código reservado + INSERT) numa transação só"""
+        with self._transaction():
+            existing = self.find_costumer(cellphone)
+            if existing:
+                return existing, False
+            costumer = Costumer(self.reserve_codes("costumers", 1)[0], name, cellphone)
+            self.db.execute("INSERT INTO costumers VALUES (?, ?, ?, ?)",
+                            (costumer.code, costumer.name, costumer.cellphone, cellphone_key(cellphone)))
+        return costumer, True
+
+    def costumers_sorted(self):
+        return [Costumer(*row) for row in self.db.execute("SELECT code, name, cellphone FROM costumers ORDER BY code")]
+
+    def costumer_orders(self, code):
+        return self._orders("WHERE o.costumer = ?", (code,), "ORDER BY o.code") # Índice orders_costumer
+
+    def costumer_sales(self, code):
+        return list(self.db.execute("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM orders WHERE costumer = ? AND status NOT IN (?, ?)",
+                                    (code, *CLOSED_STATUSES)).fetchone())
+
+    # Pedidos
+    def orders_page(self, after, size):
+        if after is None:
+            return self._orders("", (size,), "ORDER BY o.code LIMIT ?")
+        return self._orders("WHERE o.code > ?", (after, size), "ORDER BY o.code LIMIT ?")
+
+    def count_orders(self):
+        return self._one("SELECT COUNT(*) FROM orders")
+
+    def get_order(self, code):
+        orders = self._orders("WHERE o.code = ?", (code,))
+        return orders[0] if orders else None
+
+    def order_at(self, index):
+        if index < 0:
+            return None
+        orders = self._orders("", (index,), "ORDER BY o.code LIMIT 1 OFFSET ?")
+        return orders[0] if orders else None
+
+    def add_order(self, order):
+        with self._transaction(): # Pedido e linhas numa transação só
+            self._write_order(order)
+
+    def save_order(self, order):
+        with self._transaction():
+            self.db.execute("UPDATE orders SET payment = ?, total = ? WHERE code = ?", (order.payment, order.order_total_price, order.code))
+
+    def set_order_status(self, order, status):
+        self._seq += 1
+        with self._transaction():
+            self.db.execute("UPDATE orders SET status = ?, status_seq = ? WHERE code = ?", (status, self._seq, order.code))
+        order.status = status
+
+    def orders_with_status(self, status):
+        return self._orders("WHERE o.status = ?", (status,), "ORDER BY o.status_seq")
+
+    def count_status(self, status):
+        return self._one("SELECT COUNT(*) FROM orders WHERE status = ?", (status,))
+
+    def peek_order(self, stage):
+        orders = self._orders("WHERE o.status = ?", (stage,), "ORDER BY o.status_seq LIMIT 1")
+        return orders[0] if orders else None
+
+    def advance_orders(self, stage, new_status, limit=None):
+        """Move até limit pedidos (todos, se None) da etapa para new_status, em ordem FIFO, numa transação"""
+        if limit is not None and limit <= 0:
+            return []
+        moved = self._orders("WHERE o.status = ?", (stage, -1 if limit is None else limit), "ORDER BY o.status_seq LIMIT ?")
+        with self._transaction():
+            for order in moved:
+                self._seq += 1
+                self.db.execute("UPDATE orders SET status = ?, status_seq = ? WHERE code = ?", (new_status, self._seq, order.code))
+                order.status = new_status
+        return moved
+
+    # Relatórios (consultas agregadas no banco)
+    def sales_count(self, status=None):
+        if status is None:
+            return self.count_orders()
+        return self.count_status(status)
+
+    def sales_revenue(self, status=None):
+        if status is None:
+            return self._one("SELECT COALESCE(SUM(total), 0) FROM orders")
+        return self._one("SELECT COALESCE(SUM(total), 0) FROM orders WHERE status = ?", (status,))
+
+    def sales_by(self, name):
+        """Agregado 'status', 'costumer', 'item', 'day' ou 'hour': chave -> [quantidade, receita]"""
+        params = () if name == "status" else CLOSED_STATUSES
+        return {key: [count, revenue] for key, count, revenue in self.db.execute(SALES_QUERIES[name], params)}
+
+    def check_sales(self):
+        """Os relatórios já saem do banco; confere a integridade do arquivo e as referências entre tabelas"""
+        problems = [row[0] for row in self.db.execute("PRAGMA quick_check") if row[0] != "ok"]
+        orphans = self._one("SELECT COUNT(*) FROM orders WHERE costumer NOT IN (SELECT code FROM costumers)")
+        if orphans:
+            problems.append(f"{orphans} order(s) reference a missing costumer")
+        empty = self._one("SELECT COUNT(*) FROM orders o WHERE NOT EXISTS (SELECT 1 FROM order_lines l WHERE l.order_code = o.code)")
+        if empty:
+            problems.append(f"{empty} order(s) without items")
+        return problems
+
+store = MemoryStore() # Backend em uso pelos menus (--store escolhe)
+
+#----------------------------------------------- Stock reservations -------------------------------------------------#
+CART_TTL = 900 # Segundos sem mexer no carrinho até ele ser tido como abandonado e devolver o que reservou
+
+@dataclass(slots=True)
+class Cart:
+    code: int
+    lines: list        # OrderLine reservadas, na ordem em que entraram
+    expires_at: float  # time.monotonic() em que a reserva vence
+
+class StockReservations:
+    """Reserva de estoque para pedidos em montagem (carrinhos), segura entre threads.
+
+    Reservar não mexe no estoque gravado: só separa unidades (held), de modo que o disponível de um item
+    é estoque - reservado. commit() baixa o estoque de verdade e release() (ou o vencimento) devolve a reserva.
+
+    Travas: uma por item, sempre tomadas em ordem crescente de código, então dois pedidos com itens em comum
+    nunca se bloqueiam mutuamente. store_lock serializa as chamadas ao store (que não é thread-safe) e é sempre
+    tomado depois das travas dos itens, nunca antes."""
+    def __init__(self, store, store_lock, ttl=CART_TTL):
+        self.store = store
+        self.store_lock = store_lock
+        self.ttl = ttl
+        self.held = {}   # código do item -> unidades reservadas em carrinhos abertos
+        self.carts = {}  # código do carrinho -> Cart
+        self._locks = {} # código do item -> threading.Lock
+        self._locks_guard = threading.Lock()
+        self._carts_guard = threading.Lock()
+        self._next_cart = 0
+        self._next_sweep = 0 # Próxima vez (monotonic) em que expire() procura carrinhos vencidos
+
+    @contextmanager
+    def _locked(self, codes):
+        """Segura as travas dos itens, em ordem de código"""
+        with self._locks_guard:
+            locks = [self._locks.setdefault(code, threading.Lock()) for code in sorted(codes)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @staticmethod
+    def _normalize(lines):
+        """Confere e converte as linhas [(código do item, quantidade)] para inteiros"""
+        normalized = []
+        for code, quantity in lines:
+            try:
+                code, quantity = int(code), int(quantity)
+            except (TypeError, ValueError):
+                raise ValueError("Item code and quantity must be numbers.")
+            if quantity <= 0:
+                raise ValueError("Quantity must be positive.")
+            normalized.append((code, quantity))
+        return normalized
+
+    @staticmethod
+    def _quantities(lines):
+        """Soma as quantidades por código: [(código, quantidade)] -> {código: quantidade}"""
+        quantities = {}
+        for code, quantity in lines:
+            quantities[code] = quantities.get(code, 0) + quantity
+        return quantities
+
+    def available(self, item):
+        return item.stock - self.held.get(item.code, 0)
+
+    def open(self):
+        """Abre um carrinho vazio e retorna o código dele"""
+        self.expire()
+        with self._carts_guard:
+            self._next_cart += 1
+            self.carts[self._next_cart] = Cart(self._next_cart, [], time.monotonic() + self.ttl)
+            return self._next_cart
+
+    def reserve(self, cart_code, lines):
+        """Reserva todas as linhas [(código do item, quantidade)] no carrinho, ou nenhuma.
+        Retorna as linhas do carrinho."""
+        self.expire()
+        lines = self._normalize(lines)
+        quantities = self._quantities(lines)
+        with self._locked(quantities):
+            items = {}
+            for code, quantity in quantities.items():
+                with self.store_lock:
+                    item = self.store.get_item(code)
+                if item is None:
+                    raise LookupError(f"Item {code} not found.")
+                if self.available(item) < quantity:
+                    raise ValueError(f"Insufficient stock for {item.name}.")
+                items[code] = item
+            with self._carts_guard: # O carrinho pode ter vencido enquanto os itens eram conferidos
+                cart = self.carts.get(cart_code)
+                if cart is None:
+                    raise LookupError(f"Cart {cart_code} not found or expired.")
+                for code, quantity in lines:
+                    cart.lines.append(OrderLine(code, items[code].price, quantity, items[code].name))
+                cart.expires_at = time.monotonic() + self.ttl
+            for code, quantity in quantities.items():
+                self.held[code] = self.held.get(code, 0) + quantity
+            return list(cart.lines)
+
+    def commit(self, cart_code, on_commit):
+        """Baixa do estoque tudo o que o carrinho reservou e chama on_commit(linhas) ainda com as travas,
+        numa única gravação (store.savepoint: se on_commit falhar, a baixa é desfeita). Retorna o que on_commit retornar."""
+        with self._carts_guard:
+            cart = self.carts.get(cart_code)
+            if cart is None:
+                raise LookupError(f"Cart {cart_code} not found or expired.")
+            if not cart.lines:
+                raise ValueError("Order must have at least one item!")
+            del self.carts[cart_code]
+        quantities = self._quantities((line.code, line.quantity) for line in cart.lines)
+        with self._locked(quantities):
+            try:
+                with self.store_lock, self.store.savepoint():
+                    for code, quantity in quantities.items():
+                        self.store.change_stock(self.store.get_item(code), -quantity) # Coberto pela reserva
+                    return on_commit(cart.lines)
+            finally:
+                for code, quantity in quantities.items():
+                    self.held[code] -= quantity
+
+    def release(self, cart_code):
+        """Desiste do carrinho, devolvendo o que ele reservou (não faz nada se ele já não existe)"""
+        with self._carts_guard:
+            cart = self.carts.pop(cart_code, None)
+        if cart:
+            self._release_lines(cart)
+
+    def _release_lines(self, cart):
+        quantities = self._quantities((line.code, line.quantity) for line in cart.lines)
+        with self._locked(quantities):
+            for code, quantity in quantities.items():
+                self.held[code] -= quantity
+
+    def adjust(self, code, quantity):
+        """Soma quantity ao estoque do item sem deixar o disponível (estoque - reservado) negativo"""
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            raise ValueError("Quantity must be a number.")
+        with self._locked([code]):
+            with self.store_lock:
+                item = self.store.get_item(code)
+                if item is None:
+                    raise LookupError(f"Item {code} not found.")
+                if quantity < 0 and -quantity > self.available(item):
+                    raise ValueError("Insufficient stock to remove the requested quantity.")
+                self.store.change_stock(item, quantity)
+            return item
+
+    def expire(self, force=False):
+        """Devolve as reservas dos carrinhos vencidos. Procura no máximo uma vez por segundo (a não ser com force).
+        Retorna quantos carrinhos venceram."""
+        now = time.monotonic()
+        if now < self._next_sweep and not force:
+            return 0
+        self._next_sweep = now + 1
+        with self._carts_guard:
+            expired = [cart for cart in self.carts.values() if cart.expires_at <= now]
+            for cart in expired:
+                del self.carts[cart.code]
+        for cart in expired:
+            self._release_lines(cart)
+        return len(expired)
+
+#----------------------------------------------- Service API -------------------------------------------------#
+ORDER_STATUSES = PIPELINE_STAGES + ("Delivered",) + CLOSED_STATUSES
+SALES_BREAKDOWNS = ("status", "costumer", "item", "day", "hour")
+
+class OrderService:
+    """As operações do sistema sem input()/print(), usadas pelos menus e pelo servidor HTTP.
+
+    Dados inválidos levantam ValueError e registros inexistentes LookupError, com a mensagem para o usuário.
+    Tudo passa pelo store; operações com várias gravações usam store.batch() para irem juntas ao disco.
+    As operações de escrita podem ser chamadas de várias threads: o estoque é reservado com travas por item
+    (StockReservations) e as gravações no store são serializadas por self.lock."""
+    def __init__(self, store):
+        self.store = store
+        self.lock = store.lock
+        self.reservations = StockReservations(store, self.lock)
+
+    # Itens
+    def get_item(self, code):
+        item = self.store.get_item(code)
+        if item is None:
+            raise LookupError(f"Item {code} not found.")
+        return item
+
+    def find_item(self, code):
+        """Como get_item, mas retorna None se o item não existir"""
+        return self.store.get_item(code)
+
+    def list_items(self, after=None, size=PAGE_SIZE):
+        return self.store.items_page(after, size)
+
+    def all_items(self):
+        return self.store.items()
+
+    def count_items(self):
+        return self.store.count_items()
+
+    def search_items(self, query, limit=SEARCH_LIMIT):
+        """Itens cujo nome/descrição casam com query (sem acentos, palavras como prefixo), os mais relevantes primeiro"""
+        items = (self.store.get_item(code) for code in item_index.search(query, limit))
+        return [item for item in items if item is not None]
+
+    def create_item(self, name, description, price, stock):
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            raise ValueError("Price must be a positive number")
+        if price < 0:
+            raise ValueError("Price must be a positive number")
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError):
+            raise ValueError("Stock must be a whole number.")
+        if stock < 0:
+            raise ValueError("Stock can't be negative.")
+        with self.lock:
+            item = create_item(self.store.next_item_code(), name, description, price, stock)
+            self.store.add_item(item)
+        return item
+
+    def update_item(self, code, name=None, description=None, price=None):
+        """Troca os campos informados (os None ficam como estão)"""
+        if price is not None:
+            try:
+                price = float(price)
+            except (TypeError, ValueError):
+                raise ValueError("Price must be a positive number")
+            if price < 0:
+                raise ValueError("Price must be a positive number")
+        with self.lock:
+            item = self.get_item(code)
+            fields = (item.name, item.description, item.price)
+            on_undo(lambda: self._restore_item(item, *fields))
+            if price is not None:
+                item.price = price
+            if name is not None:
+                item.name = name
+                order_cards.invalidate() # O nome do item aparece nos pedidos
+            if description is not None:
+                item.description = description
+            self.store.save_item(item)
+            if name is not None or description is not None:
+                item_index.add(item)
+        return item
+
+    @staticmethod
+    def _restore_item(item, name, description, price):
+        """Desfaz o update_item"""
+        item.name, item.description, item.price = name, description, price
+        order_cards.invalidate()
+        item_index.add(item)
+
+    def update_stock(self, code, quantity):
+        """Soma quantity ao estoque (negativo para retirar). Não retira unidades reservadas em carrinhos."""
+        return self.reservations.adjust(code, quantity)
+
+    def available(self, code):
+        """Unidades do item que ainda podem ser reservadas (estoque - reservado em carrinhos)"""
+        return self.reservations.available(self.get_item(code))
 
-    def __len__(self):
-        return len(self.inorder_traversal_list(self.root))
-    
-    def _get_height(self, node):
-        if not node:
-            return 0
-        return node.height
+    # Pedidos
+    def get_order(self, code):
+        order = self.store.get_order(code)
+        if order is None:
+            raise LookupError(f"Order {code} not found.")
+        return order
 
-    def _get_balance(self, node):
-        if not node:
-            return 0
-        return self._get_height(node.left) - self._get_height(node.right)
+    def list_orders(self, after=None, size=PAGE_SIZE):
+        return self.store.orders_page(after, size)
 
-    def _update_height(self, node):
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+    def count_orders(self):
+        return self.store.count_orders()
 
-    # --- Rotations ---
-    def _rotate_right(self, z):
-        y = z.left
-        T3 = y.right
-        y.right = z
-        z.left = T3
-        self._update_height(z)
-        self._update_height(y)
-        return y
+    def order_at(self, index):
+        """Pedido na posição index (a partir de 0) da ordem de código"""
+        order = self.store.order_at(index)
+        if order is None:
+            raise LookupError("Invalid selection.")
+        return order
 
-    def _rotate_left(self, z):
-        y = z.right
-        T2 = y.left
-        y.left = z
-        z.right = T2
-        self._update_height(z)
-        self._update_height(y)
-        return y
+    def orders_with_status(self, status):
+        if status not in ORDER_STATUSES:
+            raise ValueError(f"Unknown status: {status}.")
+        return self.store.orders_with_status(status)
 
-    # --- Insert ---
-    def insert(self, root, key, value):
-        if not root:
-            return Node(key, value)
-        
-        if key < root.key:
-            root.left = self.insert(root.left, key, value)
-        elif key > root.key:
-            root.right = self.insert(root.right, key, value)
-        else:
-            # Chaves duplicadas (Códigos de item) não permitidas
-            return root 
+    def count_status(self, status):
+        return self.store.count_status(status)
 
-        self._update_height(root)
-        balance = self._get_balance(root)
+    def next_pending(self):
+        """Pedido pendente mais antigo, ou None"""
+        return self.store.peek_order("Pending")
 
-        # 4 Casos de Rotação
-        if balance > 1: # Desbalanceamento à esquerda
-            if key < root.left.key: # Esquerda-Esquerda
-                return self._rotate_right(root)
-            else: # Esquerda-Direita
-                root.left = self._rotate_left(root.left)
-                return self._rotate_right(root)
-        
-        if balance < -1: # Desbalanceamento à direita
-            if key > root.right.key: # Direita-Direita
-                return self._rotate_left(root)
-            else: # Direita-Esquerda
-                root.right = self._rotate_right(root.right)
-                return self._rotate_left(root)
+    # Carrinhos: o estoque fica reservado enquanto o pedido é montado
+    def open_cart(self):
+        return self.reservations.open()
 
-        return root
-    
-    # --- Search (O(log n)) ---
-    def search(self, root, key):
-        if root is None or root.key == key:
-            # Retorna o dicionário (o valor) ou None
-            return root.value if root else None
-        
-        if key < root.key:
-            return self.search(root.left, key)
-        else:
-            return self.search(root.right, key)
+    def reserve(self, cart, lines):
+        """Reserva as linhas [(código do item, quantidade)] no carrinho: todas ou nenhuma. Retorna as linhas do carrinho."""
+        return self.reservations.reserve(cart, lines)
 
-    # --- Save and show ---
-    def inorder_traversal_list(self, root):
-        """Retorna uma lista de dicionários ordenada pela chave (code)"""
-        result = []
-        if root:
-            result.extend(self.inorder_traversal_list(root.left))
-            result.append(root.value)
-            result.extend(self.inorder_traversal_list(root.right))
-        return result
+    def release_cart(self, cart):
+        """Abandona o carrinho e devolve as reservas (não faz nada se ele já foi finalizado ou venceu)"""
+        self.reservations.release(cart)
 
-#-----------------------------------------------item's functions-------------------------------------------------#
+    def checkout(self, cart, cellphone, name, discount=False, payment='Paid'):
+        """Transforma o carrinho em pedido: baixa o estoque reservado e registra o pedido numa gravação só.
+        O cliente é achado pelo celular ou criado com name."""
+        def register(lines):
+            costumer, _ = self.store.get_or_create_costumer(name, cellphone)
+            order = create_order(self.store.next_order_code(), costumer, lines, "Pending", payment)
+            if discount:
+                apply_order_discount(order)
+            self.store.add_order(order)
+            return order
+        return self.reservations.commit(cart, register)
 
-def create_item(code, name, description, price, stock):
-    return {
-        "code":code, 
-        "name":name, 
-        "description": description,
-        "price": price, 
-        "stock": stock
+    def create_order(self, cellphone, name, lines, discount=False, payment='Paid'):
+        """Registra um pedido de uma vez. lines é uma lista de (código do item, quantidade).
+        O estoque de todas as linhas é baixado, ou de nenhuma."""
+        if not lines:
+            raise ValueError("Order must have at least one item!")
+        cart = self.open_cart()
+        try:
+            self.reserve(cart, lines)
+            return self.checkout(cart, cellphone, name, discount, payment)
+        finally:
+            self.release_cart(cart) # Só tem efeito se algo falhou antes do checkout
+
+    def apply_order_discount(self, code):
+        """Aplica o cupom de 10% num pedido já registrado (uma vez só: o segundo levanta ValueError)"""
+        with self.lock:
+            order = self.get_order(code)
+            apply_order_discount(order)
+            self.store.save_order(order)
+        return order
+
+    def set_status(self, code, status):
+        """Muda o status de um pedido. Cancelar e rejeitar devolvem estoque: use cancel_order/reject_order."""
+        if status not in ORDER_STATUSES:
+            raise ValueError(f"Unknown status: {status}.")
+        if status in CLOSED_STATUSES:
+            raise ValueError(f"Use the {status.lower()} operation to set {status}.")
+        with self.lock:
+            order = self.get_order(code)
+            self.store.set_order_status(order, status)
+        return order
+
+    def accept_order(self, code):
+        with self.lock:
+            order = self.get_order(code)
+            if order.status != "Pending":
+                raise ValueError(f"Order {code} is not pending.")
+            self.store.set_order_status(order, "Accepted")
+        return order
+
+    def reject_order(self, code):
+        return self._close_order(code, "Rejected", ("Pending",))
+
+    def cancel_order(self, code):
+        return self._close_order(code, "Canceled", ("Pending", "Accepted"))
+
+    def _close_order(self, code, status, allowed):
+        """Rejeita/cancela e devolve o estoque numa gravação só (devolver nunca invade reservas)"""
+        with self.lock:
+            order = self.get_order(code)
+            if order.status not in allowed:
+                raise ValueError(f"Order {code} can't be {status.lower()} anymore.")
+            with self.store.batch():
+                self.store.set_order_status(order, status)
+                self.store.restore_stock(order)
+        return order
+
+    def accept_next(self, n):
+        """Aceita os próximos n pedidos pendentes, em ordem de chegada"""
+        try:
+            n = int(n)
+        except (TypeError, ValueError):
+            raise ValueError("N must be a whole number.")
+        if n < 0:
+            raise ValueError("N can't be negative.")
+        with self.lock:
+            return self.store.accept_next_orders(n)
+
+    def dispatch_ready(self):
+        with self.lock:
+            return self.store.dispatch_ready_orders()
+
+    # Clientes
+    def find_costumer(self, cellphone):
+        return self.store.find_costumer(cellphone)
+
+    def get_costumer(self, code):
+        return self.store.get_costumer(code)
+
+    def list_costumers(self):
+        return self.store.costumers_sorted()
+
+    def _costumer(self, code):
+        costumer = self.store.get_costumer(code)
+        if costumer is None:
+            raise LookupError(f"Costumer {code} not found.")
+        return costumer
+
+    def costumer_orders(self, code):
+        """Pedidos do cliente que ainda estão nas árvores (os arquivados ficam de fora), do mais antigo ao mais novo"""
+        self._costumer(code)
+        return self.store.costumer_orders(code)
+
+    def costumer_history(self, code):
+        """Cliente, seus pedidos e o total gasto na vida toda (pedidos cancelados e rejeitados não contam)"""
+        costumer = self._costumer(code)
+        count, spent = self.store.costumer_sales(code)
+        return {"costumer": costumer, "orders": self.store.costumer_orders(code), "order_count": count, "spent": spent}
+
+    def costumer_report(self, n=10):
+        """Os n clientes que mais gastaram (heap: O(c log n) nos c clientes) e a taxa de recompra:
+        quantos dos clientes com algum pedido pediram mais de uma vez"""
+        try:
+            n = int(n)
+        except (TypeError, ValueError):
+            raise ValueError("N must be a whole number.")
+        sales = self.store.sales_by("costumer")
+        top = heapq.nlargest(n, sales.items(), key=lambda entry: entry[1][1])
+        buyers = sum(1 for count, _ in sales.values() if count > 0)
+        repeat = sum(1 for count, _ in sales.values() if count > 1)
+        return {
+            "top": [{"costumer": self.store.get_costumer(code), "orders": count, "spent": spent} for code, (count, spent) in top],
+            "buyers": buyers,
+            "repeat_buyers": repeat,
+            "repeat_rate": repeat / buyers if buyers else 0,
         }
 
-def update_stock(item, quantity):
+    def reorder(self, code, discount=False, payment='Paid'):
+        """Faz de novo um pedido anterior: mesmo cliente, mesmos itens e quantidades, preços de agora"""
+        order = self.get_order(code)
+        lines = [(line.code, line.quantity) for line in order.items_order]
+        return self.create_order(order.costumer.cellphone, order.costumer.name, lines, discount, payment)
+
+    # Relatórios
+    def sales_count(self, status=None):
+        return self.store.sales_count(status)
+
+    def sales_revenue(self, status=None):
+        return self.store.sales_revenue(status)
+
+    def sales_by(self, name):
+        if name not in SALES_BREAKDOWNS:
+            raise ValueError(f"Unknown breakdown: {name}.")
+        return self.store.sales_by(name)
+
+    def check_sales(self):
+        return self.store.check_sales()
+
+    def sales_columns(self):
+        """Colunas de todos os pedidos, nas árvores e arquivados (uma passada pelo store e pelo arquivo)"""
+        return SalesColumns.from_orders(chain(self.store.iter_orders(), self.store.archived_orders()))
+
+    def sales_analytics(self, month=None, columns=None):
+        """Relatório em colunas (ver sales_analytics) do histórico todo ou do mês 'AAAA-MM'.
+        Sem columns, monta as colunas agora; o menu monta uma vez e reaproveita entre os meses."""
+        key = month_key(month) if month else None
+        return sales_analytics(columns if columns is not None else self.sales_columns(), key)
+
+    # Arquivo de pedidos encerrados
+    def archive_orders(self, days=ARCHIVE_AFTER_DAYS):
+        """Arquiva os pedidos encerrados com mais de days dias. Retorna quantos foram arquivados."""
+        try:
+            days = int(days)
+        except (TypeError, ValueError):
+            raise ValueError("Days must be a whole number.")
+        if days < 0:
+            raise ValueError("Days can't be negative.")
+        with self.lock:
+            return self.store.archive_orders(days)
+
+    def archive_partitions(self):
+        return self.store.archive_partitions()
+
+    def archived_orders(self, partition=None, status=None):
+        """Pedidos arquivados da partição ('AAAA-MM' ou 'sem-data'; todas, se None), em ordem de código"""
+        if partition is not None and partition not in self.archive_partitions():
+            raise LookupError(f"No archived orders for {partition}.")
+        if status is not None and status not in ARCHIVE_STATUSES:
+            raise ValueError(f"Archived orders are {', '.join(ARCHIVE_STATUSES)}.")
+        return sorted(self.store.archived_orders(partition, status), key=lambda order: order.code)
+
+    def archived_sales(self):
+        """Vendas arquivadas por partição: [pedidos, receita] (cancelados/rejeitados não contam), lidas do disco agora"""
+        report = {}
+        for partition in self.archive_partitions():
+            bucket = report[partition] = [0, 0]
+            for order in self.store.archived_orders(partition):
+                if order.status not in CLOSED_STATUSES:
+                    bucket[0] += 1
+                    bucket[1] += order.order_total_price
+        return report
+
+    def sales_report(self):
+        """Todos os relatórios de vendas num dicionário (formato da resposta HTTP)"""
+        report = {
+            "count": self.sales_count(),
+            "revenue": self.sales_revenue(),
+            "delivered_count": self.sales_count("Delivered"),
+            "delivered_revenue": self.sales_revenue("Delivered"),
+        }
+        for name in SALES_BREAKDOWNS:
+            report["by_" + name] = [[key, count, revenue] for key, (count, revenue) in sorted(self.sales_by(name).items()) if count]
+        return report
+
+service = OrderService(store) # API usada pelos menus (refeita se --store trocar o backend)
+
+#----------------------------------------------- Bulk import/export -------------------------------------------------#
+# Arquivos CSV ou JSON Lines, lidos e gravados um registro por vez (pipeline de geradores).
+# Itens: code, name, description, price, stock (code vazio: recebe o próximo código).
+# Pedidos em JSON Lines: o formato do dados.json (costumer {name, cellphone}, items_order [{code, price, quantity}], ...).
+# Pedidos em CSV: uma linha por item do pedido, com as colunas de ORDER_CSV_FIELDS; linhas seguidas com o mesmo code são um pedido.
+IMPORT_BATCH = 1000 # Registros por lote (uma transação no SQLite)
+IMPORT_ERRORS_SHOWN = 20
+ITEM_CSV_FIELDS = ("code", "name", "description", "price", "stock")
+ORDER_CSV_FIELDS = ("code", "name", "cellphone", "status", "payment", "created_at", "total", "item", "price", "quantity")
+
+def file_format(path, fmt=None):
+    """'csv' ou 'jsonl': o informado ou, se None, o da extensão do arquivo"""
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def read_rows(path, fmt):
+    """Gera (número da linha, registro) do arquivo: dicionários no CSV, texto ainda não decodificado no JSON Lines"""
+    with open(path, "r", encoding="utf-8", newline="") as arq:
+        if fmt == "csv":
+            reader = csv.DictReader(arq)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(arq, 1):
+                if line.strip():
+                    yield number, line
+
+def group_order_rows(rows):
+    """Junta as linhas de CSV de um mesmo pedido (seguidas, mesmo code) no formato do JSON Lines"""
+    current = None
+    for number, row in rows:
+        if current is not None and row.get("code") == current[1]["code"]:
+            current[1]["items_order"].append({"code": row.get("item"), "price": row.get("price"), "quantity": row.get("quantity")})
+            continue
+        if current is not None:
+            yield current
+        current = (number, {
+            "code": row.get("code"),
+            "costumer": {"name": row.get("name"), "cellphone": row.get("cellphone")},
+            "items_order": [{"code": row.get("item"), "price": row.get("price"), "quantity": row.get("quantity")}],
+            "status": row.get("status"),
+            "payment": row.get("payment"),
+            "created_at": row.get("created_at"),
+            "order_total_price": row.get("total"),
+        })
+    if current is not None:
+        yield current
+
+def _optional(value, kind, message):
+    """Converte value com kind; vazio/ausente vira None"""
+    if value is None or value == "":
+        return None
     try:
-        quantity = int(quantity)
-    except ValueError:
-        raise ValueError("Quantity must be a number.")
-    if quantity < 0 and abs(quantity) > item['stock']:
-        raise ValueError("Insufficient stock to remove the requested quantity.")
-    else: 
-        item['stock'] += quantity
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(message)
 
-def update_name(item):
-    confirm = input(f"You are about to change the name of the product {item['name']}\n(Confirm? 1. Yes / 2. No ) ")
-    if confirm == "1":
-        new_name = input("Type the new name: ").strip()
-        item['name'] = new_name
-        print(f"The name of the item code:{item['code']} has changed to {item['name']}")
-    else:
-        print("Operation canceled")
-        return
+def parse_item(data):
+    """Item validado de um registro importado (code None: ainda sem código)"""
+    name = (data.get("name") or "").strip()
+    if not name:
+        raise ValueError("Name is required.")
+    price = _optional(data.get("price"), float, "Price must be a positive number")
+    if price is None or price < 0:
+        raise ValueError("Price must be a positive number")
+    stock = _optional(data.get("stock"), int, "Stock must be a whole number.") or 0
+    if stock < 0:
+        raise ValueError("Stock can't be negative.")
+    code = _optional(data.get("code"), int, "Code must be a whole number.")
+    if code is not None and code <= 0:
+        raise ValueError("Code must be a positive number.")
+    return Item(code, name, (data.get("description") or "").strip(), price, stock)
 
-def update_description(item):
-    print(f"Current description:\n{item['description']}")
-    new_description = input("Type a new description: ")
-    confirm = input(f"You are about to change the description of the product {item['name']}\n(Confirm? 1. Yes / 2. No ) ")
-    if confirm == "1":
-        item['description'] = new_description
-        print(f"Description of the item {item['name']} has changed")
-    else:
-        print("Operation canceled")
-        return
+def parse_order(data, known_items):
+    """Pedido validado de um registro importado. O cliente vem só com nome e celular (o código é do store).
+    known_items: código -> nome dos itens do catálogo (o nome vale para as linhas que não trazem o seu)."""
+    costumer = data.get("costumer") or {}
+    name, cellphone = (costumer.get("name") or "").strip(), (costumer.get("cellphone") or "").strip()
+    if not name or not cellphone:
+        raise ValueError("Costumer name and cellphone are required.")
+    lines = []
+    for line in data.get("items_order") or []:
+        code = _optional(line.get("code"), int, "Item code must be a whole number.")
+        if code not in known_items:
+            raise ValueError(f"Item {line.get('code')} not found.")
+        price = _optional(line.get("price"), float, "Price must be a positive number")
+        quantity = _optional(line.get("quantity"), int, "Quantity must be a number.")
+        if price is None or price < 0:
+            raise ValueError("Price must be a positive number")
+        if quantity is None or quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        lines.append(OrderLine(code, price, quantity, (line.get("name") or "").strip() or known_items[code]))
+    if not lines:
+        raise ValueError("Order must have at least one item!")
+    status = data.get("status") or "Pending"
+    if status not in ORDER_STATUSES:
+        raise ValueError(f"Unknown status: {status}.")
+    created_at = data.get("created_at") or None
+    if created_at is not None:
+        try:
+            datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date: {created_at}.")
+    total = _optional(data.get("order_total_price"), float, "Total must be a number.")
+    if total is None:
+        total = sum(line.price * line.quantity for line in lines)
+    code = _optional(data.get("code"), int, "Code must be a whole number.")
+    if code is not None and code <= 0:
+        raise ValueError("Code must be a positive number.")
+    return Order(code, Costumer(None, name, cellphone), lines, status, data.get("payment") or "Paid", total, created_at)
 
-def update_price(item):
-    print(f"Current price:\n{item['price']}")  
-    new_price_input = input("Type a new price: ")
-    new_price = float(new_price_input)
-    confirm = input(f"You are about to change the price of the product {item['name']} to R${new_price}\n(Confirm? 1. Yes / 2. No ) ")
-    if confirm == "1":
-        item['price'] = new_price
-        print(f"Price of the item {item['name']} has changed to R${item['price']}")
+def validate_rows(rows, parse, errors):
+    """Gera os registros válidos; os inválidos vão para errors como (número da linha, mensagem)"""
+    for number, row in rows:
+        try:
+            yield parse(json.loads(row) if isinstance(row, str) else row)
+        except (ValueError, AttributeError) as e: # AttributeError: linha JSON que não é objeto
+            errors.append((number, str(e) or "Invalid record."))
+
+def import_file(store, entity, path, fmt=None, batch_size=IMPORT_BATCH):
+    """Importa 'items' ou 'orders' de um arquivo CSV/JSON Lines, em lotes de batch_size.
+    Cada lote entra no store de uma vez (store.batch(): uma transação no SQLite; no backend em memória
+    nada vai para o log e tudo é gravado no snapshot do close()). Registros sem código recebem um bloco
+    de códigos novos por lote. Retorna (importados, erros), erros como [(número da linha, mensagem)]."""
+    fmt = file_format(path, fmt)
+    errors = []
+    rows = read_rows(path, fmt)
+    if entity == "items":
+        records = validate_rows(rows, parse_item, errors)
+        entity_key, import_batch = "catalog", store.import_items
     else:
-        print("Operation canceled")
-        return
+        if fmt == "csv":
+            rows = group_order_rows(rows)
+        known_items = {item.code: item.name for item in store.items()}
+        records = validate_rows(rows, lambda data: parse_order(data, known_items), errors)
+        entity_key, import_batch = "all_orders", store.import_orders
 
-#-----------------------------------------------order's functions-------------------------------------------------#
-def create_order(code,costumer_data, items_order, status='Pending', payment='Paid'):
-    total = sum(item["price"] * item["quantity"] for item in items_order)
-    
-    return {
-        "code": code, 
-        "costumer": costumer_data,
-        "items_order": items_order, 
-        "status": status,
-        "payment": payment,
-        "order_total_price": total 
-    }
+    imported = 0
+    while batch := list(islice(records, batch_size)):
+        with store.lock, store.batch():
+            # Primeiro os que trazem código (sobem a marca d'água), depois os novos recebem um bloco acima deles
+            with_code = [record for record in batch if record.code is not None]
+            skipped = import_batch(with_code)
+            new = [record for record in batch if record.code is None]
+            if new:
+                for record, code in zip(new, store.reserve_codes(entity_key, len(new))):
+                    record.code = code
+                skipped += import_batch(new)
+        errors.extend((None, f"Code {code} already exists.") for code in skipped)
+        imported += len(batch) - len(skipped)
+    return imported, errors
 
-def apply_order_discount(order):
-    current_total = order['order_total_price']
-    if current_total is None or len(order['items_order']) == 0:
-        raise ValueError("It's not possible to apply discount in a empty order.")
-    discount_value = current_total * (10 / 100)
-    order['order_total_price'] = current_total - discount_value
-    return order['order_total_price']
+def item_csv_rows(items):
+    for item in items:
+        yield item.to_dict()
 
-#-----------------------------------------------Aux functions-------------------------------------------------#
-def get_orders_by_status(status):
-    lista_pedidos = orders_tree.inorder_traversal_list(orders_tree.root)
-    return [o for o in lista_pedidos if o["status"] == status]
-
-def get_things_sorted(things):
-    n = len(things)
-    for i in range(n - 1):
-        menor = i
-        # Encontra o índice do menor código a partir de i
-        for j in range(i + 1, n):
-            if things[j]["code"] < things[menor]["code"]:
-                menor = j
-        # Troca os elementos, se necessário
-        if menor != i:
-            things[i], things[menor] = things[menor], things[i]
-    return things
+def order_csv_rows(orders):
+    for order in orders:
+        for line in order.items_order:
+            yield {"code": order.code, "name": order.costumer.name, "cellphone": order.costumer.cellphone,
+                   "status": order.status, "payment": order.payment, "created_at": order.created_at or "",
+                   "total": order.order_total_price, "item": line.code, "price": line.price, "quantity": line.quantity}
 
-def save_data():
-    # Usa o percurso em ordem da AVL para obter os dados em formato de lista (e ordenados)
-    dados = {
-        "all_orders": orders_tree.inorder_traversal_list(orders_tree.root),
-        "catalog": catalog_tree.inorder_traversal_list(catalog_tree.root),
-        "costumers": costumers # Continua sendo lista
-    } 
-    with open("dados.json", "w", encoding="utf-8") as arq:
-        json.dump(dados, arq, indent=4, ensure_ascii=False)
-#----------------------------------------------- Data implementation -------------------------------------------------#
-def load_data():
-    global catalog_tree, orders_tree, costumers # Indica que essas variáveis globais serão modificadas
-    
+def export_file(store, entity, path, fmt=None):
+    """Grava 'items' ou 'orders' em CSV/JSON Lines, lendo do store um registro por vez. Retorna quantos foram gravados."""
+    fmt = file_format(path, fmt)
+    count = 0
+    def records():
+        nonlocal count
+        for record in store.items() if entity == "items" else store.iter_orders():
+            count += 1
+            yield record
+
+    with open(path, "w", encoding="utf-8", newline="") as arq:
+        if fmt == "csv":
+            if entity == "items":
+                writer = csv.DictWriter(arq, ITEM_CSV_FIELDS)
+                rows = item_csv_rows(records())
+            else:
+                writer = csv.DictWriter(arq, ORDER_CSV_FIELDS)
+                rows = order_csv_rows(records())
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            arq.writelines(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in records())
+    return count
+
+def run_import(store, entity, path, fmt=None, batch_size=IMPORT_BATCH):
+    """import pela linha de comando: importa e mostra o resultado e a vazão (registros por segundo)"""
+    start = time.perf_counter()
+    imported, errors = import_file(store, entity, path, fmt, batch_size)
+    elapsed = time.perf_counter() - start
+    rows = imported + len(errors)
+    for number, message in errors[:IMPORT_ERRORS_SHOWN]:
+        print(f"❌ {'line ' + str(number) if number else path}: {message}")
+    if len(errors) > IMPORT_ERRORS_SHOWN:
+        print(f"❌ ... and {len(errors) - IMPORT_ERRORS_SHOWN} more.")
+    print(f"✅ {imported} {entity} imported, {len(errors)} rejected, in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s).")
+
+def run_export(store, entity, path, fmt=None):
+    """export pela linha de comando"""
+    start = time.perf_counter()
+    count = export_file(store, entity, path, fmt)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count} {entity} exported to {path} in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} rows/s).")
+
+#----------------------------------------------- HTTP server (asyncio) -------------------------------------------------#
+SERVER_BATCH_MAX = 200 # Máximo de requisições de escrita gravadas juntas
+
+class WriteQueue:
+    """Serializa as escritas num único worker (asyncio).
+
+    As requisições de escrita entram na fila; o worker pega todas as que estiverem esperando (até SERVER_BATCH_MAX),
+    aplica em sequência dentro de um store.batch() e só então responde. Assim uma rajada de requisições
+    vira uma escrita no log (ou um commit no SQLite), e nunca um save por requisição.
+    Cada requisição roda num store.savepoint(): a que falhar é desfeita sem levar junto as outras do lote."""
+    def __init__(self, service):
+        self.service = service
+        self.queue = asyncio.Queue()
+
+    async def submit(self, operation, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((operation, args, future))
+        return await future
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < SERVER_BATCH_MAX and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            outcomes = []
+            try:
+                with self.service.store.batch():
+                    for operation, args, future in batch:
+                        try:
+                            with self.service.store.savepoint():
+                                result = operation(*args)
+                            outcomes.append((future, result, None))
+                        except Exception as e: # Erro da requisição: vai para quem pediu, o lote segue
+                            outcomes.append((future, None, e))
+            except Exception as e: # Falha ao gravar o lote: todas as requisições dele recebem o erro
+                outcomes = [(future, None, e) for _, _, future in batch]
+            for future, result, error in outcomes:
+                if future.cancelled():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+def to_json(value):
+    """Registros (e listas e dicionários com eles) no formato do dados.json"""
+    if isinstance(value, list):
+        return [to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {key: to_json(v) for key, v in value.items()}
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return value
+
+def _page_args(query):
+    after = query.get("after")
+    return (int(after) if after is not None else None), int(query.get("size", PAGE_SIZE))
+
+# (método, caminho, escrita?, função(service, parâmetros do caminho, query, corpo)) — o caminho é uma regex
+HTTP_ROUTES = [
+    ("GET", r"/items", False, lambda s, p, q, b: s.list_items(*_page_args(q))),
+    ("POST", r"/items", True, lambda s, p, q, b: s.create_item(b.get("name", ""), b.get("description", ""), b.get("price"), b.get("stock", 0))),
+    ("GET", r"/items/search", False, lambda s, p, q, b: s.search_items(q.get("q", ""), int(q.get("limit", SEARCH_LIMIT)))),
+    ("GET", r"/items/(\d+)", False, lambda s, p, q, b: s.get_item(int(p[0]))),
+    ("PATCH", r"/items/(\d+)", True, lambda s, p, q, b: s.update_item(int(p[0]), b.get("name"), b.get("description"), b.get("price"))),
+    ("POST", r"/items/(\d+)/stock", True, lambda s, p, q, b: s.update_stock(int(p[0]), b.get("quantity"))),
+    ("GET", r"/orders", False, lambda s, p, q, b: s.orders_with_status(q["status"]) if "status" in q else s.list_orders(*_page_args(q))),
+    ("POST", r"/orders", True, lambda s, p, q, b: s.create_order(b.get("cellphone", ""), b.get("name", ""),
+                                                             [(line.get("code"), line.get("quantity", 1)) for line in b.get("items", [])],
+                                                             bool(b.get("discount")), b.get("payment", "Paid"))),
+    ("POST", r"/carts", True, lambda s, p, q, b: {"cart": s.open_cart()}),
+    ("POST", r"/carts/(\d+)/items", True, lambda s, p, q, b: s.reserve(int(p[0]), [(line.get("code"), line.get("quantity", 1)) for line in b.get("items", [])])),
+    ("POST", r"/carts/(\d+)/checkout", True, lambda s, p, q, b: s.checkout(int(p[0]), b.get("cellphone", ""), b.get("name", ""),
+                                                                         bool(b.get("discount")), b.get("payment", "Paid"))),
+    ("DELETE", r"/carts/(\d+)", True, lambda s, p, q, b: s.release_cart(int(p[0]))),
+    ("GET", r"/orders/pending/next", False, lambda s, p, q, b: s.next_pending()),
+    ("POST", r"/orders/accept", True, lambda s, p, q, b: s.accept_next(b.get("n", 1))),
+    ("POST", r"/orders/dispatch", True, lambda s, p, q, b: s.dispatch_ready()),
+    ("GET", r"/orders/(\d+)", False, lambda s, p, q, b: s.get_order(int(p[0]))),
+    ("POST", r"/orders/(\d+)/status", True, lambda s, p, q, b: s.set_status(int(p[0]), b.get("status"))),
+    ("POST", r"/orders/(\d+)/accept", True, lambda s, p, q, b: s.accept_order(int(p[0]))),
+    ("POST", r"/orders/(\d+)/reject", True, lambda s, p, q, b: s.reject_order(int(p[0]))),
+    ("POST", r"/orders/(\d+)/cancel", True, lambda s, p, q, b: s.cancel_order(int(p[0]))),
+    ("POST", r"/orders/(\d+)/discount", True, lambda s, p, q, b: s.apply_order_discount(int(p[0]))),
+    ("GET", r"/costumers", False, lambda s, p, q, b: s.list_costumers()),
+    ("GET", r"/costumers/top", False, lambda s, p, q, b: s.costumer_report(q.get("n", 10))),
+    ("GET", r"/costumers/(\d+)/orders", False, lambda s, p, q, b: s.costumer_history(int(p[0]))),
+    ("POST", r"/orders/(\d+)/reorder", True, lambda s, p, q, b: s.reorder(int(p[0]), bool(b.get("discount")), b.get("payment", "Paid"))),
+    ("GET", r"/reports/sales", False, lambda s, p, q, b: s.sales_report()),
+    ("GET", r"/reports/analytics", False, lambda s, p, q, b: s.sales_analytics(q.get("month"))),
+    ("POST", r"/orders/archive", True, lambda s, p, q, b: {"archived": s.archive_orders(b.get("days", ARCHIVE_AFTER_DAYS))}),
+    ("GET", r"/archive", False, lambda s, p, q, b: s.archive_partitions()),
+    ("GET", r"/archive/([\w-]+)", False, lambda s, p, q, b: s.archived_orders(p[0], q.get("status"))),
+    ("GET", r"/diagnostics", False, lambda s, p, q, b: instrumentation.report()),
+]
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+async def dispatch_request(service, writes, method, target, body):
+    """Executa a requisição e retorna (status HTTP, dados da resposta)"""
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    allowed = False
+    for route_method, pattern, is_write, handler in HTTP_ROUTES:
+        match = re.fullmatch(pattern, url.path.rstrip("/") or "/")
+        if not match:
+            continue
+        allowed = True
+        if route_method != method:
+            continue
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError("Request body must be a JSON object.")
+            if is_write:
+                result = await writes.submit(handler, service, match.groups(), query, data)
+            else:
+                result = handler(service, match.groups(), query, data) # Leitura: direto, sem passar pela fila
+        except LookupError as e:
+            return 404, {"error": str(e)}
+        except ValueError as e: # Inclui JSON inválido
+            return 400, {"error": str(e)}
+        return 200, to_json(result)
+    if allowed:
+        return 405, {"error": f"Method {method} not allowed."}
+    return 404, {"error": f"No route for {url.path}."}
+
+async def handle_http_client(service, writes, reader, writer):
+    """Uma conexão HTTP/1.1 (keep-alive): lê requisição, responde JSON, repete até o cliente fechar"""
     try:
-        with open('dados.json', 'r', encoding='utf-8') as arq:
-            dados = json.load(arq)
-    except FileNotFoundError:
-        print("⚠️ Arquivo 'dados.json' não encontrado. Iniciando com dados vazios.")
-        dados = {"all_orders": [], "catalog": [], "costumers": []}
-    except json.JSONDecodeError:
-        print("❌ Erro ao decodificar JSON. Iniciando com dados vazios.")
-        dados = {"all_orders": [], "catalog": [], "costumers": []}
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            try:
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            except ValueError:
+                break
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            try:
+                status, payload = await dispatch_request(service, writes, method, target, body)
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                         f"Content-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
 
-    # Carrega Catálogo (Reconstrói a AVL)
-    catalog_tree = AVLTree()
-    for item in dados['catalog']:
-        catalog_tree.root = catalog_tree.insert(catalog_tree.root, item['code'], item)
-    
-    # Carrega Pedidos (Reconstrói a AVL - Usando a mesma chave 'code')
-    orders_tree = AVLTree()
-    for order in dados['all_orders']:
-        orders_tree.root = orders_tree.insert(orders_tree.root, order['code'], order)
+async def serve_http(service, host="127.0.0.1", port=8080):
+    """Servidor HTTP/JSON: leituras respondidas direto, escritas pelo WriteQueue"""
+    writes = WriteQueue(service)
+    worker = asyncio.create_task(writes.run())
+    server = await asyncio.start_server(lambda r, w: handle_http_client(service, writes, r, w), host, port)
+    print(f"🌐 Serving on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
 
-    # Carrega Clientes (Continua sendo Lista de Dicionários)
-    costumers = dados['costumers']
+#----------------------------------------------- Render cache -------------------------------------------------#
+# Os menus mostram itens e pedidos sempre com o mesmo texto: o bloco formatado de cada registro fica guardado
+# e só é refeito quando algum campo que aparece nele muda. As listagens saem em poucas escritas grandes no terminal.
+RENDER_CACHE = True        # --no-render-cache desliga (cada bloco é formatado de novo a cada vez)
+RENDER_CACHE_MAX = 200_000 # Blocos guardados por listagem; os usados há mais tempo saem primeiro
+RENDER_CHUNK = 1000        # Blocos por escrita nas listagens sem paginação
 
-    print("✅ Dados carregados e árvores AVL montadas.")
+class RenderCache:
+    """Blocos de texto por código do registro: code -> (versão, texto).
+    render(registro) formata o bloco; version(registro) é a tupla dos campos que aparecem nele.
+    Se a versão guardada for diferente da atual, o bloco é refeito; os demais continuam valendo."""
+    def __init__(self, render, version):
+        self.render = render
+        self.version = version
+        self.blocks = OrderedDict()
+        self.generation = 0 # Entra em toda versão: invalidate() refaz todos os blocos
+        self.hits = 0
+        self.misses = 0
 
+    def block(self, record):
+        if not RENDER_CACHE:
+            return self.render(record)
+        version = (self.generation, self.version(record))
+        entry = self.blocks.get(record.code)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self.blocks.move_to_end(record.code)
+            return entry[1]
+        self.misses += 1
+        text = self.render(record)
+        self.blocks[record.code] = (version, text)
+        self.blocks.move_to_end(record.code)
+        if len(self.blocks) > RENDER_CACHE_MAX:
+            self.blocks.popitem(last=False)
+        return text
+
+    def invalidate(self):
+        """Para mudanças que não estão nos campos do registro (ex: nome de item dentro dos pedidos)"""
+        self.generation += 1
+
+    def clear(self):
+        self.blocks.clear()
+
+def write_blocks(blocks):
+    """Escreve os blocos no terminal de RENDER_CHUNK em RENDER_CHUNK, cada grupo numa única escrita"""
+    blocks = iter(blocks)
+    while chunk := "".join(islice(blocks, RENDER_CHUNK)):
+        sys.stdout.write(chunk)
+    sys.stdout.flush()
+
+def _item_card(item):
+    """Item em Manage Menu Items → View All Items (centralizado)"""
+    width = 60
+    return (f"📦 Code: {item.code}".center(width) + "\n" +
+            f"📝 Name: {item.name}".center(width) + "\n" +
+            f"🖊️ Description: {item.description}".center(width) + "\n" +
+            f"💰 Price: R${item.price}".center(width) + "\n" +
+            f"📦 Stock: {item.stock}".center(width) + "\n" +
+            "-" * width + "\n")
+
+def _item_choice(item):
+    """Item na lista de escolha ao montar um pedido"""
+    return (f"📦 Code: {item.code}\n"
+            f"📝 Name: {item.name}\n"
+            f"🖊️ Description: {item.description}\n"
+            f"💰 Price: R${item.price:.2f}\n"
+            f"📦 Stock: {item.stock}\n" +
+            "-" * 40 + "\n")
+
+def _order_card(order):
+    """Pedido em Consults (todos, por página, e arquivados)"""
+    items_names = [line_name(line) for line in order.items_order]
+    return (f"📦 Code: {order.code}\n"
+            f"👤 Costumer: {order.costumer}\n"
+            f"🛒 Items: {', '.join(items_names)}\n"
+            f"🗃️ Status: {order.status}\n"
+            f"💰 Total: R${order.order_total_price:.2f}\n" +
+            "-" * 40 + "\n")
+
+def _item_version(item):
+    return (item.name, item.description, item.price, item.stock)
+
+def _order_version(order):
+    # As linhas não mudam depois de criado o pedido; os nomes dos itens são cobertos por order_cards.invalidate()
+    return (order.status, order.order_total_price, order.costumer.code, order.costumer.name, order.costumer.cellphone)
+
+item_cards = RenderCache(_item_card, _item_version)
+item_choices = RenderCache(_item_choice, _item_version)
+order_cards = RenderCache(_order_card, _order_version)
 
-catalog_tree = AVLTree()  # Agora é uma árvore AVL
-orders_tree = AVLTree()   # Agora é uma árvore AVL
 #-----------------------------------------------Menu's functions-------------------------------------------------#
 
-def consults(orders_tree, costumers):
+def show_item_matches(service, query):
+    """Mostra os itens encontrados pela busca por nome/descrição (as telas que pedem o código aceitam um texto)"""
+    start = time.perf_counter()
+    matches = service.search_items(query)
+    elapsed = (time.perf_counter() - start) * 1000
+    if not matches:
+        print(f"⚠️ No items match '{query}'.")
+        return
+    print(f"\n🔎 {len(matches)} item(s) matching '{query}' ({elapsed:.2f} ms):")
+    print("-" * 40)
+    write_blocks(item_choices.block(item) for item in matches)
+
+def costumer_history(service):
+    """Pedidos de um cliente (pelo código ou celular) e o total gasto; um dos pedidos pode ser feito de novo"""
+    text = input("Costumer code or cellphone: ").strip()
+    costumer = service.find_costumer(text)
+    if costumer is None and text.isdigit():
+        costumer = service.get_costumer(int(text))
+    if costumer is None:
+        print("❌ Costumer not found.")
+        return
+
+    history = service.costumer_history(costumer.code)
+    print(f"\n👤 {costumer} | {history['order_count']} order(s) | Spent: R${history['spent']:.2f}")
+    print("-" * 40)
+    if not history["orders"]:
+        print("⚠️ There's no orders to show.")
+        return
+    write_blocks(order_cards.block(order) for order in history["orders"])
+
+    codes = {order.code for order in history["orders"]}
+    answer = input("Type an order code to order it again ([Enter] to go back): ").strip()
+    if not answer:
+        return
+    if not answer.isdigit() or int(answer) not in codes:
+        print("❌ Invalid code.")
+        return
+    try:
+        order = service.reorder(int(answer))
+    except (ValueError, LookupError) as error:
+        print(f"❌ {error}")
+        return
+    print(f"✅ Order {order.code} created: R${order.order_total_price:.2f}")
+
+def show_analytics(service, report):
+    print("-" * 40)
+    print(f"📋 Orders: {report['orders']} | Sales: {report['sales']} | Revenue: R${report['revenue']:.2f}")
+    for status, (count, revenue) in report["by_status"].items():
+        print(f"  🗃️ {status}: {count} order(s) | R${revenue:.2f}")
+    percentiles = " | ".join(f"{name}: R${value:.2f}" for name, value in report["percentiles"].items())
+    print(f"🎫 Average ticket: R${report['average_ticket']:.2f} ({percentiles})")
+    print(f"🏷️ Discount used in {report['discounted']} order(s) ({report['discount_rate']:.1%}): R${report['discount_total']:.2f} off")
+    print("🛒 Best-selling items:")
+    for code, units, revenue in report["top_items"]:
+        item = service.find_item(code)
+        print(f"  {item.name if item else code}: {units} unit(s) | R${revenue:.2f}")
+    if len(report["by_month"]) > 1:
+        print("📅 By month:")
+        for month, (count, revenue) in report["by_month"].items():
+            print(f"  {month}: {count} order(s) | R${revenue:.2f}")
+
+def sales_analytics_menu(service):
+    """Relatórios em colunas: as colunas são montadas uma vez e servem para todos os meses consultados"""
+    start = time.perf_counter()
+    columns = service.sales_columns()
+    print(f"\n🧮 {len(columns)} order(s) loaded into columns in {time.perf_counter() - start:.2f}s ({ANALYTICS_ENGINE} engine)")
+    month = None
+    while True:
+        try:
+            start = time.perf_counter()
+            report = service.sales_analytics(month, columns)
+        except ValueError as e:
+            print(f"❌ {e}")
+        else:
+            print(f"\n📊 {month or 'Whole history'} (computed in {(time.perf_counter() - start) * 1000:.1f} ms)")
+            show_analytics(service, report)
+        month = input("Month (YYYY-MM or sem-data) / [Enter] Back: ").strip()
+        if not month:
+            return
+
+def consults(service):
 
     choice = ""
     width = 60
-    while choice != "5":
+
+    def show_order(o, position):
+        return order_cards.block(o)
+
+    while choice != "6":
         print("\n📋 Consult's menu:")
         print("-" * 40)
         print("[1] View All Orders".center(width))
         print("[2] Filter by status".center(width))
-        print("[3] See all costumers".center(width))
+        print("[3] Costumers".center(width))
         print("[4] Sales Report".center(width))
-        print("[5] Back to Main Menu".center(width))
-        choice = input("Choose an option (1 / 2 / 3 / 4 / 5): ".center(width))
+        print("[5] Archived Orders".center(width))
+        print("[6] Back to Main Menu".center(width))
+        choice = input("Choose an option (1 / 2 / 3 / 4 / 5 / 6): ".center(width))
 
         match choice:
             case "1":
-                if not orders_tree:
+                if not service.count_orders():
                     print("⚠️ There's no orders to show.")
                     continue
 
                 print("\n📋 List of orders:")
                 print("-" * 40)
-                lista_pedidos = orders_tree.inorder_traversal_list(orders_tree.root)
-                for o in lista_pedidos:
-                    items_names = [item['name'] for item in o['items_order']]
-                    print(f"📦 Code: {o['code']}")
-                    print(f"👤 Costumer: {o['costumer']}")
-                    print(f"🛒 Items: {', '.join(items_names)}")
-                    print(f"🗃️ Status: {o['status']}")
-                    print(f"💰 Total: R${o['order_total_price']:.2f}")
-                    print("-" * 40)
+
+                paginate(service.list_orders, service.count_orders(), show_order) # Só os registros da página são lidos
 
             case "2":
                 print("\n📋 Consult's order by status:")
@@ -286,14 +3834,14 @@ def consults(orders_tree, costumers):
                     case "1":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Making")
+                        list = service.orders_with_status("Making")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -301,14 +3849,14 @@ def consults(orders_tree, costumers):
                     case "2":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Ready")
+                        list = service.orders_with_status("Ready")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -316,14 +3864,14 @@ def consults(orders_tree, costumers):
                     case "3":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Waiting Delivery")
+                        list = service.orders_with_status("Waiting Delivery")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -331,14 +3879,14 @@ def consults(orders_tree, costumers):
                     case "4":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Delivering")
+                        list = service.orders_with_status("Delivering")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -346,14 +3894,14 @@ def consults(orders_tree, costumers):
                     case "5":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Delivered")
+                        list = service.orders_with_status("Delivered")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -361,14 +3909,14 @@ def consults(orders_tree, costumers):
                     case "6":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Canceled")
+                        list = service.orders_with_status("Canceled")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -376,14 +3924,14 @@ def consults(orders_tree, costumers):
                     case "7":
                         print("\n📋 List of orders:")
                         print("-" * 40)
-                        list = get_orders_by_status("Rejected")
+                        list = service.orders_with_status("Rejected")
                         if len(list) > 0:
                             for order in list:
-                                items_names = [item['name'] for item in o['items_order']]
-                                print(f"📦 Code: {order['code']}")
-                                print(f"👤 Costumer: {order['costumer']}")
+                                items_names = [line_name(line) for line in order.items_order]
+                                print(f"📦 Code: {order.code}")
+                                print(f"👤 Costumer: {order.costumer}")
                                 print(f"🛒 Items: {', '.join(items_names)}")
-                                print(f"💰 Price: R${order['order_total_price']:.2f}")
+                                print(f"💰 Price: R${order.order_total_price:.2f}")
                                 print("-" * 40)
                             print(f"\n📋 Number of registers: {len(list)}")
                         else:
@@ -394,52 +3942,147 @@ def consults(orders_tree, costumers):
                     case _:
                         print("Invalid option. Please try again.".center(width))
             case "3":
-                print("Active costumers:")
-                for c in get_things_sorted(costumers.copy()):
-                    print("-" * 30)
-                    print(f"Code: {c['code']}")
-                    print(f"Name: {c['name']}")
-                    print(f"Cellphone: {c['cellphone']}")
-                    print("-" * 30)
+                print("\n👥 Costumers:".center(width))
+                print("-" * 40)
+                print("[1] See all costumers".center(width))
+                print("[2] Costumer history / reorder".center(width))
+                print("[3] Top costumers by spend".center(width))
+                print("[4] Back to Main Menu".center(width))
+                option = input("Choose an option (1 / 2 / 3 / 4): ".center(width))
+
+                match option:
+                    case "1":
+                        print("Active costumers:")
+                        for c in service.list_costumers():
+                            print("-" * 30)
+                            print(f"Code: {c.code}")
+                            print(f"Name: {c.name}")
+                            print(f"Cellphone: {c.cellphone}")
+                            print("-" * 30)
+                    case "2":
+                        costumer_history(service)
+                    case "3":
+                        top = service.costumer_report()
+                        if not top["buyers"]:
+                            print("⚠️ There's no sales to show.")
+                            continue
+                        print("-" * 40)
+                        for position, entry in enumerate(top["top"], 1):
+                            costumer = entry["costumer"]
+                            print(f"{position:>2}. {costumer.name if costumer else '?'} ({entry['orders']} order(s)): R${entry['spent']:.2f}")
+                        print(f"🔁 Repeat rate: {top['repeat_rate']:.1%} ({top['repeat_buyers']} of {top['buyers']} costumers ordered more than once)")
+                    case "4":
+                        print("🔙Returning to Main Menu.".center(width))
+                        return
+                    case _:
+                        print("Invalid option. Please try again.".center(width))
             case "4":
                 print("\n📋 Sales reports:".center(width))
                 print("-" * 40)
                 print("[1] All registers".center(width))
                 print("[2] Closed sales".center(width))
-                print("[3] Back to Main Menu".center(width))
-                report = input("Choose an option (1 / 2 / 3): ".center(width))
+                print("[3] Sales by status".center(width))
+                print("[4] Sales by costumer and item".center(width))
+                print("[5] Revenue by day and hour".center(width))
+                print("[6] Check report consistency".center(width))
+                print("[7] Archived sales by month".center(width))
+                print("[8] Analytics (whole history)".center(width))
+                print("[9] Back to Main Menu".center(width))
+                report = input("Choose an option (1 / 2 / 3 / 4 / 5 / 6 / 7 / 8 / 9): ".center(width))
 
+                # Os relatórios vêm do store: agregados mantidos em memória ou consultas agregadas no SQLite
                 match report:
                     case "1":
-                        total_price = 0
-                        acc_price = 0
-                        lista_pedidos = orders_tree.inorder_traversal_list(orders_tree.root)
-                        for o in lista_pedidos:
-                            acc_price = o['order_total_price'] 
-                            total_price = total_price + acc_price   
-                        print(f"\n📋 Number of registers: {len(orders_tree)}")                    
-                        print(f"💰 Total value registered: R${total_price}")
+                        print(f"\n📋 Number of registers: {service.sales_count()}")                    
+                        print(f"💰 Total value registered: R${service.sales_revenue():.2f}")
                     case "2":
-                        total_price = 0
-                        acc_price = 0
-                        delivered_orders = get_orders_by_status("Delivered")
-                        for o in delivered_orders:
-                            acc_price = o['order_total_price'] 
-                            total_price = total_price + acc_price
-                        print(f"\n📋 Number of registers: {len(delivered_orders)}")                    
-                        print(f"💰 Total value registered: R${total_price}")                        
+                        print(f"\n📋 Number of registers: {service.sales_count('Delivered')}")                    
+                        print(f"💰 Total value registered: R${service.sales_revenue('Delivered'):.2f}")                        
                     case "3":
+                        print("-" * 40)
+                        for status, (count, revenue) in service.sales_by('status').items():
+                            if count:
+                                print(f"🗃️ {status}: {count} order(s) | R${revenue:.2f}")
+                    case "4":
+                        print("-" * 40)
+                        print("👤 By costumer (Canceled/Rejected not included):")
+                        for code, (count, revenue) in sorted(service.sales_by('costumer').items()):
+                            if count:
+                                costumer = service.get_costumer(code)
+                                print(f"  {costumer.name if costumer else code}: {count} order(s) | R${revenue:.2f}")
+                        print("🛒 By item (gross, before discounts):")
+                        for code, (units, revenue) in sorted(service.sales_by('item').items()):
+                            if units:
+                                item = service.find_item(code)
+                                print(f"  {item.name if item else code}: {units} unit(s) | R${revenue:.2f}")
+                    case "5":
+                        print("-" * 40)
+                        print("📅 By day:")
+                        for day, (count, revenue) in sorted(service.sales_by('day').items()):
+                            if count:
+                                print(f"  {day}: {count} order(s) | R${revenue:.2f}")
+                        print("🕒 By hour:")
+                        for hour, (count, revenue) in sorted(service.sales_by('hour').items()):
+                            if count:
+                                print(f"  {hour}h: {count} order(s) | R${revenue:.2f}")
+                    case "6":
+                        problems = service.check_sales()
+                        if problems:
+                            print("❌ Report data is inconsistent:")
+                            for problem in problems:
+                                print(f"  {problem}")
+                        else:
+                            print("✅ Report data is consistent.")
+                    case "7":
+                        # Lido das partições do arquivo agora (os totais acima já incluem os pedidos arquivados)
+                        archived = service.archived_sales()
+                        if not archived:
+                            print("⚠️ There's no archived orders.")
+                        print("-" * 40)
+                        for partition, (count, revenue) in archived.items():
+                            print(f"🗄️ {partition}: {count} order(s) | R${revenue:.2f}")
+                    case "8":
+                        sales_analytics_menu(service)
+                    case "9":
                         print("🔙Returning to previous Menu.".center(width))
                         return
                     case _:
                         print("Invalid option. Please try again.".center(width))
             case "5":
+                partitions = service.archive_partitions()
+                if not partitions:
+                    print("⚠️ There's no archived orders.")
+                    continue
+                print("\n🗄️ Archived months:")
+                print("-" * 40)
+                for partition in partitions:
+                    print(f"  {partition}")
+                partition = input("Month (YYYY-MM or sem-data) / [Enter] All: ").strip() or None
+                status = input("Status (Delivered / Canceled / Rejected) / [Enter] All: ").strip() or None
+                try:
+                    orders = service.archived_orders(partition, status) # Lidos do disco só agora
+                except (LookupError, ValueError) as e:
+                    print(f"❌ {e}")
+                    continue
+                if not orders:
+                    print("\nThere's no orders with  current status".center(width))
+                    continue
+                codes = [order.code for order in orders]
+
+                def archived_page(after, size):
+                    start = 0 if after is None else bisect_right(codes, after)
+                    return orders[start:start + size]
+
+                print("\n📋 List of archived orders:")
+                print("-" * 40)
+                paginate(archived_page, len(orders), show_order)
+            case "6":
                 print("🔙Returning to Main Menu.".center(width))
                 return
             case _:
                 print("Invalid option. Please try again.".center(width))
 
-def manage_menu_items(catalog_tree):
+def manage_menu_items(service):
     choice = ""
     width = 60
 
@@ -456,7 +4099,6 @@ def manage_menu_items(catalog_tree):
 
         match choice:
             case "1":
-                code = len(catalog_tree) + 1
                 width = 60
                 print("=" * width)
                 print("➕ Add New Item".center(width))
@@ -471,16 +4113,26 @@ def manage_menu_items(catalog_tree):
                         valid_price = True
                     except ValueError:
                         print("Price must be a positive number")
-                stock = int(input("How many items will be add:\n"))
-                new_item = create_item(code, name, description, price, stock)
-                catalog_tree.root = catalog_tree.insert(catalog_tree.root, new_item['code'], new_item)
-                save_data()
+                stock = input("How many items will be add:\n")
+                try:
+                    service.create_item(name, description, price, stock)
+                except ValueError as e:
+                    print(e)
+                    continue
                 print('Item added with sucess')
 
             case "2":
                 width = 60
-                catalog_code = int(input("Type the CODE of the item:\n".center(width))) 
-                item_to_update = catalog_tree.search(catalog_tree.root, catalog_code) # Busca O(log n)               
+                user_input = input("Type the CODE of the item (or a name to search):\n".center(width)).strip()
+                if user_input and not user_input.isdigit():
+                    show_item_matches(service, user_input)
+                    user_input = input("Type the CODE of the item:\n".center(width)).strip()
+                try:
+                    catalog_code = int(user_input)
+                except ValueError:
+                    print("❌ Invalid code.".center(width))
+                    continue
+                item_to_update = service.find_item(catalog_code)               
                 if item_to_update:
                         i = item_to_update
                         update_type = ""
@@ -498,21 +4150,29 @@ def manage_menu_items(catalog_tree):
                         
                             match update_type:
                                 case "1":
-                                    update_name(i)
-                                    save_data()
+                                    new_name = update_name(i)
+                                    if new_name is not None:
+                                        i = service.update_item(i.code, name=new_name)
+                                        print(f"The name of the item code:{i.code} has changed to {i.name}")
                                 case "2":
-                                    update_description(i)
-                                    save_data()
+                                    new_description = update_description(i)
+                                    if new_description is not None:
+                                        i = service.update_item(i.code, description=new_description)
+                                        print(f"Description of the item {i.name} has changed")
                                 case "3":
-                                    update_price(i)
-                                    save_data()
+                                    new_price = update_price(i)
+                                    if new_price is not None:
+                                        try:
+                                            i = service.update_item(i.code, price=new_price)
+                                            print(f"Price of the item {i.name} has changed to R${i.price}")
+                                        except ValueError as e:
+                                            print(e)
                                 case "4":
-                                    print(f"The item {i['name']} has {i['stock']} units in stock.".center(width))
+                                    print(f"The item {i.name} has {i.stock} units in stock.".center(width))
                                     quantity = input("Type the new quantity you want to add or take from stock:\nUse a minus sign (-) to decrease stock\n".center(width))
                                     try:
-                                        update_stock(i, quantity)
-                                        save_data()
-                                        print(f"Stock updated. New stock for {i['name']}: {i['stock']}".center(width))
+                                        i = service.update_stock(i.code, quantity)
+                                        print(f"Stock updated. New stock for {i.name}: {i.stock}".center(width))
                                     except ValueError as e:
                                         print(e)
                                 case "5":
@@ -524,7 +4184,7 @@ def manage_menu_items(catalog_tree):
 
             case "3":
                 width = 60
-                if not catalog_tree:
+                if not service.count_items():
                     print("⚠️ No items on the menu.".center(width))
                     continue
 
@@ -532,14 +4192,7 @@ def manage_menu_items(catalog_tree):
                 print("📋 Menu List of Items".center(width))
                 print("=" * width)
 
-                items_to_display = catalog_tree.inorder_traversal_list(catalog_tree.root)
-                for item in items_to_display:
-                    print(f"📦 Code: {item['code']}".center(width))
-                    print(f"📝 Name: {item['name']}".center(width))
-                    print(f"🖊️ Description: {item['description']}".center(width))
-                    print(f"💰 Price: R${item['price']}".center(width))
-                    print(f"📦 Stock: {item['stock']}".center(width))
-                    print("-" * width)
+                paginate(service.list_items, service.count_items(), lambda item, position: item_cards.block(item))
                     
             case "4":
                 width = 60
@@ -551,11 +4204,11 @@ def manage_menu_items(catalog_tree):
                 print("❌ Invalid option. Please try again.".center(width))
 
 
-def manage_orders(orders_tree, catalog_tree):
+def manage_orders(service):
     choice = ""
     width = 60
 
-    while choice != "5":
+    while choice != "6":
         print("=" * width)
         print("📦 Orders Management Menu".center(width))
         print("=" * width)
@@ -564,24 +4217,24 @@ def manage_orders(orders_tree, catalog_tree):
         print("[2] Manage Pending Orders".center(width))
         print("[3] Update Orders Status".center(width))
         print("[4] Cancel Order".center(width))
-        print("[5] Return to Main Menu\n".center(width))
+        print("[5] Dispatch Ready Orders".center(width))
+        print("[6] Return to Main Menu\n".center(width))
 
-        choice = input("Choose an option (1 / 2 / 3 / 4 / 5):".center(width))
+        choice = input("Choose an option (1 / 2 / 3 / 4 / 5 / 6):".center(width))
         
         match choice:
             case "1":
-                name_costumer = input("What is the name of the costumer? ")
                 number_costumer = input("What is the cellphone number of the costumer? ")
-                code_costumer = len(costumers) +1
-                new_costumer = {
-                    "code": code_costumer,
-                    "name": name_costumer,
-                    "cellphone": number_costumer
-                }
-
-                code = len(orders_tree) + 1
+                known_costumer = service.find_costumer(number_costumer)
+                if known_costumer:
+                    name_costumer = known_costumer.name
+                    print(f"Welcome back, {name_costumer}! (costumer code {known_costumer.code})")
+                else:
+                    name_costumer = input("What is the name of the costumer? ")
+
                 items_order = []
                 payment = 'Paid'
+                cart = service.open_cart() # Os itens escolhidos ficam reservados até finalizar ou desistir
                 choice = ""
                 while choice != "3":
                     print('1. Insert a new item')
@@ -591,23 +4244,17 @@ def manage_orders(orders_tree, catalog_tree):
 
                     match choice:
                         case "1":
-                            if catalog_tree == []:
+                            if not service.count_items():
                                 print('The menu is empty, please add some items to proceed.')
+                                service.release_cart(cart)
                                 return
                             
                             print("\n📋 Menu list of items:")
                             print("-" * 40)
-                            items_to_display = catalog_tree.inorder_traversal_list(catalog_tree.root)
-                            for item in items_to_display:
-                                print(f"📦 Code: {item['code']}")
-                                print(f"📝 Name: {item['name']}")
-                                print(f"🖊️ Description: {item['description']}")
-                                print(f"💰 Price: R${item['price']:.2f}")
-                                print(f"📦 Stock: {item['stock']}")
-                                print("-" * 40)
+                            write_blocks(item_choices.block(item) for item in service.all_items())
                             catalog_code = None
                             while catalog_code is None:
-                                user_input = input('Choose a item by code: ').strip()
+                                user_input = input('Choose a item by code (or type a name to search): ').strip()
                                 
                                 if not user_input:
                                     print("⚠️ Entrada vazia. Por favor, digite o código do item.")
@@ -615,27 +4262,25 @@ def manage_orders(orders_tree, catalog_tree):
                                 
                                 try:
                                     catalog_code = int(user_input)
-                                except ValueError:
-                                    print("❌ Entrada inválida. Por favor, digite um número inteiro.")
-                                    catalog_code = None
+                                except ValueError: # Texto: busca pelo nome/descrição e pergunta de novo
+                                    show_item_matches(service, user_input)
                                     continue
-                            # Busca do Item (usando a AVL)
-                            found_item = catalog_tree.search(catalog_tree.root, catalog_code)
+                            found_item = service.find_item(catalog_code)
 
                             if found_item:
-                                if found_item['stock'] > 0:
-                                    print(f"\nItem {catalog_code} added with success")
-                                    item_for_order = found_item.copy()
-                                    item_for_order['quantity'] = 1
-                                    items_order.append(item_for_order)
-                                    print(f"\n{name_costumer}'s order items are: {[i['name'] for i in items_order]}")
-                                    update_stock(found_item, -1)
-                                    save_data()
-                                    print(f"The current stock for this item is: {found_item['stock']}")
-                                else:
+                                # Reserva a unidade: o estoque só é baixado ao finalizar, mas ninguém mais pode pegá-la
+                                try:
+                                    items_order = service.reserve(cart, [(found_item.code, 1)])
+                                except ValueError:
                                     print("Stock insuficiente")
-                                    print(f"The current stock for this item is: {found_item['stock']}\n")
+                                    print(f"The current stock for this item is: {service.available(found_item.code)}\n")
+                                    break
+                                except LookupError as e: # Carrinho abandonado por tempo demais
+                                    print(f"❌ {e}")
                                     break
+                                print(f"\nItem {catalog_code} added with success")
+                                print(f"\n{name_costumer}'s order items are: {[line_name(line) for line in items_order]}")
+                                print(f"The current stock for this item is: {service.available(found_item.code)}")
                             if not found_item:
                                 print("Item not found")
                             
@@ -644,39 +4289,33 @@ def manage_orders(orders_tree, catalog_tree):
                                 print("Order must have at least one item!")
                                 continue
 
-                            order = create_order(
-                                code = code, 
-                                costumer_data = new_costumer, 
-                                items_order = items_order, 
-                                status = "Pending", 
-                                payment = payment
-                            )
-
-                            print(f"The current value of the order is: R${order['order_total_price']:.2f}")
+                            total = sum(line.price * line.quantity for line in items_order)
+                            print(f"The current value of the order is: R${total:.2f}")
 
                             discount_choice = input("Would you like to apply a discount coupon of 10%? (1. Yes / 2. No): ")
+                            if discount_choice not in ("1", "2"):
+                                print("Invalid option. Proceeding without discount.")
 
-                            match discount_choice:
-                                case "1":
-                                    apply_order_discount(order) 
-                                    print(f"\nCoupon applied successfully. New total: R${order['order_total_price']:.2f}")
-                                case "2": 
-                                    print(f"\nNo discount applied. Total: R${order['order_total_price']:.2f}")
-                                case _:
-                                    print("Invalid option. Proceeding without discount.")
+                            # Cliente só é cadastrado e o estoque só é baixado quando o pedido é finalizado
+                            try:
+                                order = service.checkout(cart, number_costumer, name_costumer,
+                                                         discount = discount_choice == "1", payment = payment)
+                            except (ValueError, LookupError) as e:
+                                print(f"❌ {e}")
+                                break
 
-                            order['status'] = "Pending"
-                            orders_tree.root = orders_tree.insert(orders_tree.root, order['code'], order)
-                            costumers.append(new_costumer)
-                            save_data()
+                            if discount_choice == "1":
+                                print(f"\nCoupon applied successfully. New total: R${order.order_total_price:.2f}")
+                            else:
+                                print(f"\nNo discount applied. Total: R${order.order_total_price:.2f}")
 
                             print("\n✅ Order added with sucess!")
                             print("-" * 40)
-                            print(f"Code: {order['code']}")
-                            print(f"Costumer: {order['costumer']}")
-                            print(f"Items: {', '.join([item['name'] for item in order['items_order']])}")
-                            print(f"Status: {order['status']}")
-                            print(f"Total: R${order['order_total_price']:.2f}")
+                            print(f"Code: {order.code}")
+                            print(f"Costumer: {order.costumer}")
+                            print(f"Items: {', '.join([line_name(line) for line in order.items_order])}")
+                            print(f"Status: {order.status}")
+                            print(f"Total: R${order.order_total_price:.2f}")
                             print("-" * 40)
                             print("\nReturning to manage orders.\n")
                             break 
@@ -688,52 +4327,52 @@ def manage_orders(orders_tree, catalog_tree):
                         case _:
                             print("Invalid option. Please try again.")
                             continue
+                service.release_cart(cart) # Desistência: devolve o que ficou reservado (nada, se o pedido foi finalizado)
 
             case "2":
-                pending_orders = get_orders_by_status("Pending")
-                if not pending_orders:
+                order = service.next_pending() # Cabeça da fila de pendentes
+                if not order:
                     print("⚠️ No pending orders.".center(width))
                     continue
 
-                order = pending_orders[0]
                 print("=" * width)
                 print("📦 Pending Order".center(width))
                 print("=" * width)
-                items_names = [item['name'] for item in order['items_order']]
+                items_names = [line_name(line) for line in order.items_order]
                 items_display = ', '.join(items_names)
-                print(f"Code: {order['code']}")
-                print(f"Costumer: {order['costumer']}")
+                print(f"Code: {order.code}")
+                print(f"Costumer: {order.costumer}")
                 print(f"Items: {items_display}")
-                print(f"Total: R${order['order_total_price']:.2f}")
-                print(f"Status: {order['status']}")
+                print(f"Total: R${order.order_total_price:.2f}")
+                print(f"Status: {order.status}")
                 print("=" * width)
 
                 print("[1] Accept order".center(width))
                 print("[2] Reject order".center(width))
-                print("[3] Return to Manage Orders\n".center(width))
-                choice = input("Choose an option (1 / 2 / 3):".center(width))
+                print("[3] Return to Manage Orders".center(width))
+                print(f"[4] Accept next N pending orders ({service.count_status('Pending')} waiting)\n".center(width))
+                choice = input("Choose an option (1 / 2 / 3 / 4):".center(width))
 
                 if choice == "1":
-                    order['status'] = "Accepted"
-                    save_data()
+                    service.accept_order(order.code)
                     print("✅ Order accepted with success!".center(width))
                 elif choice == "2":
-                    order['status'] = "Rejected"
-                    save_data()
-                    for item in order['items_order']: 
-                        lista_catalogo = catalog_tree.inorder_traversal_list(catalog_tree.root)
-                        original_item = next((i for i in lista_catalogo if i["name"] == item["name"]), None)
-                        if original_item:
-                            update_stock(original_item, item["quantity"])
-                            save_data()
+                    service.reject_order(order.code) # Devolve o estoque
                     print("❌ Order rejected.".center(width))
                 elif choice == "3":
                     print("🔙 Returning to Manage Orders...".center(width))
+                elif choice == "4":
+                    try:
+                        accepted = service.accept_next(input("How many orders to accept? ".center(width)))
+                    except ValueError as e:
+                        print(f"❌ {e}".center(width))
+                        continue
+                    print(f"✅ {len(accepted)} order(s) accepted: {[o.code for o in accepted]}".center(width))
                 else:
                     print("⚠️ Invalid option.".center(width))
                             
             case "3":
-                if not orders_tree:
+                if not service.count_orders():
                     print("⚠️ No available orders to update.".center(width))
                     continue
 
@@ -741,14 +4380,11 @@ def manage_orders(orders_tree, catalog_tree):
                 print("📋 Orders Available".center(width))
                 print("=" * width)
 
-                lista_pedidos = orders_tree.inorder_traversal_list(orders_tree.root)
-                for idx, order in enumerate(lista_pedidos, start=1):
-                    print(f"{idx}. Code: {order['code']} | Costumer: {order['costumer']['name']} | Status: {order['status']}".center(width))
+                paginate(service.list_orders, service.count_orders(), lambda order, idx: f"{idx}. Code: {order.code} | Costumer: {order.costumer.name} | Status: {order.status}".center(width) + "\n")
 
                 try:
-                    order_index = int(input("Select an order by code:".center(width))) - 1
-                    order = lista_pedidos[order_index]
-                except (ValueError, IndexError):
+                    order = service.order_at(int(input("Select an order by code:".center(width))) - 1)
+                except (ValueError, LookupError):
                     print("❌ Invalid selection.".center(width))
                     continue
 
@@ -756,14 +4392,14 @@ def manage_orders(orders_tree, catalog_tree):
                 print("📦 Selected Order".center(width))
                 print("=" * width)
 
-                items_names = [item['name'] for item in order['items_order']]
+                items_names = [line_name(line) for line in order.items_order]
                 items_display = ', '.join(items_names)
 
-                print(f"Code: {order['code']}")
-                print(f"Costumer: {order['costumer']}")
+                print(f"Code: {order.code}")
+                print(f"Costumer: {order.costumer}")
                 print(f"Items: {items_display}")
-                print(f"Total: R${order['order_total_price']:.2f}")
-                print(f"Status: {order['status']}")
+                print(f"Total: R${order.order_total_price:.2f}")
+                print(f"Status: {order.status}")
                 print("=" * width)
 
                 print("=" * width)
@@ -778,25 +4414,23 @@ def manage_orders(orders_tree, catalog_tree):
                 status_choice = input("Choose an option (1-5):".center(width))
 
                 match status_choice:
-                    case "1": order['status'] = "Making"
-                    case "2": order['status'] = "Ready"
-                    case "3": order['status'] = "Waiting Delivery"
-                    case "4": order['status'] = "Delivering"
-                    case "5": order['status'] = "Delivered"
+                    case "1": service.set_status(order.code, "Making")
+                    case "2": service.set_status(order.code, "Ready")
+                    case "3": service.set_status(order.code, "Waiting Delivery")
+                    case "4": service.set_status(order.code, "Delivering")
+                    case "5": service.set_status(order.code, "Delivered")
                     case _: 
                         print("❌ Invalid option.".center(width))
                         continue
-                save_data()
 
                 print("✅ Order updated with success!".center(width))
 
             case "4":
-                if not orders_tree:
+                if not service.count_orders():
                     print("⚠️ No orders available.".center(width))
                     continue
 
-                lista_pedidos = orders_tree.inorder_traversal_list(orders_tree.root)
-                cancellable_orders = [o for o in lista_pedidos if o['status'] in ("Pending", "Accepted")]
+                cancellable_orders = sorted(service.orders_with_status("Pending") + service.orders_with_status("Accepted"), key=lambda o: o.code)
                 if not cancellable_orders:
                     print("⚠️ No cancellable orders available.".center(width))
                     continue
@@ -806,7 +4440,7 @@ def manage_orders(orders_tree, catalog_tree):
                 print("=" * width)
 
                 for idx, order in enumerate(cancellable_orders, start=1):
-                    print(f"{idx}. Code: {order['code']} | Costumer: {order['costumer']['name']} | Status: {order['status']}".center(width))
+                    print(f"{idx}. Code: {order.code} | Costumer: {order.costumer.name} | Status: {order.status}".center(width))
 
                 try:
                     order_index = int(input("Select an order by code:".center(width))) - 1
@@ -816,7 +4450,7 @@ def manage_orders(orders_tree, catalog_tree):
                     continue
 
                 print("📦 Selected Order".center(width))
-                print(str(order).center(width))
+                print(str(order.to_dict()).center(width))
 
                 print("❗ Choose action:".center(width))
                 print("[1] Cancel order".center(width))
@@ -825,21 +4459,80 @@ def manage_orders(orders_tree, catalog_tree):
                 cancel_choice = input("Choose an option (1 / 2):".center(width))
                 match cancel_choice:
                     case "1":
-                        order['status'] = "Canceled"
-                        save_data()
-                        for item in order['items_order']:
-                            lista_catalogo = catalog_tree.inorder_traversal_list(catalog_tree.root)
-                            original_item = next((i for i in lista_catalogo if i["name"] == item["name"]), None)
-                            if original_item:
-                                update_stock(original_item, item["quantity"])
-                                save_data()
-                        print(f"✅ Order {order['code']} canceled with success!".center(width))
+                        service.cancel_order(order.code) # Devolve o estoque
+                        print(f"✅ Order {order.code} canceled with success!".center(width))
                     case "2":
                         print("🔙 Returning to Orders Menu...".center(width))
                     case _:
                         print("❌ Invalid option.".center(width))
 
             case "5":
+                dispatched = service.dispatch_ready()
+                if not dispatched:
+                    print("⚠️ No ready orders to dispatch.".center(width))
+                    continue
+                print(f"🛵 {len(dispatched)} order(s) out for delivery: {[o.code for o in dispatched]}".center(width))
+
+            case "6":
+                print("🔙 Returning to Main Menu...".center(width))
+                return
+            case _:
+                print("❌ Invalid option. Please try again.".center(width))
+
+def diagnostics(service):
+    choice = ""
+    width = 60
+    flows = {"1": manage_menu_items, "2": manage_orders, "3": consults}
+
+    while choice != "6":
+        print("=" * width)
+        print("🩺 Diagnostics".center(width))
+        print("=" * width)
+
+        state = "ON" if instrumentation.enabled else "OFF"
+        print(f"[1] Show Metrics (instrumentation {state})".center(width))
+        print(f"[2] Turn Instrumentation {'Off' if instrumentation.enabled else 'On'}".center(width))
+        print("[3] Reset Metrics".center(width))
+        print("[4] Profile a Menu Flow (CPU / memory)".center(width))
+        print(f"[5] Save Metrics to {DIAGNOSTICS_FILE}".center(width))
+        print("[6] Back to Main Menu\n".center(width))
+        choice = input("Choose an option (1 / 2 / 3 / 4 / 5 / 6):".center(width))
+
+        match choice:
+            case "1":
+                report = instrumentation.report()
+                if not report["metrics"]:
+                    print(f"⚠️ No calls measured yet (instrumentation {state}).".center(width))
+                    continue
+                print(f"{'function':<31}{'calls':>9}{'total ms':>11}{'mean µs':>12}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>12}")
+                for name, data in report["metrics"].items():
+                    print(f"{name:<31}{data['calls']:>9}{data['total_ms']:>11.1f}{data['mean_us']:>12.1f}"
+                          f"{data['p50_us']:>10}{data['p99_us']:>10}{data['max_us']:>12.0f}")
+                    if "bytes_written" in data:
+                        print(f"{'':<4}bytes written: {data['bytes_written']:,} (last save: {data['last_bytes']:,})")
+            case "2":
+                if instrumentation.enabled:
+                    instrumentation.disable()
+                    print("✅ Instrumentation off.".center(width))
+                else:
+                    instrumentation.enable()
+                    print("✅ Instrumentation on.".center(width))
+            case "3":
+                instrumentation.reset()
+                print("✅ Metrics cleared.".center(width))
+            case "4":
+                print("[1] Manage Menu Items / [2] Manage Orders / [3] Consults".center(width))
+                flow = flows.get(input("Which flow?".center(width)).strip())
+                if flow is None:
+                    print("❌ Invalid option.".center(width))
+                    continue
+                memory = input("[1] CPU (cProfile) / [2] Memory (tracemalloc):".center(width)).strip() == "2"
+                print("▶️ Use the menu as usual; the report is shown when you go back.".center(width))
+                profile_flow(flow, service, memory)
+            case "5":
+                instrumentation.dump()
+                print(f"✅ Metrics saved to {DIAGNOSTICS_FILE}.".center(width))
+            case "6":
                 print("🔙 Returning to Main Menu...".center(width))
                 return
             case _:
@@ -849,7 +4542,7 @@ def main_menu():
     choice = ""
     width = 60
 
-    while choice != "4":
+    while choice != "5":
         print("=" * width)
         print("🍔 Food Delivery Ordering System 🍕".center(width))
         print("=" * width)
@@ -857,22 +4550,85 @@ def main_menu():
         print("[1] Manage Menu Items".center(width))
         print("[2] Manage Orders".center(width))
         print("[3] Consults".center(width))
-        print("[4] Exit".center(width))
+        print("[4] Diagnostics".center(width))
+        print("[5] Exit".center(width))
 
-        choice = input("Choose an option (1 / 2 / 3 / 4):".center(width))
+        choice = input("Choose an option (1 / 2 / 3 / 4 / 5):".center(width))
 
         match choice:
             case "1":
-                manage_menu_items(catalog_tree)
+                manage_menu_items(service)
             case "2":
-                manage_orders(orders_tree, catalog_tree)
+                manage_orders(service)
             case "3":
-                consults(orders_tree, costumers)
+                consults(service)
             case "4":
+                diagnostics(service)
+            case "5":
+                service.store.close() # Grava o que faltar (snapshot completo no backend em memória)
                 print("\nExiting the system. Goodbye!\n".center(width))
                 return
             case _:
                 print("Invalid option. Please try again.".center(width))
 
-load_data()
-main_menu()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tia Lu food delivery ordering system")
+    parser.add_argument("--binary", action="store_true", help=f"use the binary snapshot ({BINARY_FILE}, mmap) instead of {DATA_FILE}")
+    parser.add_argument("--store", choices=("memory", "sqlite"), default="memory", help=f"storage backend: AVL trees in memory ({DATA_FILE}) or SQLite ({SQLITE_FILE})")
+    parser.add_argument("--serve", metavar="HOST:PORT", nargs="?", const="127.0.0.1:8080", help="run the HTTP/JSON API instead of the menu (default 127.0.0.1:8080)")
+    parser.add_argument("--convert-binary", action="store_true", help=f"convert {DATA_FILE} (plus journal) into {BINARY_FILE} and exit")
+    parser.add_argument("--no-render-cache", action="store_true", help="format every listed record again on each visit (no render cache)")
+    parser.add_argument("--instrument", action="store_true", help=f"measure call counts and latencies of the hot paths (see Diagnostics) and save them to {DIAGNOSTICS_FILE} on exit")
+    commands = parser.add_subparsers(dest="command", metavar="{import,export,archive}")
+    for name, action in (("import", "read"), ("export", "write")):
+        command = commands.add_parser(name, help=f"{action} items or orders from/to a CSV or JSON Lines file")
+        command.add_argument("entity", choices=("items", "orders"))
+        command.add_argument("file")
+        command.add_argument("--format", choices=("csv", "jsonl"), help="file format (default: by extension, .csv or JSON Lines)")
+        if name == "import":
+            command.add_argument("--batch", type=int, default=IMPORT_BATCH, help=f"records per batch (default {IMPORT_BATCH})")
+    command = commands.add_parser("archive", help=f"move closed orders older than --days into {ARCHIVE_DIR}/ (memory store)")
+    command.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help=f"minimum age in days (default {ARCHIVE_AFTER_DAYS})")
+    args = parser.parse_args()
+
+    if args.convert_binary:
+        load_data()
+        save_binary_snapshot()
+        print(f"✅ {DATA_FILE} convertido para {BINARY_FILE} ({len(orders_tree)} pedidos).")
+    else:
+        if args.binary:
+            SNAPSHOT_FORMAT = "binary"
+        if args.no_render_cache:
+            RENDER_CACHE = False
+        if args.store == "sqlite":
+            store = SqliteStore()
+        service = OrderService(store)
+        if args.instrument:
+            instrumentation.enable() # Antes do load, para medir a carga também
+        store.load()
+        if args.command:
+            try:
+                if args.command == "import":
+                    run_import(store, args.entity, args.file, args.format, args.batch)
+                elif args.command == "archive":
+                    try:
+                        print(f"✅ {service.archive_orders(args.days)} order(s) archived in {ARCHIVE_DIR}/.")
+                    except ValueError as e:
+                        print(f"❌ {e}")
+                else:
+                    run_export(store, args.entity, args.file, args.format)
+            finally:
+                store.close()
+        elif args.serve:
+            host, _, port = args.serve.rpartition(":")
+            try:
+                asyncio.run(serve_http(service, host or "127.0.0.1", int(port)))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                store.close()
+        else:
+            main_menu()
+        if instrumentation.enabled:
+            instrumentation.dump()
+            print(f"📈 Metrics saved to {DIAGNOSTICS_FILE}.")